@@ -99,15 +99,59 @@ resource "google_cloud_run_v2_service" "cloud_run_name_agent_aa" {
 
 }
 
+resource "google_storage_bucket" "webhook_state" {
+  name                        = "${var.project_id}-${var.cloud_run_name_webhook}-state"
+  location                    = var.region
+  project                     = var.project_id
+  uniform_bucket_level_access = true
+}
+
+resource "google_storage_bucket_iam_member" "webhook_state_sa" {
+  bucket = google_storage_bucket.webhook_state.name
+  role   = "roles/storage.objectUser"
+  member = "serviceAccount:${google_service_account.webhook_app_sa.email}"
+}
+
 resource "google_cloud_run_v2_service" "cloud_run_name_webhook" {
   name     = var.cloud_run_name_webhook
   location = var.region
   project  = var.project_id
 
   template {
+    # Cloud Storage volumes need the second generation environment
+    execution_environment = "EXECUTION_ENVIRONMENT_GEN2"
+
+    # Session and media caches: plain files, shared by all instances
+    volumes {
+      name = "webhook-state"
+      gcs {
+        bucket    = google_storage_bucket.webhook_state.name
+        read_only = false
+      }
+    }
+
+    # Ingress journal and SQLite dedup: SQLite needs file locks, which
+    # Cloud Storage and NFS volumes do not provide, so they stay per instance
+    volumes {
+      name = "webhook-journal"
+      empty_dir {
+        medium     = "MEMORY"
+        size_limit = var.webhook_journal_size_limit
+      }
+    }
+
     containers {
       image = var.gar_image_location_webhook
 
+      volume_mounts {
+        name       = "webhook-state"
+        mount_path = "/mnt/webhook-state"
+      }
+      volume_mounts {
+        name       = "webhook-journal"
+        mount_path = "/mnt/webhook-journal"
+      }
+
       env {
         name  = "APP_URL"
         value = google_cloud_run_v2_service.cloud_run_name_agent_aa.uri
@@ -147,13 +191,37 @@ resource "google_cloud_run_v2_service" "cloud_run_name_webhook" {
         name  = "LOG_LEVEL"
         value = var.log_level
       }
+
+      env {
+        name  = "ENVIRONMENT"
+        value = var.environment
+      }
+      env {
+        name  = "INGRESS_QUEUE_PATH"
+        value = "/mnt/webhook-journal/ingress.db"
+      }
+      env {
+        name  = "DEDUP_SQLITE_PATH"
+        value = "/mnt/webhook-journal/dedup.db"
+      }
+      env {
+        name  = "SESSION_CACHE_PATH"
+        value = "/mnt/webhook-state/sessions.json"
+      }
+      env {
+        name  = "MEDIA_CACHE_DIR"
+        value = "/mnt/webhook-state/media_cache"
+      }
     }
 
     service_account = google_service_account.webhook_app_sa.email
   }
 
   ingress = "INGRESS_TRAFFIC_ALL"
-  depends_on = [google_cloud_run_v2_service.cloud_run_name_agent_aa]
+  depends_on = [
+    google_cloud_run_v2_service.cloud_run_name_agent_aa,
+    google_storage_bucket_iam_member.webhook_state_sa,
+  ]
 }
 
 
@@ -33,6 +33,11 @@ variable "service_account_display_name_agent_pp" {
   type        = string
 }
 
+variable "environment" {
+  description = "Entorno de despliegue (dev o prd)"
+  type        = string
+}
+
 variable "region" {
   description = "Ubicación de los servicios"
   type        = string
@@ -156,4 +161,10 @@ variable "log_level" {
 variable "bigquery_dataset" {
     description = "BigQuery dataset name for the agents"
     type        = string
+}
+
+variable "webhook_journal_size_limit" {
+    description = "Tamaño máximo del volumen en memoria del journal de ingreso y la deduplicación del webhook"
+    type        = string
+    default     = "128Mi"
 }
\ No newline at end of file
@@ -0,0 +1,102 @@
+"""
+Benchmark: per-call httpx clients vs the shared pooled agent client.
+
+Starts a local stub of the agent service (session GET + /run) and sends the
+same text-message sequence (create_agent_session + send_to_agent) through:
+  - a new ``httpx.AsyncClient`` per call (previous behaviour)
+  - the shared client from ``external_services.http_clients``
+
+The stub is plain HTTP, so only TCP setup is saved here; against Cloud Run
+the pooled client also saves the TLS handshake on every call.
+
+Usage:
+    uv run python benchmarks/bench_agent_client.py [messages] [concurrency]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault("APP_URL", "http://127.0.0.1:8765")
+os.environ.setdefault("AGENT_HTTP2", "false")  # the stub server speaks HTTP/1.1 only
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from whatsapp_webhook.external_services import agent_client
+from whatsapp_webhook.external_services.http_clients import close_http_clients, open_http_clients
+
+stub = FastAPI()
+
+
+@stub.get("/apps/{app}/users/{user}/sessions/{session}")
+async def get_session(app: str, user: str, session: str):
+    return {"id": session}
+
+
+@stub.post("/run")
+async def run():
+    return [{"content": {"parts": [{"text": "respuesta"}]}}]
+
+
+async def _fake_id_token(_: str) -> str:
+    return "benchmark-token"
+
+
+async def _one_message(client_factory, i: int) -> float:
+    start = time.perf_counter()
+    user = f"5690000{i:04d}"
+    if client_factory is None:
+        await agent_client.create_agent_session(user, "agent_aa", user)
+        await agent_client.send_to_agent("agent_aa", user, user, "hola")
+    else:
+        async with client_factory() as client:
+            await agent_client.create_agent_session(user, "agent_aa", user, client=client)
+        async with client_factory() as client:
+            await agent_client.send_to_agent("agent_aa", user, user, "hola", client=client)
+    return time.perf_counter() - start
+
+
+async def _run(label: str, client_factory, messages: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def bounded(i: int) -> float:
+        async with semaphore:
+            return await _one_message(client_factory, i)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(bounded(i) for i in range(messages)))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(latencies)
+    print(
+        f"{label:<22} total={elapsed:6.2f}s  "
+        f"p50={statistics.median(latencies) * 1000:6.2f}ms  "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:6.2f}ms  "
+        f"msg/s={messages / elapsed:7.1f}"
+    )
+
+
+async def main(messages: int, concurrency: int) -> None:
+    agent_client.get_id_token = _fake_id_token
+    await _run("new client per call", lambda: httpx.AsyncClient(timeout=30.0), messages, concurrency)
+    await open_http_clients()
+    try:
+        await _run("shared pooled client", None, messages, concurrency)
+    finally:
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    server = uvicorn.Server(uvicorn.Config(stub, port=8765, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    asyncio.run(main(messages, concurrency))
+    server.should_exit = True
@@ -0,0 +1,72 @@
+"""
+Benchmark: long voice-note transcription latency vs chunk parallelism.
+
+Builds a synthetic Ogg Opus note (20 ms packets, with a quiet stretch every
+few seconds) and transcribes it through a fake backend whose latency is
+proportional to the audio it receives, like Speech's synchronous API. Each
+packet encodes its index, and the fake "hears" one word per second of audio,
+so the stitched transcript can be checked for lost or repeated words.
+
+Usage:
+    uv run python benchmarks/bench_long_audio.py [minutes] [seconds_per_audio_second]
+"""
+import asyncio
+import os
+import struct
+import sys
+import time
+
+from whatsapp_webhook import transcription
+from whatsapp_webhook.media.ogg import OpusHead, OpusPacket, read_opus, write_opus
+from whatsapp_webhook.utils.app_config import config
+
+PACKETS_PER_SECOND = 50
+TOC_20MS_CELT = 0xF8
+
+
+def synthetic_note(seconds: int) -> bytes:
+    head_raw = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, 312, 16000, 0, 0)
+    head = OpusHead(channels=1, pre_skip=312, input_sample_rate=16000, raw=head_raw)
+    tags = b"OpusTags" + struct.pack("<II", 0, 0)
+    packets = []
+    for index in range(seconds * PACKETS_PER_SECOND):
+        quiet = index % (7 * PACKETS_PER_SECOND) < 10
+        padding = b"" if quiet else os.urandom(60)
+        packets.append(OpusPacket(bytes([TOC_20MS_CELT]) + struct.pack("<I", index) + padding, 960))
+    return write_opus(head, tags, packets)
+
+
+class FakeBackend:
+    """Recognises one word per second of audio, after a delay proportional to its length."""
+
+    def __init__(self, seconds_per_audio_second: float):
+        self.seconds_per_audio_second = seconds_per_audio_second
+
+    async def transcribe(self, audio: bytes, sample_rate_hertz: int) -> str:
+        _, _, packets = read_opus(audio)
+        await asyncio.sleep(len(packets) / PACKETS_PER_SECOND * self.seconds_per_audio_second)
+        indexes = [struct.unpack_from("<I", packet.data, 1)[0] for packet in packets]
+        return " ".join(f"w{index // PACKETS_PER_SECOND}" for index in indexes if index % PACKETS_PER_SECOND == 0)
+
+
+async def main(minutes: float, seconds_per_audio_second: float) -> None:
+    seconds = int(minutes * 60)
+    note = synthetic_note(seconds)
+    backend = FakeBackend(seconds_per_audio_second)
+    expected = " ".join(f"w{second}" for second in range(seconds))
+
+    for parallelism in (1, 2, 4, 8):
+        config.speech_chunk_parallelism = parallelism
+        start = time.perf_counter()
+        transcript = await transcription.transcribe_audio_file(note, backend)
+        elapsed = time.perf_counter() - start
+        print(
+            f"parallelism={parallelism}  total={elapsed:5.2f}s  "
+            f"transcript {'ok' if transcript == expected else 'MISMATCH'}"
+        )
+
+
+if __name__ == "__main__":
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    seconds_per_audio_second = float(sys.argv[2]) if len(sys.argv) > 2 else 0.05
+    asyncio.run(main(minutes, seconds_per_audio_second))
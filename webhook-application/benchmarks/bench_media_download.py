@@ -0,0 +1,98 @@
+"""
+Benchmark: peak memory of concurrent media downloads.
+
+Starts a local stub of the Graph API media endpoints and downloads the same
+file N times concurrently through:
+  - ``response.content`` (previous behaviour: every file fully in memory)
+  - ``download_whatsapp_media`` streaming into spooled ``MediaHandle``s
+
+Peak memory is measured with ``tracemalloc`` while all handles are still
+open, i.e. the moment the previous implementation held every file at once.
+
+Usage:
+    uv run python benchmarks/bench_media_download.py [downloads] [size_mb]
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+os.environ.setdefault("GRAPH_HTTP2", "false")  # the stub server speaks HTTP/1.1 only
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+from whatsapp_webhook.external_services.http_clients import (
+    close_http_clients,
+    get_graph_http_client,
+    open_http_clients,
+)
+from whatsapp_webhook.external_services.whatsapp_client import download_whatsapp_media
+
+BASE_URL = "http://127.0.0.1:8766"
+CHUNK = b"\x4f" * (64 * 1024)
+
+stub = FastAPI()
+file_size = 0
+
+
+@stub.get("/{media_id}")
+async def media_info(media_id: str):
+    return {"url": f"{BASE_URL}/files/{media_id}", "mime_type": "audio/ogg", "file_size": file_size}
+
+
+@stub.get("/files/{media_id}")
+async def media_file(media_id: str):
+    async def body():
+        for _ in range(file_size // len(CHUNK)):
+            yield CHUNK
+
+    return StreamingResponse(body(), headers={"Content-Length": str(file_size)})
+
+
+async def _buffered(media_id: str) -> bytes:
+    client = get_graph_http_client()
+    info = (await client.get(f"{BASE_URL}/{media_id}")).json()
+    return (await client.get(info["url"])).content
+
+
+async def _streamed(media_id: str):
+    return await download_whatsapp_media(media_id, BASE_URL, "benchmark-token", max_bytes=file_size * 2)
+
+
+async def _run(label: str, download, downloads: int) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    results = await asyncio.gather(*(download(f"m{i}") for i in range(downloads)))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    for result in results:
+        if hasattr(result, "close"):
+            result.close()
+    print(f"{label:<28} total={elapsed:6.2f}s  peak={peak / 2 ** 20:8.1f} MiB")
+
+
+async def main(downloads: int) -> None:
+    await open_http_clients()
+    try:
+        await _run("buffered (response.content)", _buffered, downloads)
+        await _run("streamed (MediaHandle)", _streamed, downloads)
+    finally:
+        await close_http_clients()
+
+
+if __name__ == "__main__":
+    downloads = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    file_size = int(float(sys.argv[2]) * 2 ** 20) if len(sys.argv) > 2 else 4 * 2 ** 20
+
+    server = uvicorn.Server(uvicorn.Config(stub, port=8766, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    asyncio.run(main(downloads))
+    server.should_exit = True
@@ -0,0 +1,81 @@
+"""
+Benchmark: sequential vs pipelined handling of a voice note.
+
+Stubs every remote call with a fixed delay (agent session GET + POST for a
+new conversation, media info + download, Speech, agent ``/run`` and the
+Graph send) and times an audio turn handled:
+  - sequentially, as before: download -> transcribe -> session -> agent -> send
+  - by ``handle_audio_message``, whose stage graph creates the agent session
+    while the audio is downloaded and transcribed
+
+The per-stage timings recorded in ``pipeline_stage_seconds`` are printed too.
+
+Usage:
+    uv run python benchmarks/bench_message_pipeline.py [turns]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("INGRESS_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "ingress.db"))
+
+from whatsapp_webhook import messages
+from whatsapp_webhook.utils.app_config import config
+from whatsapp_webhook.utils.metrics import metrics
+
+ROUND_TRIP = 0.06  # one call to the agent or Graph API
+SESSION_SECONDS = 2 * ROUND_TRIP  # GET 404 + POST for a new conversation
+DOWNLOAD_SECONDS = 2 * ROUND_TRIP  # media info + download
+TRANSCRIBE_SECONDS = 0.4
+AGENT_SECONDS = 0.8
+
+
+async def create_agent_session(user_id, app_name, session_id, client=None):
+    await asyncio.sleep(SESSION_SECONDS)
+
+
+async def download_and_transcribe(audio_id, sha256):
+    await asyncio.sleep(DOWNLOAD_SECONDS + TRANSCRIBE_SECONDS)
+    return "las ciruelas se están partiendo"
+
+
+async def reply_with_agent(sender_wa_id, app_name, message_text):
+    await asyncio.sleep(AGENT_SECONDS + ROUND_TRIP)
+
+
+async def sequential(phone: str, audio_id: str, app_name: str) -> None:
+    transcript = await download_and_transcribe(audio_id, None)
+    await create_agent_session(phone, app_name, phone)
+    await reply_with_agent(phone, app_name, transcript)
+
+
+async def pipelined(phone: str, audio_id: str, app_name: str) -> None:
+    await messages.handle_audio_message(phone, audio_id, app_name)
+
+
+async def time_turns(handle, turns: int) -> list:
+    durations = []
+    for i in range(turns):
+        start = time.perf_counter()
+        await handle(f"5691234{i:04d}", f"audio{i}", config.aa_app_name)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def main(turns: int) -> None:
+    messages.create_agent_session = create_agent_session
+    messages._download_and_transcribe = download_and_transcribe
+    messages._reply_with_agent = reply_with_agent
+    for label, handle in (("sequential", sequential), ("pipeline", pipelined)):
+        durations = await time_turns(handle, turns)
+        print(f"{label:<11} {statistics.median(durations) * 1000:7.1f}ms per audio turn")
+    for series, histogram in metrics.snapshot()["histograms"].get("pipeline_stage_seconds", {}).items():
+        print(f"  {series:<35} mean {histogram['sum'] / histogram['count'] * 1000:7.1f}ms")
+    messages.ingress_queue.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
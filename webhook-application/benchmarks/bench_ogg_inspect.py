@@ -0,0 +1,67 @@
+"""
+Benchmark: cost of inspecting an Ogg Opus voice note before transcription.
+
+Builds synthetic notes of different lengths (speech-like and silent) and
+times ``inspect_opus`` (headers, first pages, last page) against a full
+packet parse with ``read_opus``. Also prints the routing decision each note
+would get from ``transcribe_audio_file``.
+
+Usage:
+    uv run python benchmarks/bench_ogg_inspect.py [iterations]
+"""
+import os
+import struct
+import sys
+import timeit
+
+from whatsapp_webhook.media.ogg import OpusHead, OpusPacket, inspect_opus, read_opus, write_opus
+from whatsapp_webhook.utils.app_config import config
+
+TOC_20MS_SILK_WB = 0x48
+
+
+def note(seconds: float, silent: bool = False) -> bytes:
+    head_raw = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, 312, 16000, 0, 0)
+    head = OpusHead(channels=1, pre_skip=312, input_sample_rate=16000, raw=head_raw)
+    tags = b"OpusTags" + struct.pack("<II", 0, 0)
+    size = 2 if silent else 40
+    packets = [
+        OpusPacket(bytes([TOC_20MS_SILK_WB]) + os.urandom(size), 960) for _ in range(int(seconds * 50))
+    ]
+    return write_opus(head, tags, packets)
+
+
+def route(info) -> str:
+    if info.duration is None:
+        return "short path (unknown length)"
+    if info.duration < config.speech_min_seconds:
+        return "skip (too short)"
+    if info.fully_sampled and info.voiced_ratio < config.speech_min_voiced_ratio:
+        return "skip (silent)"
+    if info.duration > config.speech_sync_max_seconds:
+        return "long path"
+    return "short path"
+
+
+def main(iterations: int) -> None:
+    cases = [
+        ("tap 0.4s", note(0.4)),
+        ("silent 2.5s", note(2.5, silent=True)),
+        ("silent 8s", note(8, silent=True)),
+        ("speech 15s", note(15)),
+        ("speech 60s", note(60)),
+        ("speech 300s", note(300)),
+    ]
+    for label, data in cases:
+        info = inspect_opus(data)
+        inspect_us = timeit.timeit(lambda: inspect_opus(data), number=iterations) / iterations * 1e6
+        parse_us = timeit.timeit(lambda: read_opus(data), number=max(1, iterations // 100)) / max(1, iterations // 100) * 1e6
+        print(
+            f"{label:<12} {len(data) / 1024:7.1f} KiB  duration={info.duration:6.2f}s  "
+            f"rate={info.speech_sample_rate}  voiced={info.voiced_ratio:4.2f}  "
+            f"inspect={inspect_us:7.1f}µs  full parse={parse_us:9.1f}µs  -> {route(info)}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
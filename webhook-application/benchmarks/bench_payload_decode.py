@@ -0,0 +1,105 @@
+"""
+Benchmark: decode + validate cost per webhook payload.
+
+Decodes the same raw bodies (a text message, a voice note, and a batch of
+five messages) with:
+  - ``json.loads`` + ``WhatsAppWebhookPayload.model_validate`` (Pydantic tree)
+  - ``decode_compact_payload`` (``__slots__`` types, lazy content)
+
+and reads what the handlers read (sender, id, type, timestamp and the text
+body or audio id). Reports time per payload and allocations per payload
+(blocks and bytes still alive while the decoded payload is held, via
+``tracemalloc``).
+
+Usage:
+    uv run python benchmarks/bench_payload_decode.py [iterations]
+"""
+import json
+import sys
+import timeit
+import tracemalloc
+
+from whatsapp_webhook.models.compact import decode_compact_payload
+from whatsapp_webhook.models.messages import WhatsAppWebhookPayload
+
+
+def _message(i: int, kind: str) -> dict:
+    message = {"from": "56912345678", "id": f"wamid.HBgL{i:020d}", "timestamp": "1718000000", "type": kind}
+    if kind == "text":
+        message["text"] = {"body": "¿Cuándo debo aplicar fungicida al trigo?"}
+    else:
+        message["audio"] = {
+            "mime_type": "audio/ogg; codecs=opus",
+            "sha256": "Yb1kRn0b5sQ0uY1yMZ1RZ1oPz6wJw0HkPqXGm3oW2nE=",
+            "id": f"{i:016d}",
+            "voice": True,
+        }
+    return message
+
+
+def _payload(messages: list) -> bytes:
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "102290129340398",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                    "contacts": [{"profile": {"name": "Agricultor"}, "wa_id": "56912345678"}],
+                    "messages": messages,
+                },
+            }],
+        }],
+    }).encode()
+
+
+def _pydantic(body: bytes):
+    payload = WhatsAppWebhookPayload.model_validate(json.loads(body))
+    _read(payload)
+    return payload
+
+
+def _compact(body: bytes):
+    payload = decode_compact_payload(body)
+    _read(payload)
+    return payload
+
+
+def _read(payload) -> None:
+    for sender, message in payload.get_all_messages():
+        (sender, message.id, message.type, message.timestamp)
+        if message.type == "text":
+            message.text.body
+        elif message.type == "audio":
+            (message.audio.id, message.audio.sha256)
+
+
+def _allocations(decode, body: bytes):
+    decode(body)  # warm caches
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    payload = decode(body)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    del payload
+    return sum(stat.count_diff for stat in stats), sum(stat.size_diff for stat in stats)
+
+
+def main(iterations: int) -> None:
+    cases = {
+        "text": _payload([_message(0, "text")]),
+        "audio": _payload([_message(0, "audio")]),
+        "batch of 5": _payload([_message(i, "text" if i % 2 else "audio") for i in range(5)]),
+    }
+    for label, body in cases.items():
+        for name, decode in (("pydantic", _pydantic), ("compact", _compact)):
+            seconds = timeit.timeit(lambda: decode(body), number=iterations) / iterations
+            blocks, size = _allocations(decode, body)
+            print(f"{label:<11} {name:<9} {seconds * 1e6:7.1f}µs/payload  {blocks:4d} blocks  {size:6d} bytes")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
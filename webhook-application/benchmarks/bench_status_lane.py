@@ -0,0 +1,106 @@
+"""
+Benchmark: CPU per status-only webhook, with and without the fast lane.
+
+Handles N delivery-receipt payloads:
+  - slow path: JSON decode, dedup scan, journal insert, and later the
+    ingress worker decoding the payload only to find no messages
+  - fast lane: raw-body pre-classification and inline status aggregation
+
+CPU time (``time.process_time``) is reported for the handlers alone and
+for the whole endpoint, posted in process through ``httpx.ASGITransport``.
+
+Usage:
+    uv run python benchmarks/bench_status_lane.py [requests]
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("INGRESS_QUEUE_PATH", os.path.join(tempfile.mkdtemp(), "ingress.db"))
+
+import httpx
+
+from whatsapp_webhook import messages
+from whatsapp_webhook.app import create_app
+from whatsapp_webhook.processing.statuses import is_status_only
+from whatsapp_webhook.utils.app_config import config
+
+
+def status_payload(i: int) -> bytes:
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "102290129340398",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "15550783881", "phone_number_id": "106540352242922"},
+                    "statuses": [{
+                        "id": f"wamid.HBgLNTY5MTIzNDU2NzgVAgARGBI{i:012d}",
+                        "status": "delivered",
+                        "timestamp": "1718000003",
+                        "recipient_id": "56912345678",
+                        "conversation": {"id": "0b7e7a3c1b9b", "origin": {"type": "service"}},
+                        "pricing": {"billable": True, "pricing_model": "CBP", "category": "service"},
+                    }],
+                },
+            }],
+        }],
+    }).encode()
+
+
+async def _post_all(client: httpx.AsyncClient, bodies) -> None:
+    for body in bodies:
+        response = await client.post("/estandar_aa_webhook", content=body)
+        response.raise_for_status()
+
+
+async def _slow_handler(body: bytes) -> None:
+    await messages.receive_message_aa(body)
+    # What the ingress worker later spends on the journaled payload
+    await messages._handle_ingress_job(config.aa_app_name, body)
+
+
+async def _fast_handler(body: bytes) -> None:
+    if is_status_only(body):
+        messages.receive_status_update(body, config.aa_app_name)
+
+
+async def _handler_cpu(handler, bodies) -> float:
+    start = time.process_time()
+    for body in bodies:
+        await handler(body)
+    return (time.process_time() - start) / len(bodies)
+
+
+async def _endpoint_cpu(fast_lane: bool, bodies) -> float:
+    config.status_fast_lane = fast_lane
+    app = create_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        await _post_all(client, bodies[:50])  # warm up
+        start = time.process_time()
+        await _post_all(client, bodies)
+        cpu = time.process_time() - start
+    if not fast_lane:
+        cpu += await _handler_cpu(lambda body: messages._handle_ingress_job(config.aa_app_name, body), bodies) * len(bodies)
+    return cpu / len(bodies)
+
+
+async def main(requests: int) -> None:
+    bodies = [status_payload(i) for i in range(requests)]
+    slow = await _handler_cpu(_slow_handler, bodies)
+    fast = await _handler_cpu(_fast_handler, [status_payload(requests + i) for i in range(requests)])
+    print(f"handler   slow path {slow * 1e6:7.1f}µs  fast lane {fast * 1e6:6.1f}µs  ({slow / fast:4.1f}x less CPU)")
+    slow = await _endpoint_cpu(False, [status_payload(2 * requests + i) for i in range(requests)])
+    fast = await _endpoint_cpu(True, [status_payload(3 * requests + i) for i in range(requests)])
+    print(f"endpoint  slow path {slow * 1e6:7.1f}µs  fast lane {fast * 1e6:6.1f}µs  ({slow / fast:4.1f}x less CPU, "
+          "includes the in-process HTTP client and FastAPI routing)")
+    messages.ingress_queue.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
@@ -0,0 +1,88 @@
+"""
+Benchmark: /health latency while transcriptions are running.
+
+Runs N concurrent transcriptions against a stubbed Speech backend whose
+``recognize`` blocks for a fixed time (like the real gRPC call), and polls
+``/health`` on the same event loop meanwhile:
+  - blocking: ``recognize`` called directly on the event loop (previous behaviour)
+  - pooled: ``transcribe_audio_file`` with the shared client on the Speech pool
+
+With the blocking path /health waits for every transcription in turn; with
+the pooled path it keeps answering every ~50 ms poll.
+
+Usage:
+    uv run python benchmarks/bench_transcription_loop.py [transcriptions] [seconds_per_call]
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from google.cloud import speech
+
+from whatsapp_webhook import transcription
+from whatsapp_webhook.app import create_app
+
+
+class StubSpeechClient:
+    """Blocks like ``SpeechClient.recognize`` and returns a fixed transcript."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def recognize(self, config, audio, timeout=None):
+        time.sleep(self.seconds)
+        alternative = speech.SpeechRecognitionAlternative(transcript="hola")
+        return speech.RecognizeResponse(results=[speech.SpeechRecognitionResult(alternatives=[alternative])])
+
+
+async def _blocking_transcription(stub: StubSpeechClient) -> None:
+    stub.recognize(config=None, audio=None)
+
+
+async def _poll_health(client: httpx.AsyncClient, done: asyncio.Event) -> list:
+    """Request /health every 50 ms; return the time between consecutive answers."""
+    gaps = []
+    last = time.perf_counter()
+    while True:
+        response = await client.get("/health")
+        response.raise_for_status()
+        now = time.perf_counter()
+        gaps.append(now - last)
+        last = now
+        if done.is_set():
+            return gaps
+        await asyncio.sleep(0.05)
+
+
+async def _run(label: str, transcribe, transcriptions: int) -> None:
+    app = create_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        done = asyncio.Event()
+        poller = asyncio.create_task(_poll_health(client, done))
+        await asyncio.sleep(0)
+        start = time.perf_counter()
+        await asyncio.gather(*(transcribe() for _ in range(transcriptions)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        gaps = await poller
+    print(
+        f"{label:<10} transcriptions={elapsed:6.2f}s  health answers={len(gaps):4d}  "
+        f"gap p50={statistics.median(gaps) * 1000:8.2f}ms  max={max(gaps) * 1000:8.2f}ms"
+    )
+
+
+async def main(transcriptions: int, seconds: float) -> None:
+    stub = StubSpeechClient(seconds)
+    transcription._speech_client = stub
+    await _run("blocking", lambda: _blocking_transcription(stub), transcriptions)
+    await _run("pooled", lambda: transcription.transcribe_audio_file(b"OggS"), transcriptions)
+    transcription._speech_client = None
+    transcription.close_speech_client()
+
+
+if __name__ == "__main__":
+    transcriptions = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    asyncio.run(main(transcriptions, seconds))
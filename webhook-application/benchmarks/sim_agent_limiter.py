@@ -0,0 +1,157 @@
+"""
+Simulator: agent concurrency limit algorithms against a stub agent.
+
+The stub agent serves ``capacity(t)`` calls at once; further calls queue
+inside it (like Cloud Run requests waiting for an instance), each call takes
+``latency(t)`` seconds of service time (log-normal jitter), and the client
+gives up after ``AGENT_TIMEOUT`` seconds with ``httpx.ReadTimeout``. Calls
+arrive as a Poisson process at ``rate(t)`` per second.
+
+Every algorithm (fixed caps, AIMD, gradient) handles the same arrival curve
+through ``AdaptiveConcurrencyLimiter``. Reported: calls answered within the
+deadline (goodput), timeouts, end-to-end latency including the limiter
+queue, and how the limit moved.
+
+Time is scaled (``--scale 0.01`` runs one simulated second in 10 ms), so a
+few simulated minutes take a few seconds.
+
+Profiles:
+  steady      capacity 16, 2 s calls, load at 90% of capacity
+  cold_start  capacity 2 for the first 60 s, then 16; same load
+  degraded    calls take 2 s, then 5 s between 60 s and 120 s
+  night       light load (10% of capacity)
+
+Usage:
+    uv run python benchmarks/sim_agent_limiter.py [profile] [--seconds N] [--scale S]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+os.environ.setdefault("APP_URL", "http://127.0.0.1:8765")
+
+import httpx
+
+from whatsapp_webhook.external_services.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    AIMDLimit,
+    FixedLimit,
+    GradientLimit,
+)
+
+AGENT_TIMEOUT = 30.0
+
+PROFILES = {
+    "steady": dict(capacity=lambda t: 16, latency=lambda t: 2.0, rate=lambda t: 7.2),
+    "cold_start": dict(capacity=lambda t: 2 if t < 60 else 16, latency=lambda t: 2.0, rate=lambda t: 7.2),
+    "degraded": dict(capacity=lambda t: 16, latency=lambda t: 5.0 if 60 <= t < 120 else 2.0, rate=lambda t: 7.2),
+    "night": dict(capacity=lambda t: 16, latency=lambda t: 2.0, rate=lambda t: 0.8),
+}
+
+
+class StubAgent:
+    """Queueing model of the agent service."""
+
+    def __init__(self, profile: dict, scale: float, started: float):
+        self.profile = profile
+        self.scale = scale
+        self.started = started
+        self.busy = 0
+        self.changed = asyncio.Condition()
+
+    def now(self) -> float:
+        return (time.monotonic() - self.started) / self.scale
+
+    async def _serve(self) -> None:
+        async with self.changed:
+            await self.changed.wait_for(lambda: self.busy < self.profile["capacity"](self.now()))
+            self.busy += 1
+        try:
+            service = self.profile["latency"](self.now()) * random.lognormvariate(0, 0.25)
+            await asyncio.sleep(service * self.scale)
+        finally:
+            async with self.changed:
+                self.busy -= 1
+                self.changed.notify_all()
+
+    async def call(self) -> None:
+        try:
+            await asyncio.wait_for(self._serve(), AGENT_TIMEOUT * self.scale)
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout("stub agent timed out") from None
+
+
+async def _waker(agent: StubAgent, until: float) -> None:
+    # Capacity changes over time: wake queued calls when it does
+    while time.monotonic() < until:
+        await asyncio.sleep(agent.scale)
+        async with agent.changed:
+            agent.changed.notify_all()
+
+
+async def simulate(label: str, algorithm, profile: dict, seconds: float, scale: float, seed: int) -> None:
+    random.seed(seed)
+    limiter = AdaptiveConcurrencyLimiter(algorithm, name=label)
+    started = time.monotonic()
+    agent = StubAgent(profile, scale, started)
+    latencies, timeouts, limits = [], 0, []
+    tasks = []
+
+    async def one() -> None:
+        nonlocal timeouts
+        begin = time.monotonic()
+        try:
+            async with limiter.acquire():
+                await agent.call()
+        except httpx.ReadTimeout:
+            timeouts += 1
+            return
+        latencies.append((time.monotonic() - begin) / scale)
+
+    async def sample_limit() -> None:
+        while True:
+            limits.append(limiter.limit)
+            await asyncio.sleep(scale)
+
+    waker = asyncio.create_task(_waker(agent, started + seconds * scale * 2))
+    sampler = asyncio.create_task(sample_limit())
+    while agent.now() < seconds:
+        tasks.append(asyncio.create_task(one()))
+        await asyncio.sleep(random.expovariate(profile["rate"](agent.now())) * scale)
+    sampler.cancel()
+    await asyncio.gather(*tasks)
+    waker.cancel()
+
+    latencies.sort()
+    good = sum(1 for latency in latencies if latency <= AGENT_TIMEOUT)
+    p99 = latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan")
+    print(
+        f"{label:<10} calls={len(tasks):5d}  goodput={good / len(tasks):6.1%}  timeouts={timeouts:4d}  "
+        f"p50={statistics.median(latencies) if latencies else float('nan'):6.1f}s  p99={p99:6.1f}s  "
+        f"limit mean={statistics.mean(limits):5.1f} min={min(limits):3d} max={max(limits):3d}"
+    )
+
+
+async def main(profile_name: str, seconds: float, scale: float) -> None:
+    profile = PROFILES[profile_name]
+    print(f"profile={profile_name}  {seconds:.0f} simulated seconds")
+    algorithms = {
+        "fixed 4": lambda: FixedLimit(4),
+        "fixed 64": lambda: FixedLimit(64),
+        "aimd": lambda: AIMDLimit(8, 2, 64, latency_threshold=10.0),
+        "gradient": lambda: GradientLimit(8, 2, 64),
+    }
+    for label, build in algorithms.items():
+        await simulate(label, build(), profile, seconds, scale, seed=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("profile", nargs="?", default="cold_start", choices=sorted(PROFILES))
+    parser.add_argument("--seconds", type=float, default=180.0)
+    parser.add_argument("--scale", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.profile, args.seconds, args.scale))
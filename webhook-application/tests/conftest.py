@@ -0,0 +1,26 @@
+"""
+Shared test setup.
+
+The configuration is loaded when ``whatsapp_webhook`` is imported, so the
+required variables get placeholder values here, before any test module
+imports the package. State files go to a temporary directory.
+"""
+import os
+import tempfile
+
+_state_dir = tempfile.mkdtemp(prefix="whatsapp_webhook_tests_")
+
+for name, value in {
+    "APP_URL": "http://agent.test",
+    "VERIFY_TOKEN": "verify-token",
+    "WSP_TOKEN": "wsp-token",
+    "ESTANDAR_AA_FACEBOOK_APP": "http://graph.test/aa",
+    "ESTANDAR_AA_APP_NAME": "agent_aa",
+    "ESTANDAR_PP_FACEBOOK_APP": "http://graph.test/pp",
+    "ESTANDAR_PP_APP_NAME": "agent_pp",
+    "LOG_LEVEL": "WARNING",
+    "INGRESS_QUEUE_PATH": os.path.join(_state_dir, "ingress.db"),
+    "SESSION_CACHE_PATH": "",
+    "MEDIA_CACHE_DIR": "",
+}.items():
+    os.environ.setdefault(name, value)
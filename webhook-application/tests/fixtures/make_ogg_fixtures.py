@@ -0,0 +1,57 @@
+"""
+Regenerate the synthetic Ogg Opus voice notes used by the tests.
+
+The packets are not real Opus audio, only valid TOC bytes and sizes: each
+speech packet carries its index so a fake backend can "hear" it, and quiet
+packets are a few bytes long like Opus silence.
+
+Usage:
+    uv run python tests/fixtures/make_ogg_fixtures.py
+"""
+import os
+import struct
+
+from whatsapp_webhook.media.ogg import OpusHead, OpusPacket, write_opus
+
+PACKETS_PER_SECOND = 50
+TOC_20MS_CELT = 0xF8
+FIXTURES = os.path.dirname(os.path.abspath(__file__))
+
+
+def note(seconds: float, quiet, granules: bool = True) -> bytes:
+    """
+    Build a 16 kHz mono note; ``quiet(index)`` tells which packets are silence.
+
+    Without ``granules`` every page has granule position 0, so the length of
+    the note cannot be read from the container.
+    """
+    pre_skip = 312 if granules else 0
+    head_raw = b"OpusHead" + struct.pack("<BBHIhB", 1, 1, pre_skip, 16000, 0, 0)
+    head = OpusHead(channels=1, pre_skip=pre_skip, input_sample_rate=16000, raw=head_raw)
+    tags = b"OpusTags" + struct.pack("<II", 0, 0)
+    packets = []
+    for index in range(int(seconds * PACKETS_PER_SECOND)):
+        padding = b"" if quiet(index) else bytes(range(20))
+        packets.append(OpusPacket(bytes([TOC_20MS_CELT]) + struct.pack("<I", index) + padding, 960 if granules else 0))
+    return write_opus(head, tags, packets)
+
+
+NOTES = {
+    # Speech with a 200 ms pause every 4.5 seconds, where the chunker can cut
+    "speech_12s.ogg": lambda: note(12, lambda index: index % (4.5 * PACKETS_PER_SECOND) < 10),
+    "tap_0.4s.ogg": lambda: note(0.4, lambda index: False),
+    "silent_2s.ogg": lambda: note(2, lambda index: True),
+    "silent_2s_no_granule.ogg": lambda: note(2, lambda index: True, granules=False),
+    # Five seconds of silence, longer than the sample inspect_opus reads, then speech
+    "silent_then_speech_20s.ogg": lambda: note(20, lambda index: index < 5 * PACKETS_PER_SECOND),
+}
+
+
+def main() -> None:
+    for name, build in NOTES.items():
+        with open(os.path.join(FIXTURES, name), "wb") as f:
+            f.write(build())
+
+
+if __name__ == "__main__":
+    main()
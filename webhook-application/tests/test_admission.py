@@ -0,0 +1,123 @@
+import asyncio
+import time
+
+import pytest
+
+from whatsapp_webhook.processing.admission import AdmissionController, AdmissionRejectedError
+from whatsapp_webhook.processing.sender_scheduler import SenderScheduler
+
+
+async def noop():
+    pass
+
+
+async def test_admits_up_to_max_inflight_without_waiting():
+    controller = AdmissionController("app", max_inflight=2, max_queue_wait=1)
+
+    await controller.acquire()
+    await controller.acquire()
+
+    assert controller.inflight == 2
+    assert controller.queued == 0
+
+
+async def test_sheds_when_the_queue_is_full():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=1, max_queued=1)
+    await controller.acquire()
+    waiting = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejectedError) as info:
+        await controller.acquire()
+
+    assert info.value.reason == "queue_full"
+    assert controller.shed == 1
+    waiting.cancel()
+
+
+async def test_sheds_after_max_queue_wait():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=0.05)
+    await controller.acquire()
+
+    with pytest.raises(AdmissionRejectedError) as info:
+        await controller.acquire()
+
+    assert info.value.reason == "queue_timeout"
+    assert controller.queued == 0
+
+
+async def test_queue_wait_counts_from_queued_at():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=5)
+    await controller.acquire()
+
+    with pytest.raises(AdmissionRejectedError):
+        await controller.acquire(queued_at=time.monotonic() - 10)
+
+
+async def test_release_hands_the_slot_to_the_oldest_waiter():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=1)
+    await controller.acquire()
+    first = asyncio.create_task(controller.acquire())
+    second = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    controller.release()
+    await first
+
+    assert not second.done()
+    assert controller.inflight == 1
+    controller.release()
+    await second
+    controller.release()
+    assert controller.inflight == 0
+
+
+async def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=1)
+    await controller.acquire()
+    cancelled = asyncio.create_task(controller.acquire())
+    await asyncio.sleep(0)
+
+    # The slot is handed over, then the waiter is cancelled before it resumes
+    controller.release()
+    cancelled.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await cancelled
+
+    assert controller.inflight == 0
+    await controller.acquire()
+    assert controller.inflight == 1
+
+
+async def test_shed_work_fails_with_admission_error():
+    controller = AdmissionController("app", max_inflight=1, max_queue_wait=10, max_queued=0)
+    scheduler = SenderScheduler(admission=lambda key: controller)
+    release = asyncio.Event()
+
+    async def hold():
+        await release.wait()
+
+    running = scheduler.submit("alice", 1.0, hold)
+    await asyncio.sleep(0)
+    shed = scheduler.submit("bob", 1.0, noop)
+
+    with pytest.raises(AdmissionRejectedError):
+        await shed
+    release.set()
+    await running
+    assert controller.inflight == 0
+
+
+async def test_waiting_behind_the_same_sender_does_not_count_as_queue_wait():
+    controller = AdmissionController("app", max_inflight=4, max_queue_wait=0.05)
+    scheduler = SenderScheduler(admission=lambda key: controller)
+
+    async def long_turn():
+        await asyncio.sleep(0.1)
+
+    first = scheduler.submit("alice", 1.0, long_turn)
+    second = scheduler.submit("alice", 2.0, noop)
+
+    await first
+    assert await second is None
+    assert controller.shed == 0
@@ -0,0 +1,44 @@
+import pytest
+from pydantic import ValidationError
+
+from whatsapp_webhook.utils.app_config import load_config_from_env
+
+STATE_VARS = ("INGRESS_QUEUE_PATH", "DEDUP_SQLITE_PATH", "SESSION_CACHE_PATH", "MEDIA_CACHE_DIR")
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.delenv("DEDUP_BACKEND", raising=False)
+    for name in STATE_VARS:
+        monkeypatch.delenv(name, raising=False)
+    return monkeypatch
+
+
+def test_dev_keeps_state_under_tmp(env):
+    env.setenv("ENVIRONMENT", "dev")
+    assert load_config_from_env().ingress_queue_path.startswith("/tmp/")
+
+
+def test_prd_refuses_state_under_tmp(env):
+    env.setenv("ENVIRONMENT", "prd")
+    with pytest.raises(ValidationError, match="INGRESS_QUEUE_PATH") as exc:
+        load_config_from_env()
+    assert "DEDUP_SQLITE_PATH" not in str(exc.value)
+
+
+def test_prd_accepts_the_mounted_volumes(env):
+    env.setenv("ENVIRONMENT", "prd")
+    env.setenv("DEDUP_BACKEND", "sqlite")
+    env.setenv("INGRESS_QUEUE_PATH", "/mnt/webhook-journal/ingress.db")
+    env.setenv("DEDUP_SQLITE_PATH", "/mnt/webhook-journal/dedup.db")
+    env.setenv("SESSION_CACHE_PATH", "/mnt/webhook-state/sessions.json")
+    env.setenv("MEDIA_CACHE_DIR", "/mnt/webhook-state/media_cache")
+    assert load_config_from_env().environment == "prd"
+
+
+def test_prd_allows_disabled_caches(env):
+    env.setenv("ENVIRONMENT", "prd")
+    env.setenv("INGRESS_QUEUE_PATH", "/mnt/webhook-journal/ingress.db")
+    env.setenv("SESSION_CACHE_PATH", "")
+    env.setenv("MEDIA_CACHE_DIR", "")
+    load_config_from_env()
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import time
+
+from whatsapp_webhook import messages
+from whatsapp_webhook.processing.burst_coalescer import BurstCoalescer
+from whatsapp_webhook.processing.task_registry import TaskRegistry
+
+WINDOW = 0.05
+
+
+def _coalescer(flushed, max_messages=5, registry=None):
+    async def flush(key, burst):
+        flushed.append((key, burst.take()))
+
+    return BurstCoalescer(window=WINDOW, max_messages=max_messages, flush=flush, registry=registry)
+
+
+async def test_texts_within_the_window_become_one_burst():
+    flushed = []
+    coalescer = _coalescer(flushed)
+
+    coalescer.add("alice", "hola", ("wamid.1", 1.0))
+    await asyncio.sleep(WINDOW / 2)
+    coalescer.add("alice", "tengo un problema", ("wamid.2", 2.0))
+    coalescer.add("bob", "buenas", ("wamid.3", 2.0))
+    await asyncio.sleep(WINDOW * 3)
+
+    assert sorted(flushed) == [("alice", "hola\ntengo un problema"), ("bob", "buenas")]
+
+
+async def test_each_text_restarts_the_window():
+    flushed = []
+    coalescer = _coalescer(flushed)
+
+    for i in range(4):
+        coalescer.add("alice", str(i), (f"wamid.{i}", float(i)))
+        await asyncio.sleep(WINDOW * 0.6)
+    assert flushed == []
+
+    await asyncio.sleep(WINDOW * 2)
+    assert flushed == [("alice", "0\n1\n2\n3")]
+
+
+async def test_max_messages_flushes_at_once():
+    flushed = []
+    coalescer = _coalescer(flushed, max_messages=2)
+
+    coalescer.add("alice", "uno", ("wamid.1", 1.0))
+    coalescer.add("alice", "dos", ("wamid.2", 2.0))
+    await asyncio.sleep(0)
+
+    assert flushed == [("alice", "uno\ndos")]
+
+
+async def test_text_joins_a_burst_whose_turn_has_not_started():
+    release = asyncio.Event()
+    taken = []
+
+    async def flush(key, burst):
+        await release.wait()
+        taken.append(burst.take())
+
+    coalescer = BurstCoalescer(window=WINDOW, max_messages=5, flush=flush)
+    coalescer.add("alice", "hola", ("wamid.1", 1.0))
+    await asyncio.sleep(WINDOW * 2)
+    coalescer.add("alice", "sigo", ("wamid.2", 2.0))
+    release.set()
+    await asyncio.sleep(0.01)
+
+    assert taken == ["hola\nsigo"]
+    assert coalescer.pending == 0
+
+
+async def test_turn_of_resolves_when_the_flush_ends():
+    coalescer = _coalescer([])
+    coalescer.add("alice", "hola", ("wamid.1", 1.0))
+
+    turn = coalescer.turn_of("wamid.1")
+
+    assert turn is not None and not turn.done()
+    assert await asyncio.wait_for(turn, 1) is True
+    assert coalescer.turn_of("wamid.1") is None
+
+
+async def test_stop_finishes_unflushed_bursts_as_not_completed():
+    coalescer = _coalescer([], registry=TaskRegistry("test"))
+    coalescer.add("alice", "hola", ("wamid.1", 1.0))
+    turn = coalescer.turn_of("wamid.1")
+
+    await coalescer.stop()
+
+    assert await turn is False
+
+
+async def test_window_of_zero_disables_coalescing():
+    coalescer = BurstCoalescer(window=0, max_messages=5, flush=None)
+
+    assert not coalescer.enabled
+
+
+def _text_payload(message_id, text):
+    return json.dumps({
+        "object": "whatsapp_business_account",
+        "entry": [{"id": "1", "changes": [{"field": "messages", "value": {
+            "messaging_product": "whatsapp",
+            "contacts": [{"wa_id": "56911111111"}],
+            "messages": [{
+                "from": "56911111111",
+                "id": message_id,
+                "timestamp": str(int(time.time())),
+                "type": "text",
+                "text": {"body": text},
+            }],
+        }}]}],
+    }).encode()
+
+
+async def test_journal_job_finishes_only_after_the_burst_turn(monkeypatch):
+    turn_started = asyncio.Event()
+    release = asyncio.Event()
+    answered = []
+
+    class FakeTurn:
+        def __init__(self, sender_wa_id, app_name, message_text):
+            self.message_text = message_text
+
+        async def run(self):
+            turn_started.set()
+            await release.wait()
+            answered.append(self.message_text)
+
+    async def no_receipt(*args):
+        pass
+
+    monkeypatch.setattr(messages.burst_coalescer, "window", WINDOW)
+    monkeypatch.setattr(messages, "_agent_turn", FakeTurn)
+    monkeypatch.setattr(messages, "_send_read_receipt", no_receipt)
+
+    first = asyncio.create_task(messages._process_webhook_in_background(_text_payload("wamid.a", "hola"), "agent_aa"))
+    second = asyncio.create_task(messages._process_webhook_in_background(_text_payload("wamid.b", "ayuda"), "agent_aa"))
+    await asyncio.wait_for(turn_started.wait(), 1)
+    await asyncio.sleep(0.01)
+
+    assert not first.done() and not second.done()
+    release.set()
+    await asyncio.wait_for(asyncio.gather(first, second), 1)
+    assert answered == ["hola\nayuda"]
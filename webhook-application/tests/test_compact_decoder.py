@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from whatsapp_webhook.models.compact import _CONTENT_MODELS, decode_compact_payload
+from whatsapp_webhook.models.messages import WhatsAppWebhookPayload
+
+PAYLOADS = json.loads((Path(__file__).parent / "fixtures" / "webhook_payloads.json").read_text(encoding="utf-8"))
+
+
+def _content_fields(model_content) -> dict:
+    return {**type(model_content).model_fields, **(model_content.model_extra or {})}
+
+
+@pytest.mark.parametrize("name", sorted(PAYLOADS))
+def test_compact_decoder_reads_what_pydantic_reads(name):
+    body = json.dumps(PAYLOADS[name]).encode()
+
+    compact = decode_compact_payload(body).get_all_messages()
+    model = WhatsAppWebhookPayload.model_validate(json.loads(body)).get_all_messages()
+
+    assert len(compact) == len(model)
+    for (compact_sender, compact_message), (sender, message) in zip(compact, model):
+        assert compact_sender == sender
+        for attribute in ("id", "type", "timestamp", "from_", "contacts"):
+            assert getattr(compact_message, attribute) == getattr(message, attribute)
+        assert compact_message.get_message_content() == message.get_message_content()
+        assert compact_message.is_text_message() == message.is_text_message()
+        for content_name in _CONTENT_MODELS:
+            model_content = getattr(message, content_name)
+            compact_content = getattr(compact_message, content_name)
+            assert (compact_content is None) == (model_content is None)
+            if model_content is not None:
+                for field in _content_fields(model_content):
+                    assert getattr(compact_content, field) == getattr(model_content, field), field
+                assert compact_content.to_model() == model_content
+        assert compact_message.to_model() == message
+
+
+def test_text_messages_match():
+    body = json.dumps(PAYLOADS["batch"]).encode()
+
+    compact = decode_compact_payload(body).get_text_messages()
+    model = WhatsAppWebhookPayload.model_validate(json.loads(body)).get_text_messages()
+
+    assert [(sender, message.id) for sender, message in compact] == [(sender, message.id) for sender, message in model]
@@ -0,0 +1,180 @@
+import asyncio
+import importlib
+import json
+
+import httpx
+import pytest
+
+from whatsapp_webhook.external_services.concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    AIMDLimit,
+    FixedLimit,
+    GradientLimit,
+)
+
+# The package re-exports some singletons under their module's name
+agent_client = importlib.import_module("whatsapp_webhook.external_services.agent_client")
+
+
+class RecordingLimit(FixedLimit):
+    def __init__(self, limit: int = 4):
+        super().__init__(limit)
+        self.samples = []
+
+    def on_sample(self, rtt, inflight, dropped):
+        self.samples.append((inflight, dropped))
+
+
+def test_aimd_grows_only_while_the_limit_is_used():
+    limit = AIMDLimit(initial=4, max_limit=6)
+
+    limit.on_sample(0.1, inflight=1, dropped=False)
+    assert limit.limit == 4
+    for _ in range(5):
+        limit.on_sample(0.1, inflight=4, dropped=False)
+    assert limit.limit == 6
+
+
+def test_aimd_backs_off_on_drops_and_slow_calls():
+    limit = AIMDLimit(initial=10, min_limit=8, backoff_ratio=0.9, latency_threshold=5)
+
+    limit.on_sample(0.1, inflight=10, dropped=True)
+    assert limit.limit == pytest.approx(9)
+    limit.on_sample(6.0, inflight=10, dropped=False)
+    assert limit.limit == pytest.approx(8.1)
+    limit.on_sample(0.1, inflight=10, dropped=True)
+    assert limit.limit == 8
+
+
+def test_gradient_shrinks_as_calls_slow_down_and_recovers():
+    limit = GradientLimit(initial=20)
+    for _ in range(20):
+        limit.on_sample(1.0, inflight=20, dropped=False)
+    steady = limit.limit
+
+    for _ in range(10):
+        limit.on_sample(4.0, inflight=int(limit.limit), dropped=False)
+    slowed = limit.limit
+    for _ in range(50):
+        limit.on_sample(1.0, inflight=int(limit.limit), dropped=False)
+
+    assert slowed < steady
+    assert limit.limit > slowed
+
+
+def test_gradient_ignores_latency_while_underused_and_backs_off_on_drops():
+    limit = GradientLimit(initial=20)
+
+    limit.on_sample(1.0, inflight=2, dropped=False)
+    limit.on_sample(10.0, inflight=2, dropped=False)
+    assert limit.limit == 20
+    limit.on_sample(1.0, inflight=2, dropped=True)
+    assert limit.limit == pytest.approx(18)
+
+
+async def test_calls_over_the_limit_wait_in_order():
+    limiter = AdaptiveConcurrencyLimiter(FixedLimit(1))
+    order = []
+
+    async def call(label):
+        async with limiter.acquire():
+            order.append(label)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call(i) for i in range(3)))
+
+    assert order == [0, 1, 2]
+    assert limiter.inflight == 0
+
+
+async def test_dropped_slot_and_errors_feed_the_algorithm():
+    algorithm = RecordingLimit()
+    limiter = AdaptiveConcurrencyLimiter(algorithm)
+
+    async with limiter.acquire():
+        pass
+    async with limiter.acquire() as slot:
+        slot.drop()
+    with pytest.raises(httpx.ReadTimeout):
+        async with limiter.acquire():
+            raise httpx.ReadTimeout("slow")
+    with pytest.raises(ValueError):
+        async with limiter.acquire():
+            raise ValueError("not an overload")
+
+    assert algorithm.samples == [(1, False), (1, True), (1, True)]
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    """Agent client wired to a fresh limiter, a fixed token and no retry backoff."""
+    algorithm = RecordingLimit()
+    limiter = AdaptiveConcurrencyLimiter(algorithm)
+    state = {"limiter": limiter, "samples": algorithm.samples, "inflight_outside": []}
+
+    async def get_id_token(audience):
+        state["inflight_outside"].append(limiter.inflight)
+        return "token"
+
+    monkeypatch.setattr(agent_client, "agent_limiter", limiter)
+    monkeypatch.setattr(agent_client, "get_id_token", get_id_token)
+    monkeypatch.setattr(agent_client.agent_dependency, "backoff", lambda retry: 0.01)
+    monkeypatch.setattr(agent_client.agent_dependency.breaker, "state", "closed")
+    return state
+
+
+def _run_reply(text):
+    return httpx.Response(200, json=[{"content": {"role": "model", "parts": [{"text": text}]}}])
+
+
+async def test_each_run_attempt_takes_its_own_slot(agent):
+    responses = iter([httpx.Response(503), _run_reply("hola")])
+    seen = []
+
+    def handler(request):
+        seen.append(agent["limiter"].inflight)
+        return next(responses)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await agent_client.send_to_agent("agent_aa", "u1", "s1", "hola", client=client)
+
+    assert result["response"] == "hola"
+    assert seen == [1, 1]
+    assert agent["samples"] == [(1, True), (1, False)]
+    assert agent["limiter"].inflight == 0
+
+
+async def test_session_is_recreated_without_holding_a_slot(agent):
+    session_lookups = []
+    runs = iter([httpx.Response(404, text="Session not found"), _run_reply("hola")])
+
+    def handler(request):
+        if request.url.path.endswith("/run"):
+            return next(runs)
+        session_lookups.append(agent["limiter"].inflight)
+        return httpx.Response(200, json={"id": "s1"})
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        result = await agent_client.send_to_agent("agent_aa", "u1", "s1", "hola", client=client)
+
+    assert result["response"] == "hola"
+    assert session_lookups == [0]
+    assert len(agent["samples"]) == 2
+
+
+async def test_stream_releases_its_slot_before_refreshing_the_token(agent, monkeypatch):
+    monkeypatch.setattr(agent_client.id_token_cache, "invalidate", lambda audience: None)
+    event = json.dumps({"content": {"role": "model", "parts": [{"text": "hola"}]}})
+    responses = iter([
+        httpx.Response(401),
+        httpx.Response(200, text=f"data: {event}\n\n", headers={"Content-Type": "text/event-stream"}),
+    ])
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(lambda request: next(responses))) as client:
+        texts = [text async for text in agent_client.stream_agent_text("agent_aa", "u1", "s1", "hola", client=client)]
+
+    assert texts == ["hola"]
+    # The first token, then the refresh after the 401
+    assert agent["inflight_outside"] == [0, 0]
+    assert len(agent["samples"]) == 2
+    assert agent["limiter"].inflight == 0
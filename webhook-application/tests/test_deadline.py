@@ -0,0 +1,90 @@
+import asyncio
+import time
+
+import pytest
+
+from whatsapp_webhook import messages
+from whatsapp_webhook.models.compact import CompactMessage
+from whatsapp_webhook.utils.deadline import (
+    DeadlineExceededError,
+    deadline_stage,
+    message_deadline,
+    remaining,
+)
+
+
+async def test_without_a_deadline_stages_are_unbounded():
+    async with deadline_stage("agent_run"):
+        assert remaining() is None
+        await asyncio.sleep(0.01)
+
+
+async def test_stage_running_past_the_deadline_is_cancelled():
+    cancelled = []
+
+    async def agent_call():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with message_deadline(0.05):
+        with pytest.raises(DeadlineExceededError) as info:
+            async with deadline_stage("agent_run"):
+                await agent_call()
+
+    assert info.value.stage == "agent_run"
+    assert cancelled == [True]
+
+
+async def test_exhausted_budget_fails_the_next_stage_before_it_starts():
+    started = []
+
+    with message_deadline(0.01):
+        await asyncio.sleep(0.02)
+        with pytest.raises(DeadlineExceededError) as info:
+            async with deadline_stage("send_reply"):
+                started.append(True)
+
+    assert info.value.stage == "send_reply"
+    assert started == []
+
+
+async def test_time_since_the_message_was_sent_counts_up_to_half_the_budget():
+    with message_deadline(10, received_at=time.time() - 2):
+        assert remaining() == pytest.approx(8, abs=0.1)
+    with message_deadline(10, received_at=time.time() - 3600):
+        assert remaining() == pytest.approx(5, abs=0.1)
+    assert remaining() is None
+
+
+async def test_a_timeout_of_the_stage_itself_is_not_a_deadline_expiry():
+    with message_deadline(10):
+        with pytest.raises(TimeoutError):
+            async with deadline_stage("agent_run"):
+                async with asyncio.timeout(0.01):
+                    await asyncio.sleep(1)
+
+
+async def test_message_past_its_deadline_gets_an_error_reply(monkeypatch):
+    replies = []
+
+    async def slow_processing(sender_wa_id, message, app_name):
+        async with deadline_stage("agent_run"):
+            await asyncio.sleep(10)
+
+    async def acknowledgment(sender_wa_id, text, app_name):
+        replies.append((sender_wa_id, text))
+
+    monkeypatch.setattr(messages.config, "message_deadline", 0.05)
+    monkeypatch.setattr(messages, "process_message", slow_processing)
+    monkeypatch.setattr(messages, "_send_whatsapp_acknowledgment", acknowledgment)
+    message = CompactMessage({
+        "from": "56911111111", "id": "wamid.late", "timestamp": str(int(time.time())),
+        "type": "text", "text": {"body": "hola"},
+    })
+
+    await asyncio.wait_for(messages._process_message_safely("56911111111", message, "agent_aa"), 1)
+
+    assert replies == [("56911111111", "Error procesando mensaje.")]
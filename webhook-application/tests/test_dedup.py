@@ -0,0 +1,74 @@
+from types import SimpleNamespace
+
+import pytest
+
+from whatsapp_webhook.processing import dedup
+from whatsapp_webhook.processing.dedup import MessageDeduplicator, SQLiteDedupBackend
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(dedup, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+async def test_duplicate_is_dropped_within_the_ttl(clock):
+    deduplicator = MessageDeduplicator(ttl=60)
+
+    assert await deduplicator.claim("wamid.1")
+    clock.now += 59
+    assert not await deduplicator.claim("wamid.1")
+
+
+async def test_id_is_accepted_again_after_the_ttl(clock):
+    deduplicator = MessageDeduplicator(ttl=60)
+
+    assert await deduplicator.claim("wamid.1")
+    clock.now += 61
+    assert await deduplicator.claim("wamid.1")
+
+
+async def test_oldest_ids_are_evicted_beyond_max_entries(clock):
+    deduplicator = MessageDeduplicator(ttl=60, max_entries=2)
+
+    for message_id in ("wamid.1", "wamid.2", "wamid.3"):
+        await deduplicator.claim(message_id)
+
+    assert len(deduplicator) == 2
+    assert await deduplicator.claim("wamid.1")
+
+
+async def test_forget_releases_a_claimed_id(clock):
+    deduplicator = MessageDeduplicator(ttl=60)
+    await deduplicator.claim("wamid.1")
+
+    await deduplicator.forget(["wamid.1"])
+
+    assert await deduplicator.claim("wamid.1")
+
+
+async def test_filter_payload_drops_seen_messages(clock):
+    deduplicator = MessageDeduplicator(ttl=60)
+    await deduplicator.claim("wamid.1")
+    payload = {"entry": [{"changes": [{"value": {"messages": [{"id": "wamid.1"}, {"id": "wamid.2"}]}}]}]}
+
+    claimed, dropped = await deduplicator.filter_payload(payload)
+
+    assert claimed == ["wamid.2"]
+    assert dropped == 1
+    assert payload["entry"][0]["changes"][0]["value"]["messages"] == [{"id": "wamid.2"}]
+
+
+async def test_sqlite_backend_shares_ids_until_the_ttl(clock, tmp_path):
+    path = str(tmp_path / "dedup.db")
+    first = MessageDeduplicator(ttl=60, backend=SQLiteDedupBackend(path))
+    second = MessageDeduplicator(ttl=60, backend=SQLiteDedupBackend(path))
+
+    assert await first.claim("wamid.1")
+    assert not await second.claim("wamid.1")
+    clock.now += 61
+    assert await second.claim("wamid.1")
+
+    await first.close()
+    await second.close()
@@ -0,0 +1,104 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from google.auth.compute_engine import _metadata
+
+from whatsapp_webhook.auth.google_auth import IDTokenCache
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _jwt(audience: str, exp: float) -> str:
+    header = _b64(json.dumps({"alg": "RS256", "typ": "JWT"}).encode())
+    payload = _b64(json.dumps({"aud": audience, "exp": int(exp)}).encode())
+    return f"{header}.{payload}.{_b64(b'signature')}"
+
+
+@pytest.fixture
+def metadata_server(monkeypatch):
+    """Local metadata-server stand-in serving the identity endpoint."""
+    server_state = {"requests": [], "lifetime": 3600, "delay": 0.0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/computeMetadata/v1/instance/service-accounts/default/":
+                body = json.dumps({"email": "webhook@example.iam.gserviceaccount.com", "scopes": []}).encode()
+                content_type = "application/json"
+            elif url.path == "/computeMetadata/v1/instance/service-accounts/default/identity":
+                audience = parse_qs(url.query)["audience"][0]
+                server_state["requests"].append(audience)
+                time.sleep(server_state["delay"])
+                body = _jwt(audience, time.time() + server_state["lifetime"]).encode()
+                content_type = "text/plain"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Metadata-Flavor", "Google")
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(_metadata, "_GCE_METADATA_HOST", f"127.0.0.1:{server.server_address[1]}")
+    yield server_state
+    server.shutdown()
+    server.server_close()
+
+
+async def test_token_is_fetched_once_and_then_served_from_cache(metadata_server):
+    cache = IDTokenCache()
+
+    first = await cache.get("https://agent.example")
+    second = await cache.get("https://agent.example")
+
+    assert first == second
+    assert metadata_server["requests"] == ["https://agent.example"]
+
+
+async def test_concurrent_misses_share_one_refresh(metadata_server):
+    metadata_server["delay"] = 0.1
+    cache = IDTokenCache()
+
+    tokens = await asyncio.gather(*(cache.get("https://agent.example") for _ in range(5)))
+
+    assert len(set(tokens)) == 1
+    assert metadata_server["requests"] == ["https://agent.example"]
+
+
+async def test_token_close_to_expiry_is_refreshed_in_the_background(metadata_server):
+    metadata_server["lifetime"] = 120
+    cache = IDTokenCache(refresh_ahead=300, min_validity=30)
+    stale = await cache.get("https://agent.example")
+
+    metadata_server["lifetime"] = 3600
+    served = await cache.get("https://agent.example")
+    await asyncio.sleep(0.2)
+
+    assert served == stale
+    assert len(metadata_server["requests"]) == 2
+    assert await cache.get("https://agent.example") != stale
+
+
+async def test_invalidate_forces_a_new_token(metadata_server):
+    cache = IDTokenCache()
+    await cache.get("https://agent.example")
+
+    cache.invalidate("https://agent.example")
+    await cache.get("https://agent.example")
+
+    assert len(metadata_server["requests"]) == 2
@@ -0,0 +1,59 @@
+"""
+Transcriptions must not block the event loop.
+
+Speech ``recognize`` is a blocking call; it runs on the Speech thread pool,
+so the service keeps answering (health checks, webhooks) while voice notes
+are being transcribed.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from whatsapp_webhook import transcription
+from whatsapp_webhook.app import create_app
+
+RECOGNIZE_SECONDS = 0.5
+
+
+class BlockingSpeechClient:
+    """Stands in for ``speech.SpeechClient``: ``recognize`` blocks its thread."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def recognize(self, config, audio, timeout):
+        self.calls += 1
+        time.sleep(RECOGNIZE_SECONDS)
+        alternative = SimpleNamespace(transcript="hola")
+        return SimpleNamespace(results=[SimpleNamespace(alternatives=[alternative])])
+
+
+@pytest.fixture
+def speech_client(monkeypatch):
+    client = BlockingSpeechClient()
+    monkeypatch.setattr(transcription, "get_speech_client", lambda: client)
+    yield client
+    transcription.close_speech_client()
+
+
+async def test_health_responds_while_transcriptions_run(speech_client):
+    backend = transcription.GoogleSpeechBackend()
+    transport = httpx.ASGITransport(app=create_app())
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        transcriptions = [
+            asyncio.create_task(backend.transcribe(b"OggS", 48000)) for _ in range(4)
+        ]
+        await asyncio.sleep(0.05)
+
+        started = time.perf_counter()
+        response = await client.get("/health")
+        elapsed = time.perf_counter() - started
+
+        assert response.status_code == 200
+        assert elapsed < RECOGNIZE_SECONDS / 2
+        assert not any(task.done() for task in transcriptions)
+        assert await asyncio.gather(*transcriptions) == ["hola"] * 4
+    assert speech_client.calls == 4
@@ -0,0 +1,37 @@
+import httpx
+
+from whatsapp_webhook.external_services import http_clients
+
+
+async def test_pool_stats_reports_the_shared_pools():
+    await http_clients.open_http_clients()
+    try:
+        stats = http_clients.pool_stats()
+    finally:
+        await http_clients.close_http_clients()
+
+    assert stats["agent"]["connections"] == 0
+    assert stats["agent"]["saturation"] == 0
+    assert stats["graph"]["max_connections"] > 0
+
+
+async def test_pool_stats_falls_back_when_the_pool_cannot_be_read(monkeypatch):
+    warnings = []
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200)))
+    monkeypatch.setattr(http_clients, "_clients", {"custom": client})
+    monkeypatch.setattr(http_clients, "_limits", {"custom": httpx.Limits(max_connections=4)})
+    monkeypatch.setattr(http_clients, "_unreadable_pools", set())
+    monkeypatch.setattr(http_clients.logger, "warning", warnings.append)
+
+    first = http_clients.pool_stats()
+    http_clients.pool_stats()
+    await client.aclose()
+
+    assert first["custom"] == {
+        "connections": None,
+        "active": None,
+        "idle": None,
+        "max_connections": 4,
+        "saturation": None,
+    }
+    assert len(warnings) == 1
@@ -0,0 +1,219 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from whatsapp_webhook.processing.ingress_queue import IngressQueue, IngressQueueFullError
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = IngressQueue(str(tmp_path / "ingress.db"), workers=1, max_attempts=2, poll_interval=0.05)
+    queue.open()
+    yield queue
+    queue.close()
+
+
+def _dead_jobs(queue):
+    return queue._conn.execute("SELECT id, attempts FROM dead_jobs").fetchall()
+
+
+async def test_lease_hides_the_job_until_released(queue):
+    job_id = await queue.enqueue("app", b"{}")
+
+    leased = queue._lease()
+    assert leased[0] == job_id
+    assert leased[3] == 1
+    assert queue._lease() is None
+
+    queue._release(job_id)
+    assert queue._lease()[3] == 2
+
+
+async def test_release_with_delay_keeps_the_job_hidden(queue):
+    job_id = await queue.enqueue("app", b"{}")
+    queue._lease()
+
+    queue._release(job_id, delay=60)
+
+    assert queue._lease() is None
+    assert queue.pending == 1
+
+
+async def test_enqueue_with_delay(queue):
+    await queue.enqueue("app", b"{}", delay=60)
+
+    assert queue._lease() is None
+    assert queue.pending == 1
+
+
+async def test_ack_removes_the_job(queue):
+    job_id = await queue.enqueue("app", b"{}")
+    queue._lease()
+
+    queue._ack(job_id)
+
+    assert queue.pending == 0
+    assert queue._lease() is None
+
+
+async def test_bury_moves_the_job_to_dead_letters(queue):
+    job_id = await queue.enqueue("app", b"{}")
+    queue._lease()
+
+    queue._bury(job_id)
+
+    assert queue.pending == 0
+    assert _dead_jobs(queue) == [(job_id, 1)]
+
+
+async def test_enqueue_refuses_jobs_beyond_max_pending(tmp_path):
+    queue = IngressQueue(str(tmp_path / "ingress.db"), max_pending=1)
+    await queue.enqueue("app", b"{}")
+
+    with pytest.raises(IngressQueueFullError):
+        await queue.enqueue("app", b"{}")
+    queue.close()
+
+
+async def test_jobs_survive_a_restart(tmp_path):
+    path = str(tmp_path / "ingress.db")
+    queue = IngressQueue(path)
+    await queue.enqueue("app", b'{"a": 1}')
+    queue.close()
+
+    reopened = IngressQueue(path)
+    reopened.open()
+
+    assert reopened.pending == 1
+    assert reopened._lease()[2] == b'{"a": 1}'
+    reopened.close()
+
+
+async def test_workers_process_and_acknowledge_jobs(queue):
+    handled = []
+
+    async def handler(app_name, body):
+        handled.append((app_name, body))
+
+    await queue.enqueue("app", b"payload")
+    await queue.start(handler)
+    for _ in range(50):
+        if queue.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert handled == [("app", b"payload")]
+    assert queue.pending == 0
+
+
+async def test_failing_job_is_retried_then_buried(queue):
+    attempts = []
+
+    async def handler(app_name, body):
+        attempts.append(body)
+        raise RuntimeError("boom")
+
+    job_id = await queue.enqueue("app", b"payload")
+    await queue.start(handler)
+    for _ in range(50):
+        if len(attempts) == 1:
+            break
+        await asyncio.sleep(0.01)
+    # Skip the retry backoff
+    await queue._run(queue._release, job_id)
+    for _ in range(50):
+        if queue.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+    queue.open()
+
+    assert len(attempts) == 2
+    assert _dead_jobs(queue) == [(job_id, 2)]
+
+
+async def test_stop_releases_the_job_in_flight(queue):
+    started = asyncio.Event()
+
+    async def handler(app_name, body):
+        started.set()
+        await asyncio.sleep(10)
+
+    await queue.enqueue("app", b"payload")
+    await queue.start(handler)
+    await started.wait()
+    await queue.stop()
+    queue.open()
+
+    assert queue.pending == 1
+    assert queue._lease() is not None
+
+
+async def test_drain_stops_leasing_and_waits_for_jobs_in_flight(queue):
+    release = asyncio.Event()
+    handled = []
+
+    async def handler(app_name, body):
+        await release.wait()
+        handled.append(body)
+
+    await queue.enqueue("app", b"first")
+    await queue.start(handler)
+    for _ in range(50):
+        if queue.inflight:
+            break
+        await asyncio.sleep(0.01)
+    await queue.enqueue("app", b"second")
+    drain = asyncio.create_task(queue.drain(asyncio.get_running_loop().time() + 1))
+    await asyncio.sleep(0.05)
+    release.set()
+    await drain
+    await queue.stop()
+    queue.open()
+
+    assert queue.draining
+    assert handled == [b"first"]
+    assert queue.pending == 1
+
+
+async def test_enqueue_waiting_on_the_journal_lock_does_not_block_the_loop(tmp_path):
+    path = str(tmp_path / "ingress.db")
+    queue = IngressQueue(path, workers=8, poll_interval=0.05)
+    handled = []
+
+    async def handler(app_name, body):
+        handled.append(body)
+
+    await queue.start(handler)
+    # Another writer holds the journal lock, so every statement waits on busy_timeout
+    blocker = sqlite3.connect(path, isolation_level=None, timeout=0)
+    blocker.execute("BEGIN IMMEDIATE")
+    loop = asyncio.get_running_loop()
+    loop.call_later(0.3, blocker.rollback)
+
+    lags = []
+
+    async def ticker():
+        while True:
+            started = loop.time()
+            await asyncio.sleep(0.01)
+            lags.append(loop.time() - started - 0.01)
+
+    ticking = asyncio.create_task(ticker())
+    started = time.monotonic()
+    await asyncio.gather(*(queue.enqueue("app", str(i).encode()) for i in range(20)))
+    ack_latency = time.monotonic() - started
+    for _ in range(100):
+        if queue.pending == 0:
+            break
+        await asyncio.sleep(0.01)
+    ticking.cancel()
+    await queue.stop()
+    blocker.close()
+
+    assert ack_latency >= 0.25
+    assert max(lags) < 0.1
+    assert sorted(handled, key=int) == [str(i).encode() for i in range(20)]
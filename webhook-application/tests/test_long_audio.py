@@ -0,0 +1,95 @@
+import asyncio
+import struct
+from pathlib import Path
+
+import pytest
+
+from whatsapp_webhook import transcription
+from whatsapp_webhook.media.chunking import split_opus
+from whatsapp_webhook.media.ogg import inspect_opus, read_opus
+from whatsapp_webhook.utils.app_config import config
+
+FIXTURES = Path(__file__).parent / "fixtures"
+PACKETS_PER_SECOND = 50
+
+
+def _fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+def _heard(audio: bytes) -> str:
+    """One word per second of audio, from the packet indexes of the fixture."""
+    _, _, packets = read_opus(audio)
+    indexes = [struct.unpack_from("<I", packet.data, 1)[0] for packet in packets]
+    return " ".join(f"w{index // PACKETS_PER_SECOND}" for index in indexes if index % PACKETS_PER_SECOND == 0)
+
+
+@pytest.fixture
+def short_chunks(monkeypatch):
+    monkeypatch.setattr(config, "speech_sync_max_seconds", 5.0)
+    monkeypatch.setattr(config, "speech_chunk_seconds", 4.0)
+    monkeypatch.setattr(config, "speech_chunk_overlap_seconds", 0.5)
+    monkeypatch.setattr(config, "speech_chunk_parallelism", 4)
+
+
+def test_headers_are_read_from_the_container():
+    head, tags, packets = read_opus(_fixture("speech_12s.ogg"))
+    info = inspect_opus(_fixture("speech_12s.ogg"))
+
+    assert (head.channels, head.input_sample_rate, head.pre_skip) == (1, 16000, 312)
+    assert tags.startswith(b"OpusTags")
+    assert len(packets) == 12 * PACKETS_PER_SECOND
+    assert info.duration == 12.0
+    assert info.speech_sample_rate == 16000
+
+
+def test_chunks_are_valid_notes_that_overlap_and_cut_at_pauses():
+    head, tags, packets = read_opus(_fixture("speech_12s.ogg"))
+
+    chunks = split_opus(head, tags, packets, target_seconds=4, max_seconds=5, overlap_seconds=0.5)
+
+    assert len(chunks) == 3
+    for chunk in chunks:
+        assert chunk.duration <= 5
+        assert inspect_opus(chunk.data).duration == pytest.approx(chunk.duration)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.start == pytest.approx(previous.start + previous.duration - 0.5)
+    # Cuts fall in the 200 ms pauses at 4.5 s and 9 s
+    for chunk in chunks[:-1]:
+        assert (chunk.start + chunk.duration) % 4.5 <= 0.2
+
+
+async def test_long_note_is_transcribed_in_chunks_and_stitched(short_chunks):
+    calls = []
+
+    class Backend:
+        async def transcribe(self, audio, sample_rate_hertz):
+            calls.append(sample_rate_hertz)
+            return _heard(audio)
+
+    transcript = await transcription.transcribe_audio_file(_fixture("speech_12s.ogg"), backend=Backend())
+
+    assert transcript == " ".join(f"w{second}" for second in range(12))
+    assert len(calls) == 3
+    assert set(calls) == {16000}
+
+
+async def test_failed_chunk_cancels_the_others(short_chunks):
+    cancelled = []
+
+    class Backend:
+        async def transcribe(self, audio, sample_rate_hertz):
+            if _heard(audio).startswith("w0 "):
+                raise RuntimeError("Speech unavailable")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(audio)
+                raise
+
+    transcript = await asyncio.wait_for(
+        transcription.transcribe_audio_file(_fixture("speech_12s.ogg"), backend=Backend()), 1
+    )
+
+    assert transcript is None
+    assert len(cancelled) == 2
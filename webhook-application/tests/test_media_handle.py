@@ -0,0 +1,53 @@
+import hashlib
+
+import pytest
+
+from whatsapp_webhook.media import MediaHandle, MediaTooLargeError
+
+
+def test_small_content_stays_in_memory():
+    with MediaHandle(max_bytes=100, spool_bytes=10) as handle:
+        handle.write(b"hola")
+
+        assert handle.in_memory
+        assert handle.read() == b"hola"
+        with handle.view() as view:
+            assert bytes(view) == b"hola"
+
+
+def test_content_spills_to_disk_past_spool_bytes(tmp_path):
+    with MediaHandle(max_bytes=100, spool_bytes=10, tmp_dir=str(tmp_path)) as handle:
+        handle.write(b"0123456789")
+        assert handle.in_memory
+        handle.write(b"abc")
+
+        assert not handle.in_memory
+        assert handle.size == 13
+        assert handle.read() == b"0123456789abc"
+        with handle.view() as view:
+            assert bytes(view) == b"0123456789abc"
+
+
+def test_sha256_covers_every_chunk():
+    with MediaHandle(max_bytes=100, spool_bytes=4) as handle:
+        for chunk in (b"ab", b"cd", b"ef"):
+            handle.write(chunk)
+
+        assert handle.sha256 == hashlib.sha256(b"abcdef").hexdigest()
+
+
+def test_write_to_copies_the_content(tmp_path):
+    path = tmp_path / "media.bin"
+    with MediaHandle(max_bytes=100, spool_bytes=4) as handle:
+        handle.write(b"abcdef")
+        handle.write_to(str(path))
+
+    assert path.read_bytes() == b"abcdef"
+
+
+def test_writing_past_max_bytes_fails():
+    with MediaHandle(max_bytes=5) as handle:
+        handle.write(b"abc")
+        with pytest.raises(MediaTooLargeError):
+            handle.write(b"def")
+        assert handle.size == 3
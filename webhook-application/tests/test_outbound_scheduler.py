@@ -0,0 +1,79 @@
+import asyncio
+import importlib
+import time
+
+import httpx
+
+from whatsapp_webhook.external_services.outbound_scheduler import OutboundScheduler
+
+# The package re-exports the singleton under the module's name
+outbound = importlib.import_module("whatsapp_webhook.external_services.outbound_scheduler")
+
+URL = "https://graph.example/v1/123/messages"
+
+
+def _fake_graph(monkeypatch, respond=None, delay=0.01):
+    """Replace the Graph API call; ``respond`` may return an error response for a call."""
+    calls = []
+
+    async def send_whatsapp_message(to, message, url, token):
+        calls.append((time.monotonic(), to, message["text"]))
+        await asyncio.sleep(delay)
+        response = respond(to, message, len(calls)) if respond else None
+        if response is not None:
+            request = httpx.Request("POST", url)
+            response.request = request
+            raise httpx.HTTPStatusError("error", request=request, response=response)
+        return {"messages": [{"id": f"wamid.{len(calls)}"}]}
+
+    monkeypatch.setattr(outbound, "send_whatsapp_message", send_whatsapp_message)
+    return calls
+
+
+async def test_each_recipient_receives_its_messages_in_order(monkeypatch):
+    calls = _fake_graph(monkeypatch)
+    scheduler = OutboundScheduler(rate_per_second=1000, burst=100)
+
+    await asyncio.gather(*(
+        scheduler.send(to, {"text": f"{to}-{i}"}, URL, "token")
+        for i in range(3)
+        for to in ("alice", "bob")
+    ))
+    await scheduler.stop()
+
+    for to in ("alice", "bob"):
+        assert [text for _, recipient, text in calls if recipient == to] == [f"{to}-{i}" for i in range(3)]
+
+
+async def test_429_pauses_the_lane_and_keeps_the_message_first(monkeypatch):
+    def respond(to, message, call):
+        if call == 1:
+            return httpx.Response(429, headers={"Retry-After": "0.2"})
+        return None
+
+    calls = _fake_graph(monkeypatch, respond=respond)
+    scheduler = OutboundScheduler(rate_per_second=1000, burst=100, max_inflight_per_number=1)
+
+    first = asyncio.create_task(scheduler.send("alice", {"text": "one"}, URL, "token"))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(scheduler.send("alice", {"text": "two"}, URL, "token"))
+    other = asyncio.create_task(scheduler.send("bob", {"text": "hi"}, URL, "token"))
+    await asyncio.gather(first, second, other)
+    await scheduler.stop()
+
+    limited_at = calls[0][0]
+    assert [text for _, to, text in calls if to == "alice"] == ["one", "one", "two"]
+    assert all(sent_at - limited_at >= 0.2 for sent_at, _, _ in calls[1:])
+
+
+async def test_stop_fails_a_message_waiting_for_a_token(monkeypatch):
+    _fake_graph(monkeypatch, delay=0)
+    scheduler = OutboundScheduler(rate_per_second=0.1, burst=1)
+
+    await scheduler.send("alice", {"text": "one"}, URL, "token")
+    waiting = asyncio.create_task(scheduler.send("alice", {"text": "two"}, URL, "token"))
+    await asyncio.sleep(0.05)
+    await scheduler.stop()
+
+    await asyncio.wait_for(asyncio.gather(waiting, return_exceptions=True), 1)
+    assert waiting.cancelled()
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+import pytest
+
+from whatsapp_webhook.processing.pipeline import Pipeline, Stage
+
+
+def _sleeping(name, seconds, log, result=None):
+    async def run(results):
+        log.append(("start", name, dict(results)))
+        await asyncio.sleep(seconds)
+        log.append(("end", name))
+        return result if result is not None else name
+    return run
+
+
+async def test_independent_stages_overlap():
+    log = []
+    pipeline = Pipeline("message", [
+        Stage("session", _sleeping("session", 0.1, log)),
+        Stage("download", _sleeping("download", 0.1, log)),
+        Stage("typing", _sleeping("typing", 0.1, log)),
+    ])
+
+    started = time.monotonic()
+    results = await pipeline.run()
+
+    assert time.monotonic() - started < 0.2
+    assert results == {"session": "session", "download": "download", "typing": "typing"}
+
+
+async def test_stage_starts_after_its_dependencies_with_their_results():
+    log = []
+    pipeline = Pipeline("message", [
+        Stage("session", _sleeping("session", 0.02, log, result="s1")),
+        Stage("download", _sleeping("download", 0.05, log, result=b"audio")),
+        Stage("agent", _sleeping("agent", 0, log), after=("session", "download")),
+    ])
+
+    await pipeline.run()
+
+    agent_start = next(entry for entry in log if entry[:2] == ("start", "agent"))
+    assert agent_start[2] == {"session": "s1", "download": b"audio"}
+    assert log.index(("end", "download")) < log.index(agent_start)
+
+
+async def test_failed_required_stage_cancels_the_others():
+    cancelled = []
+
+    async def fail(results):
+        raise RuntimeError("download failed")
+
+    async def slow(results):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    pipeline = Pipeline("message", [Stage("session", slow), Stage("download", fail)])
+
+    with pytest.raises(RuntimeError, match="download failed"):
+        await asyncio.wait_for(pipeline.run(), 1)
+    assert cancelled == [True]
+
+
+async def test_failed_optional_stage_yields_none():
+    async def fail(results):
+        raise RuntimeError("typing indicator failed")
+
+    async def handle(results):
+        return "handled"
+
+    pipeline = Pipeline("message", [
+        Stage("receipt", fail, optional=True),
+        Stage("handle", handle, after=("receipt",)),
+    ])
+
+    assert await pipeline.run() == {"receipt": None, "handle": "handled"}
+
+
+def test_dependencies_must_come_first():
+    async def noop(results):
+        pass
+
+    with pytest.raises(ValueError):
+        Pipeline("message", [Stage("agent", noop, after=("session",)), Stage("session", noop)])
@@ -0,0 +1,76 @@
+import time
+
+from whatsapp_webhook import messages
+from whatsapp_webhook.external_services.outbound_scheduler import Priority
+from whatsapp_webhook.models.compact import CompactMessage
+from whatsapp_webhook.processing.resends import ResendTracker
+
+
+def _text(message_id: str, body: str) -> CompactMessage:
+    return CompactMessage({
+        "from": "56911111111", "id": message_id, "timestamp": str(int(time.time())),
+        "type": "text", "text": {"body": body},
+    })
+
+
+def _record_sends(monkeypatch, fail=False):
+    sent = []
+
+    async def send(to, message, url, token, priority=Priority.REPLY):
+        sent.append((to, message, url, priority))
+        if fail:
+            raise RuntimeError("Graph API unavailable")
+        return {}
+
+    monkeypatch.setattr(messages.outbound_scheduler, "send", send)
+    return sent
+
+
+async def test_typing_mode_marks_read_with_the_typing_indicator(monkeypatch):
+    monkeypatch.setattr(messages.config, "aa_read_receipts", "typing")
+    sent = _record_sends(monkeypatch)
+
+    await messages._send_read_receipt("56911111111", "wamid.1", messages.config.aa_app_name)
+
+    assert sent == [(
+        "56911111111",
+        {"status": "read", "message_id": "wamid.1", "typing_indicator": {"type": "text"}},
+        f"{messages.config.aa_facebook_app_url}/messages",
+        Priority.ACK,
+    )]
+
+
+async def test_read_mode_sends_a_plain_receipt_and_off_sends_nothing(monkeypatch):
+    monkeypatch.setattr(messages.config, "aa_read_receipts", "read")
+    monkeypatch.setattr(messages.config, "pp_read_receipts", "off")
+    sent = _record_sends(monkeypatch)
+
+    await messages._send_read_receipt("56911111111", "wamid.1", messages.config.aa_app_name)
+    await messages._send_read_receipt("56911111111", "wamid.2", messages.config.pp_app_name)
+
+    assert [message for _, message, _, _ in sent] == [{"status": "read", "message_id": "wamid.1"}]
+
+
+async def test_failed_receipt_does_not_stop_the_message(monkeypatch):
+    monkeypatch.setattr(messages.config, "aa_read_receipts", "typing")
+    _record_sends(monkeypatch, fail=True)
+    handled = []
+
+    async def handle(sender_wa_id, message, app_name):
+        handled.append(message.id)
+
+    monkeypatch.setattr(messages, "_handle_message", handle)
+
+    await messages.process_message("56911111111", _text("wamid.1", "hola"), messages.config.aa_app_name)
+
+    assert handled == ["wamid.1"]
+
+
+def test_same_text_within_the_window_is_a_resend():
+    tracker = ResendTracker(window=120)
+
+    assert not tracker.is_resend(("aa", "alice"), "¿Cuándo riego?", now=0)
+    assert tracker.is_resend(("aa", "alice"), "  ¿cuándo   RIEGO? ", now=60)
+    assert not tracker.is_resend(("aa", "bob"), "¿Cuándo riego?", now=61)
+    assert not tracker.is_resend(("aa", "alice"), "¿Cuándo riego?", now=300)
+    assert not tracker.is_resend(("aa", "alice"), "Otra pregunta", now=301)
@@ -0,0 +1,42 @@
+from whatsapp_webhook.processing.reply_chunker import WHATSAPP_MAX_TEXT, ReplyChunker
+
+
+def test_holds_text_until_min_chars():
+    chunker = ReplyChunker(min_chars=20, max_chars=100)
+
+    assert chunker.feed("Hola.\n\n") == []
+    assert chunker.flush() == ["Hola."]
+
+
+def test_releases_complete_paragraphs():
+    chunker = ReplyChunker(min_chars=10, max_chars=100)
+
+    parts = chunker.feed("Primer párrafo largo.\n\nSegundo párr")
+
+    assert parts == ["Primer párrafo largo."]
+    assert chunker.feed("afo.") == []
+    assert chunker.flush() == ["Segundo párrafo."]
+
+
+def test_long_text_is_cut_at_a_sentence_boundary():
+    chunker = ReplyChunker(min_chars=10, max_chars=60)
+    text = "Una frase bastante larga. " * 4
+
+    parts = chunker.feed(text)
+
+    assert parts
+    assert all(len(part) <= 60 and part.endswith(".") for part in parts)
+    assert " ".join(parts + chunker.flush()) == text.strip()
+
+
+def test_text_without_boundaries_is_cut_at_max_chars():
+    chunker = ReplyChunker(min_chars=10, max_chars=50)
+
+    parts = chunker.feed("x" * 120)
+
+    assert parts == ["x" * 50, "x" * 50]
+    assert chunker.flush() == ["x" * 20]
+
+
+def test_max_chars_is_capped_at_the_whatsapp_limit():
+    assert ReplyChunker(max_chars=10 * WHATSAPP_MAX_TEXT).max_chars == WHATSAPP_MAX_TEXT
@@ -0,0 +1,151 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from whatsapp_webhook.external_services import resilience
+from whatsapp_webhook.external_services.resilience import CircuitBreaker, CircuitOpenError, Dependency
+
+
+def _dependency(**kwargs):
+    kwargs.setdefault("base_delay", 0.0)
+    kwargs.setdefault("max_delay", 0.0)
+    return Dependency("test", **kwargs)
+
+
+def _responses(*outcomes):
+    """A request returning (or raising) each outcome in turn, counting the calls."""
+    calls = []
+
+    async def request():
+        outcome = outcomes[len(calls)]
+        calls.append(outcome)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return httpx.Response(outcome)
+
+    return request, calls
+
+
+async def test_idempotent_request_is_retried_on_5xx():
+    request, calls = _responses(502, 500, 200)
+
+    response = await _dependency(max_attempts=3).call(request, idempotent=True)
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+async def test_last_error_status_is_returned_after_max_attempts():
+    request, calls = _responses(503, 503)
+
+    response = await _dependency(max_attempts=2).call(request, idempotent=True)
+
+    assert response.status_code == 503
+    assert len(calls) == 2
+
+
+async def test_non_idempotent_request_is_only_retried_when_not_processed():
+    request, calls = _responses(500)
+    assert (await _dependency().call(request)).status_code == 500
+    assert len(calls) == 1
+
+    request, calls = _responses(503, 200)
+    assert (await _dependency().call(request)).status_code == 200
+    assert len(calls) == 2
+
+
+async def test_non_idempotent_request_is_retried_when_it_was_not_sent():
+    request, calls = _responses(httpx.ConnectError("refused"), 200)
+    assert (await _dependency().call(request)).status_code == 200
+    assert len(calls) == 2
+
+    request, calls = _responses(httpx.ReadTimeout("slow"), 200)
+    with pytest.raises(httpx.ReadTimeout):
+        await _dependency().call(request)
+    assert len(calls) == 1
+
+
+async def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    request, calls = _responses(500, 500, 200)
+    dependency = _dependency(max_attempts=1, breaker=breaker)
+
+    await dependency.call(request)
+    await dependency.call(request)
+    with pytest.raises(CircuitOpenError):
+        await dependency.call(request)
+
+    assert breaker.state == "open"
+    assert len(calls) == 2
+
+
+async def test_breaker_closes_after_a_successful_trial(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(resilience, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    request, calls = _responses(500, 500, 200)
+    dependency = _dependency(max_attempts=1, breaker=breaker)
+
+    await dependency.call(request)
+    assert breaker.state == "open"
+    now[0] += 30
+    await dependency.call(request)
+    assert breaker.state == "open"
+    now[0] += 30
+    await dependency.call(request)
+
+    assert breaker.state == "closed"
+    assert len(calls) == 3
+
+
+async def test_pool_timeout_does_not_count_as_a_breaker_failure():
+    breaker = CircuitBreaker("test", failure_threshold=1)
+    request, _ = _responses(httpx.PoolTimeout("pool"))
+
+    with pytest.raises(httpx.PoolTimeout):
+        await _dependency(max_attempts=1, breaker=breaker).call(request)
+
+    assert breaker.state == "closed"
+
+
+async def test_hedged_lookup_returns_the_first_answer_and_cancels_the_other():
+    cancelled = []
+    delays = [1.0, 0.0]
+
+    async def request():
+        try:
+            await asyncio.sleep(delays.pop(0))
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return httpx.Response(200)
+
+    response = await _dependency(hedge_delay=0.01).call(request, idempotent=True, hedge=True)
+    await asyncio.sleep(0)
+
+    assert response.status_code == 200
+    assert cancelled == [True]
+
+
+async def test_cancelling_a_hedged_call_cancels_its_attempts():
+    started = []
+    cancelled = []
+
+    async def request():
+        started.append(True)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    call = asyncio.create_task(_dependency(hedge_delay=5).call(request, idempotent=True, hedge=True))
+    await asyncio.sleep(0.01)
+    call.cancel()
+    await asyncio.gather(call, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    assert started == [True]
+    assert cancelled == [True]
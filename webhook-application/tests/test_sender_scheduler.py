@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from whatsapp_webhook.processing.sender_scheduler import SenderScheduler
+
+
+def _recorder(log, label, delay=0.0):
+    async def work():
+        log.append(("start", label))
+        await asyncio.sleep(delay)
+        log.append(("end", label))
+        return label
+    return work
+
+
+async def test_same_sender_runs_in_timestamp_order_one_at_a_time():
+    scheduler = SenderScheduler(reorder_window=0.05)
+    log = []
+
+    futures = [
+        scheduler.submit("alice", timestamp, _recorder(log, timestamp, delay=0.01))
+        for timestamp in (3.0, 1.0, 2.0)
+    ]
+
+    assert await asyncio.gather(*futures) == [3.0, 1.0, 2.0]
+    assert log == [
+        ("start", 1.0), ("end", 1.0),
+        ("start", 2.0), ("end", 2.0),
+        ("start", 3.0), ("end", 3.0),
+    ]
+    assert scheduler.active_senders == 0
+
+
+async def test_different_senders_run_concurrently():
+    scheduler = SenderScheduler(max_concurrency=4)
+    log = []
+
+    await asyncio.gather(
+        scheduler.submit("alice", 1.0, _recorder(log, "alice", delay=0.05)),
+        scheduler.submit("bob", 1.0, _recorder(log, "bob", delay=0.05)),
+    )
+
+    assert log[:2] == [("start", "alice"), ("start", "bob")]
+
+
+async def test_max_concurrency_is_global():
+    scheduler = SenderScheduler(max_concurrency=1)
+    log = []
+
+    await asyncio.gather(
+        scheduler.submit("alice", 1.0, _recorder(log, "alice", delay=0.01)),
+        scheduler.submit("bob", 1.0, _recorder(log, "bob", delay=0.01)),
+    )
+
+    assert log == [("start", "alice"), ("end", "alice"), ("start", "bob"), ("end", "bob")]
+
+
+async def test_failure_is_reported_and_the_mailbox_continues():
+    scheduler = SenderScheduler()
+    log = []
+
+    async def fail():
+        raise ValueError("boom")
+
+    failed = scheduler.submit("alice", 1.0, fail)
+    ok = scheduler.submit("alice", 2.0, _recorder(log, "next"))
+
+    with pytest.raises(ValueError):
+        await failed
+    assert await ok == "next"
+
+
+async def test_stop_cancels_running_and_queued_work():
+    scheduler = SenderScheduler()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(10)
+
+    running = scheduler.submit("alice", 1.0, hang)
+    queued = scheduler.submit("alice", 2.0, hang)
+    await started.wait()
+    await scheduler.stop()
+
+    assert running.cancelled()
+    assert queued.cancelled()
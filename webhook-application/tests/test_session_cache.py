@@ -0,0 +1,46 @@
+import json
+import time
+
+from whatsapp_webhook.external_services.session_cache import KnownSessionCache
+
+
+def test_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "sessions.json")
+    cache = KnownSessionCache(persist_path=path)
+    cache.add(("app", "user", "session"))
+    cache.save()
+
+    reloaded = KnownSessionCache(persist_path=path)
+    reloaded.load()
+
+    assert ("app", "user", "session") in reloaded
+
+
+def test_malformed_entries_are_skipped(tmp_path):
+    path = tmp_path / "sessions.json"
+    future = time.time() + 60
+    path.write_text(json.dumps([
+        ["app", "user", "good", future],
+        ["app", "user"],
+        ["app", "user", "bad-expiry", "soon"],
+        [1, 2, 3, future],
+        "garbage",
+        None,
+        ["app", "user", "expired", time.time() - 1],
+    ]))
+    cache = KnownSessionCache(persist_path=str(path))
+
+    cache.load()
+
+    assert len(cache) == 1
+    assert ("app", "user", "good") in cache
+
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / "sessions.json"
+    path.write_text('{"not": "a list"}')
+    cache = KnownSessionCache(persist_path=str(path))
+
+    cache.load()
+
+    assert len(cache) == 0
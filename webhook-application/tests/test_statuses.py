@@ -0,0 +1,51 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from whatsapp_webhook.processing.statuses import StatusAggregator, is_status_only
+
+PAYLOADS = json.loads((Path(__file__).parent / "fixtures" / "webhook_payloads.json").read_text(encoding="utf-8"))
+
+
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_status_only_payload_is_recognised_however_it_is_serialized(separators, indent):
+    body = json.dumps(PAYLOADS["status_only"], separators=separators, indent=indent).encode()
+
+    assert is_status_only(body)
+
+
+@pytest.mark.parametrize("name", sorted(set(PAYLOADS) - {"status_only"}))
+def test_payloads_with_messages_are_not_status_only(name):
+    assert not is_status_only(json.dumps(PAYLOADS[name]).encode())
+
+
+def test_mixed_payload_is_not_status_only():
+    payload = json.loads(json.dumps(PAYLOADS["text"]))
+    payload["entry"][0]["changes"][0]["value"]["statuses"] = (
+        PAYLOADS["status_only"]["entry"][0]["changes"][0]["value"]["statuses"]
+    )
+
+    assert not is_status_only(json.dumps(payload).encode())
+
+
+def test_keys_quoted_inside_text_do_not_count():
+    payload = json.loads(json.dumps(PAYLOADS["status_only"]))
+    payload["entry"][0]["changes"][0]["value"]["statuses"][0]["conversation"]["id"] = '"messages": []'
+
+    assert is_status_only(json.dumps(payload).encode())
+
+
+def test_payload_without_statuses_is_not_status_only():
+    assert not is_status_only(b'{"object": "whatsapp_business_account", "entry": []}')
+
+
+def test_redelivered_statuses_are_counted_once():
+    aggregator = StatusAggregator()
+    body = json.dumps(PAYLOADS["status_only"]).encode()
+
+    assert aggregator.record_raw(body, "agent_aa") == 1
+    aggregator.record_raw(body, "agent_aa")
+
+    assert aggregator.stats()["received"] == {"agent_aa": {"delivered": 1}}
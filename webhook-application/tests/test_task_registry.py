@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from whatsapp_webhook.processing.task_registry import RegistryClosedError, TaskRegistry
+
+
+async def test_drain_abandons_tasks_still_running_at_the_deadline():
+    registry = TaskRegistry("test")
+    abandoned = []
+    registry.spawn("slow", asyncio.sleep(10), on_abandon=lambda: abandoned.append("slow"))
+    registry.spawn("fast", asyncio.sleep(0), on_abandon=lambda: abandoned.append("fast"))
+
+    loop = asyncio.get_running_loop()
+    count = await registry.drain(loop.time() + 0.05)
+
+    assert count == 1
+    assert abandoned == ["slow"]
+    assert len(registry) == 0
+
+
+async def test_failing_abandon_callback_does_not_stop_the_drain():
+    registry = TaskRegistry("test")
+    abandoned = []
+
+    def broken():
+        raise OSError("disk full")
+
+    registry.spawn("a", asyncio.sleep(10), on_abandon=broken)
+    registry.spawn("b", asyncio.sleep(10), on_abandon=lambda: abandoned.append("b"))
+
+    loop = asyncio.get_running_loop()
+    assert await registry.drain(loop.time() + 0.01) == 2
+    assert abandoned == ["b"]
+
+
+async def test_task_cancelled_before_close_is_not_abandoned():
+    registry = TaskRegistry("test")
+    abandoned = []
+    task = registry.spawn("turn", asyncio.sleep(10), on_abandon=lambda: abandoned.append(True))
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+
+    loop = asyncio.get_running_loop()
+    assert await registry.drain(loop.time()) == 0
+    assert abandoned == []
+
+
+async def test_closed_registry_refuses_new_tasks():
+    registry = TaskRegistry("test")
+    registry.close()
+    coro = asyncio.sleep(0)
+    with pytest.raises(RegistryClosedError):
+        registry.spawn("late", coro)
+    assert coro.cr_frame is None
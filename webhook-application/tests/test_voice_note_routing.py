@@ -0,0 +1,73 @@
+from pathlib import Path
+
+import pytest
+
+from whatsapp_webhook import transcription
+from whatsapp_webhook.media.ogg import inspect_opus
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _fixture(name: str) -> bytes:
+    return (FIXTURES / name).read_bytes()
+
+
+class RecordingBackend:
+    def __init__(self):
+        self.audio = []
+
+    async def transcribe(self, audio, sample_rate_hertz):
+        self.audio.append(audio)
+        return "hola"
+
+
+@pytest.mark.parametrize("name", ["tap_0.4s.ogg", "silent_2s.ogg"])
+async def test_taps_and_fully_sampled_silence_are_skipped(name):
+    backend = RecordingBackend()
+
+    assert await transcription.transcribe_audio_file(_fixture(name), backend=backend) is None
+    assert backend.audio == []
+
+
+async def test_silence_longer_than_the_sample_is_not_skipped():
+    info = inspect_opus(_fixture("silent_then_speech_20s.ogg"))
+    backend = RecordingBackend()
+
+    transcript = await transcription.transcribe_audio_file(_fixture("silent_then_speech_20s.ogg"), backend=backend)
+
+    assert info.duration == 20.0
+    assert info.voiced_ratio == 0.0
+    assert not info.fully_sampled
+    assert transcript == "hola"
+    assert len(backend.audio) == 1
+
+
+async def test_note_without_granule_positions_is_not_skipped():
+    info = inspect_opus(_fixture("silent_2s_no_granule.ogg"))
+    backend = RecordingBackend()
+
+    transcript = await transcription.transcribe_audio_file(_fixture("silent_2s_no_granule.ogg"), backend=backend)
+
+    assert info.duration is None
+    assert not info.fully_sampled
+    assert transcript == "hola"
+
+
+async def test_truncated_note_takes_the_single_request_path(monkeypatch):
+    monkeypatch.setattr(transcription.app_config, "speech_sync_max_seconds", 5.0)
+    truncated = _fixture("speech_12s.ogg")[:-100]
+    backend = RecordingBackend()
+
+    transcript = await transcription.transcribe_audio_file(truncated, backend=backend)
+
+    assert inspect_opus(truncated).duration is None
+    assert transcript == "hola"
+    assert backend.audio == [truncated]
+
+
+def test_packet_bytes_that_look_like_a_page_do_not_fake_the_length():
+    data = bytearray(_fixture("speech_12s.ogg"))
+    # Plant a capture pattern inside the last packet
+    data[-6:-2] = b"OggS"
+
+    assert inspect_opus(bytes(data)).duration == 12.0
@@ -10,7 +10,8 @@ import json
 from ..models.api_models import WebhookSuccessResponse
 from ..utils.app_config import config
 from ..utils.logging import get_logger
-from ..messages import receive_message_aa, receive_message_pp
+from ..messages import receive_message_aa, receive_message_pp, receive_status_update
+from ..processing.statuses import is_status_only
 
 router = APIRouter(prefix="", tags=["webhooks"])
 logger = get_logger("webhook_router")
@@ -38,12 +39,30 @@ async def _verify_webhook(app_name: str, params: Request.query_params) -> JSONRe
     raise HTTPException(status.HTTP_403_FORBIDDEN, "Webhook verification failed")
 
 async def _handle_webhook_post(app_name: str, handler_func, request: Request) -> JSONResponse:
-    """Generic webhook POST handler."""
+    """
+    Generic webhook POST handler.
+
+    Status-only payloads (delivery/read receipts, most of the traffic) are
+    recognised from the raw body and acknowledged inline; everything else
+    is handed to ``handler_func`` as raw bytes, to be journaled.
+    """
+    raw_body = await request.body()
+    if config.status_fast_lane and is_status_only(raw_body):
+        try:
+            receive_status_update(raw_body, app_name)
+        except (ValueError, AttributeError, TypeError) as e:
+            logger.warning(f"Ignoring malformed status webhook for {app_name}: {e}")
+        return JSONResponse({"status": "ok"})
+
     logger.info(f"Processing webhook for {app_name}", extra={"endpoint": str(request.url)})
 
     try:
-        body = await request.json()
-        await handler_func(body)
+        if not await handler_func(raw_body):
+            # Not persisted: let WhatsApp redeliver instead of losing the payload
+            logger.warning(f"Webhook for {app_name} could not be queued, asking for redelivery")
+            return JSONResponse(
+                {"status": "retry"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
         logger.info(f"Webhook for {app_name} processed successfully")
         return JSONResponse({"status": "ok"})
     except json.JSONDecodeError:
@@ -51,7 +70,8 @@ async def _handle_webhook_post(app_name: str, handler_func, request: Request) ->
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Invalid JSON format")
     except Exception as e:
         logger.error(f"Error processing webhook for {app_name}: {e}", exc_info=True)
-        # Always return 200 OK to WhatsApp to prevent retries
+        # Unexpected errors are acknowledged so WhatsApp does not redeliver in a
+        # loop; payloads that could not be journaled got a 503 above
         return JSONResponse({"status": "ok"})
 
 
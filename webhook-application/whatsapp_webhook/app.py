@@ -2,6 +2,7 @@
 FastAPI application factory and configuration.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -9,8 +10,10 @@ import os
 import tomllib
 
 from .api.webhooks import router as webhook_router
+from .messages import start_background_processing, stop_background_processing
 from .utils.logging import configure_app_logging
 from .utils.app_config import config
+from .utils.metrics import metrics
 from .models.api_models import HealthCheckResponse
 
 
@@ -24,6 +27,16 @@ def get_version() -> str:
         return "unknown"
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background message processing on startup; drain and stop it on shutdown."""
+    await start_background_processing()
+    try:
+        yield
+    finally:
+        await stop_background_processing(grace=config.shutdown_grace_period)
+
+
 def create_app() -> FastAPI:
     """
     Create and configure FastAPI application.
@@ -44,6 +57,7 @@ def create_app() -> FastAPI:
         version=version,
         docs_url="/docs",
         redoc_url="/redoc",
+        lifespan=lifespan,
     )
     
     # Add CORS middleware
@@ -68,6 +82,12 @@ def create_app() -> FastAPI:
             environment="production"
         )
     
+    # Add metrics endpoint
+    @app.get("/metrics")
+    async def get_metrics():
+        """In-process counters, gauges and histograms."""
+        return JSONResponse(content=metrics.snapshot())
+    
     # Add root endpoint
     @app.get("/")
     async def root():
@@ -1,6 +1,6 @@
 """
 Authentication utilities for the WhatsApp webhook application.
 """
-from .google_auth import idtoken_from_metadata_server
+from .google_auth import idtoken_from_metadata_server, get_id_token, IDTokenCache, id_token_cache
 
-__all__ = ["idtoken_from_metadata_server"]
+__all__ = ["idtoken_from_metadata_server", "get_id_token", "IDTokenCache", "id_token_cache"]
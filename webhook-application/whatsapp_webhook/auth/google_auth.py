@@ -1,11 +1,40 @@
 """
 Google Cloud authentication utilities for the WhatsApp webhook application.
+
+ID tokens are cached per audience until shortly before they expire. Refreshes
+run in a worker thread (the metadata-server call is blocking) and concurrent
+requests for the same audience share a single refresh. Setting
+``GCE_METADATA_HOST`` points google-auth at a local metadata-server stand-in.
 """
+import asyncio
+import base64
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
 import google
 import google.oauth2.credentials
 from google.auth import compute_engine
 import google.auth.transport.requests
 
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+logger = get_logger("authentication")
+
+# One transport per worker thread (its requests session is not thread-safe),
+# reused so the metadata-server connection is kept alive between refreshes
+_thread_local = threading.local()
+
+
+def _metadata_request() -> google.auth.transport.requests.Request:
+    """Return the calling thread's metadata-server transport."""
+    request = getattr(_thread_local, "request", None)
+    if request is None:
+        request = _thread_local.request = google.auth.transport.requests.Request()
+    return request
+
 
 def idtoken_from_metadata_server(url: str) -> str:
     """
@@ -23,7 +52,7 @@ def idtoken_from_metadata_server(url: str) -> str:
     Raises:
         Exception: If authentication fails or metadata server is unavailable
     """
-    request = google.auth.transport.requests.Request()
+    request = _metadata_request()
     
     # Set the target audience.
     # Setting "use_metadata_identity_endpoint" to "True" will make the request use the default application
@@ -42,9 +71,108 @@ def idtoken_from_metadata_server(url: str) -> str:
     return credentials.token
 
 
+def token_expiry(token: str) -> Optional[float]:
+    """
+    Read the ``exp`` claim of a JWT without verifying it.
+
+    Args:
+        token: The encoded JWT
+
+    Returns:
+        Expiry as a Unix timestamp, or None if the token cannot be decoded
+    """
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class IDTokenCache:
+    """Per-audience ID token cache with ahead-of-expiry, single-flight refresh."""
+
+    def __init__(
+        self,
+        fetcher: Callable[[str], str] = idtoken_from_metadata_server,
+        refresh_ahead: float = 300.0,
+        min_validity: float = 30.0,
+        default_lifetime: float = 3000.0,
+    ):
+        """
+        Args:
+            fetcher: Blocking function returning a fresh token for an audience
+            refresh_ahead: Seconds before expiry at which a background refresh starts
+            min_validity: Tokens with less remaining validity are not handed out
+            default_lifetime: Assumed lifetime when the token expiry cannot be read
+        """
+        self.fetcher = fetcher
+        self.refresh_ahead = refresh_ahead
+        self.min_validity = min_validity
+        self.default_lifetime = default_lifetime
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    async def _fetch(self, audience: str) -> str:
+        start = time.perf_counter()
+        try:
+            token = await asyncio.to_thread(self.fetcher, audience)
+        except Exception:
+            metrics.inc("id_token_refreshes", outcome="error")
+            raise
+        metrics.inc("id_token_refreshes", outcome="ok")
+        metrics.observe("id_token_refresh_seconds", time.perf_counter() - start)
+        expiry = token_expiry(token) or time.time() + self.default_lifetime
+        self._tokens[audience] = (token, expiry)
+        return token
+
+    def _refresh(self, audience: str) -> "asyncio.Task[str]":
+        """Start a refresh for ``audience`` unless one is already running."""
+        task = self._refreshing.get(audience)
+        if task is None:
+            task = asyncio.create_task(self._fetch(audience))
+            self._refreshing[audience] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(audience, None))
+        return task
+
+    def _log_background_failure(self, task: "asyncio.Task[str]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Background ID token refresh failed: {task.exception()}")
+
+    async def get(self, audience: str) -> str:
+        """
+        Return a valid ID token for ``audience``.
+
+        Cached tokens are returned immediately; when they are close to expiry
+        a refresh is started in the background. Callers only wait when there
+        is no usable token.
+        """
+        cached = self._tokens.get(audience)
+        now = time.time()
+        if cached is not None:
+            token, expiry = cached
+            remaining = expiry - now
+            if remaining > self.min_validity:
+                metrics.inc("id_token_cache", result="hit")
+                if remaining < self.refresh_ahead and audience not in self._refreshing:
+                    self._refresh(audience).add_done_callback(self._log_background_failure)
+                return token
+
+        metrics.inc("id_token_cache", result="miss")
+        return await asyncio.shield(self._refresh(audience))
+
+    def invalidate(self, audience: str) -> None:
+        """Drop the cached token for ``audience`` (e.g. after a 401)."""
+        self._tokens.pop(audience, None)
+
+
+# Singleton instance to be used across the application
+id_token_cache = IDTokenCache()
+
+
 async def get_id_token(target_url: str) -> str:
     """
-    Async wrapper for getting ID token from metadata server.
+    Get an ID token for the target audience from the process-wide cache.
     
     Args:
         target_url: The target URL/audience for the ID token
@@ -52,4 +180,4 @@ async def get_id_token(target_url: str) -> str:
     Returns:
         str: The ID token
     """
-    return idtoken_from_metadata_server(target_url)
+    return await id_token_cache.get(target_url)
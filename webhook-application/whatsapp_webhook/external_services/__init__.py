@@ -1,11 +1,58 @@
 """
 External services utilities for the WhatsApp webhook application.
 """
-from .agent_client import send_to_agent
+from .agent_client import AgentStreamRejectedError, send_to_agent, stream_agent_text
+from .concurrency_limiter import (
+    AdaptiveConcurrencyLimiter,
+    AIMDLimit,
+    FixedLimit,
+    GradientLimit,
+    LimiterSlot,
+    agent_limiter,
+    build_limit_algorithm
+)
+from .resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    Dependency,
+    agent_dependency,
+    graph_dependency
+)
 from .whatsapp_client import send_whatsapp_message, download_whatsapp_media
+from .session_cache import KnownSessionCache, known_sessions
+from .outbound_scheduler import OutboundScheduler, Priority, outbound_scheduler
+from .http_clients import (
+    open_http_clients,
+    close_http_clients,
+    get_agent_http_client,
+    get_graph_http_client
+)
 
 __all__ = [
     "send_to_agent",
+    "stream_agent_text",
+    "AgentStreamRejectedError",
     "send_whatsapp_message", 
-    "download_whatsapp_media"
+    "download_whatsapp_media",
+    "open_http_clients",
+    "close_http_clients",
+    "get_agent_http_client",
+    "get_graph_http_client",
+    "KnownSessionCache",
+    "known_sessions",
+    "OutboundScheduler",
+    "Priority",
+    "outbound_scheduler",
+    "AdaptiveConcurrencyLimiter",
+    "AIMDLimit",
+    "FixedLimit",
+    "GradientLimit",
+    "LimiterSlot",
+    "agent_limiter",
+    "build_limit_algorithm",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "Dependency",
+    "agent_dependency",
+    "graph_dependency"
 ]
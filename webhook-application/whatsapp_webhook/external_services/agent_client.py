@@ -2,11 +2,51 @@
 Agent service client utilities for communication with the AI agent service.
 """
 import httpx
+import json
 import logging
-from typing import Any, Optional
+from contextlib import AsyncExitStack
+from typing import Any, AsyncIterator, Dict, Optional
 
-from ..auth.google_auth import get_id_token
+from ..auth.google_auth import get_id_token, id_token_cache
 from ..utils.app_config import config
+from ..utils.deadline import deadline_stage
+from .concurrency_limiter import agent_limiter
+from .http_clients import get_agent_http_client
+from .resilience import (
+    NOT_SENT_ERRORS,
+    CircuitOpenError,
+    Request,
+    agent_dependency,
+    is_breaker_failure,
+)
+from .session_cache import known_sessions
+
+
+class AgentStreamRejectedError(Exception):
+    """Raised when the agent did not accept a streaming run, so the turn never started."""
+    pass
+
+
+async def _refresh_authorization(headers: Dict[str, str]) -> None:
+    """Drop the cached ID token, rejected by the agent, and put a fresh one in ``headers``."""
+    logging.warning("Agent rejected the ID token, fetching a new one")
+    id_token_cache.invalidate(config.agent_url)
+    headers["Authorization"] = f"Bearer {await get_id_token(config.agent_url)}"
+
+
+async def _call_agent(
+    request: Request, headers: Dict[str, str], idempotent: bool = False, hedge: bool = False
+) -> httpx.Response:
+    """
+    Call the agent under its retry policy, renewing the ID token once on a 401.
+
+    ``request`` must send ``headers``, which is updated in place with the new token.
+    """
+    response = await agent_dependency.call(request, idempotent=idempotent, hedge=hedge)
+    if response.status_code == 401:
+        await _refresh_authorization(headers)
+        response = await agent_dependency.call(request, idempotent=idempotent, hedge=hedge)
+    return response
 
 
 async def send_to_agent(
@@ -14,8 +54,17 @@ async def send_to_agent(
     user_id: str,
     session_id: str,
     message: str,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> dict[str, Any]:
-    """Sends a message to the agent service."""
+    """
+    Sends a message to the agent service using the shared pooled client by default.
+
+    Each attempt waits for a slot of the adaptive agent concurrency limiter
+    and holds it only while the request is in flight: retry backoff, the ID
+    token refresh and session re-creation hold no slot and produce no
+    latency sample. The waits and the calls are bounded by the message
+    deadline.
+    """
     if not config.agent_url:
         raise ValueError("Agent URL is not configured.")
 
@@ -36,25 +85,201 @@ async def send_to_agent(
     }
 
     logging.info(f"Sending message to agent {app_name} for user {user_id}")
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(agent_run_url, json=payload, headers=headers)
+    client = client or get_agent_http_client()
+    async def run() -> httpx.Response:
+        async with agent_limiter.acquire() as slot:
+            response = await client.post(agent_run_url, json=payload, headers=headers)
+            if response.status_code == 429 or response.status_code >= 500:
+                slot.drop()
+            return response
+
+    async with deadline_stage("agent_run"):
+        response = await _call_agent(run, headers)
+        if _is_session_not_found(response):
+            # The agent lost the session (e.g. it restarted): recreate it and retry once
+            logging.info(f"Session {session_id} not found by agent {app_name}, recreating it")
+            known_sessions.invalidate((app_name, user_id, session_id))
+            await create_agent_session(user_id, app_name, session_id, client=client)
+            response = await _call_agent(run, headers)
         response.raise_for_status()
-        response_data = response.json()
+    response_data = response.json()
+
+    if isinstance(response_data, list) and response_data:
+        if content := response_data[-1].get("content"):
+            if parts := content.get("parts"):
+                if isinstance(parts, list) and parts and "text" in parts[0]:
+                    return {"response": parts[0]["text"].strip(), "raw_response": response_data}
+
+    logging.warning(f"Unexpected response format from agent: {response_data}")
+    return {"response": "Error: Could not extract text from agent response.", "raw_response": response_data}
+
+async def _iter_sse_events(response: httpx.Response) -> AsyncIterator[Dict[str, Any]]:
+    """Parse a ``text/event-stream`` body incrementally into JSON events."""
+    data_lines = []
+    async for line in response.aiter_lines():
+        if line.startswith("data:"):
+            data_lines.append(line[5:].lstrip())
+        elif not line and data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+    if data_lines:
+        yield json.loads("\n".join(data_lines))
+
+
+def _event_text(event: Dict[str, Any]) -> str:
+    """Concatenate the user-facing text parts of a model event."""
+    content = event.get("content") or {}
+    if content.get("role") not in (None, "model"):
+        return ""
+    parts = content.get("parts") or []
+    return "".join(
+        part["text"]
+        for part in parts
+        if isinstance(part, dict) and isinstance(part.get("text"), str) and not part.get("thought")
+    )
+
+
+async def stream_agent_text(
+    app_name: str,
+    user_id: str,
+    session_id: str,
+    message: str,
+    client: Optional[httpx.AsyncClient] = None,
+) -> AsyncIterator[str]:
+    """
+    Sends a message through the agent's SSE endpoint and yields answer text as it arrives.
+
+    With token streaming the agent emits ``partial`` events carrying text
+    deltas, followed by a final event repeating the whole text; the final
+    event is skipped when its partials were already yielded. Each attempt
+    holds a slot of the adaptive agent concurrency limiter until its stream
+    ends; the slot is released before the ID token is refreshed or the
+    session recreated. Outcomes are recorded by the agent's circuit breaker.
+
+    Yields:
+        Successive pieces of the answer text
+
+    Raises:
+        AgentStreamRejectedError: If the circuit breaker is open, or the
+            request could not be sent or was answered with an error status,
+            so the agent did not run the turn
+        Exception: Any failure after the agent accepted the run
+    """
+    if not config.agent_url:
+        raise ValueError("Agent URL is not configured.")
 
-        if isinstance(response_data, list) and response_data:
-            if content := response_data[-1].get("content"):
-                if parts := content.get("parts"):
-                    if isinstance(parts, list) and parts and "text" in parts[0]:
-                        return {"response": parts[0]["text"].strip(), "raw_response": response_data}
+    agent_sse_url = f"{config.agent_url}/run_sse"
+    payload = {
+        "app_name": app_name,
+        "user_id": user_id,
+        "session_id": session_id,
+        "new_message": {"role": "user", "parts": [{"text": message}]},
+        "streaming": True,
+    }
 
-        logging.warning(f"Unexpected response format from agent: {response_data}")
-        return {"response": "Error: Could not extract text from agent response.", "raw_response": response_data}
+    id_token = await get_id_token(config.agent_url)
+    headers = {
+        "Authorization": f"Bearer {id_token}",
+        "Content-Type": "application/json",
+        "Accept": "text/event-stream",
+    }
+
+    logging.info(f"Streaming message to agent {app_name} for user {user_id}")
+    client = client or get_agent_http_client()
+    breaker = agent_dependency.breaker
+    for attempt in range(2):
+        async with AsyncExitStack() as stack:
+            try:
+                breaker.check()
+            except CircuitOpenError as e:
+                raise AgentStreamRejectedError(str(e)) from e
+            await stack.enter_async_context(agent_limiter.acquire())
+            try:
+                response = await stack.enter_async_context(
+                    client.stream("POST", agent_sse_url, json=payload, headers=headers)
+                )
+            except httpx.TransportError as e:
+                if is_breaker_failure(e):
+                    breaker.record_failure()
+                if isinstance(e, NOT_SENT_ERRORS):
+                    raise AgentStreamRejectedError(f"Could not reach agent: {e}") from e
+                raise
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status_code == 401 and attempt == 0:
+                await response.aread()
+                # Release the connection and the limiter slot before the next attempt
+                await stack.aclose()
+                await _refresh_authorization(headers)
+                continue
+            if response.status_code == 404 and attempt == 0:
+                await response.aread()
+                if _is_session_not_found(response):
+                    await stack.aclose()
+                    logging.info(f"Session {session_id} not found by agent {app_name}, recreating it")
+                    known_sessions.invalidate((app_name, user_id, session_id))
+                    await create_agent_session(user_id, app_name, session_id, client=client)
+                    continue
+            if response.is_error:
+                await response.aread()
+                try:
+                    response.raise_for_status()
+                except httpx.HTTPStatusError as e:
+                    raise AgentStreamRejectedError(
+                        f"Agent refused the stream with status {response.status_code}"
+                    ) from e
+
+            streamed_partials = False
+            separator = ""
+            try:
+                async for event in _iter_sse_events(response):
+                    if "error" in event:
+                        raise RuntimeError(f"Agent stream failed: {event['error']}")
+                    text = _event_text(event)
+                    if event.get("partial"):
+                        streamed_partials = True
+                        if text:
+                            yield separator + text
+                            separator = ""
+                    elif streamed_partials:
+                        # Aggregate of the partials already yielded
+                        streamed_partials = False
+                        separator = "\n\n"
+                    elif text:
+                        yield separator + text
+                        separator = "\n\n"
+            except httpx.TransportError as e:
+                if is_breaker_failure(e):
+                    breaker.record_failure()
+                raise
+            return
 
-async def create_agent_session(user_id: str, app_name: str, session_id: str) -> dict[str, Any]:
-    """Creates a session for the user in the agent service if it doesn't already exist."""
+
+def _is_session_not_found(response: httpx.Response) -> bool:
+    """Whether the agent rejected a run because the session does not exist."""
+    return response.status_code == 404 and "session" in response.text.lower()
+
+async def create_agent_session(
+    user_id: str,
+    app_name: str,
+    session_id: str,
+    client: Optional[httpx.AsyncClient] = None,
+) -> dict[str, Any]:
+    """
+    Creates a session for the user in the agent service if it doesn't already exist.
+
+    Sessions already known to exist are returned from the local cache without
+    contacting the agent. Calls to the agent are bounded by the message deadline.
+    """
     if not config.agent_url:
         raise ValueError("Agent URL is not configured.")
 
+    session_key = (app_name, user_id, session_id)
+    if session_key in known_sessions:
+        return {"id": session_id, "appName": app_name, "userId": user_id}
+
     session_url = f"{config.agent_url}/apps/{app_name}/users/{user_id}/sessions/{session_id}"
 
     id_token = await get_id_token(config.agent_url)
@@ -63,16 +288,23 @@ async def create_agent_session(user_id: str, app_name: str, session_id: str) ->
         "Content-Type": "application/json"
     }
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.get(session_url, headers=headers)
+    client = client or get_agent_http_client()
+    async with deadline_stage("agent_session"):
+        response = await _call_agent(
+            lambda: client.get(session_url, headers=headers), headers, idempotent=True, hedge=True
+        )
         if response.status_code == 200:
             logging.info(f"Session already exists for user {user_id} with agent {app_name}")
+            known_sessions.add(session_key)
             return response.json()
         elif response.status_code != 404:
             response.raise_for_status()
 
         logging.info(f"Creating new session for user {user_id} with agent {app_name}")
         payload = {"state": {"preferred_language": "Spanish", "visit_count": 5}}
-        response = await client.post(session_url, headers=headers, json=payload)
+        response = await _call_agent(
+            lambda: client.post(session_url, headers=headers, json=payload), headers
+        )
         response.raise_for_status()
-        return response.json()
+    known_sessions.add(session_key)
+    return response.json()
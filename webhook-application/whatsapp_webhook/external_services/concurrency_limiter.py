@@ -0,0 +1,287 @@
+"""
+Adaptive concurrency limit for calls to the agent service.
+
+A fixed cap is too low when the agent is warm and too high while it is
+cold-starting. ``AdaptiveConcurrencyLimiter`` lets at most ``limit`` calls run
+at once and queues the rest in FIFO order; after every call the limit
+algorithm adjusts ``limit`` from the observed latency and whether the call was
+dropped (timeout, message deadline, connection error, 429 or 5xx):
+
+  - ``AIMDLimit``: +1 while the limit is being used, multiplicative decrease
+    on drops or latency above a threshold.
+  - ``GradientLimit``: compares each latency sample with a long-term average
+    and shrinks the limit as queueing makes calls slower (after Netflix's
+    concurrency-limits Gradient2).
+  - ``FixedLimit``: never changes, the previous behaviour.
+
+``benchmarks/sim_agent_limiter.py`` runs them against a stub agent with
+configurable capacity and latency curves.
+"""
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Protocol
+
+import httpx
+
+from ..utils.app_config import config
+from ..utils.deadline import remaining
+from ..utils.metrics import metrics
+
+
+class LimitAlgorithm(Protocol):
+    """Computes the concurrency limit from call samples."""
+
+    limit: float
+
+    def on_sample(self, rtt: float, inflight: int, dropped: bool) -> None:
+        """
+        Update the limit after a call.
+
+        Args:
+            rtt: Call duration in seconds
+            inflight: Calls in flight when this one started (including it)
+            dropped: Whether the call failed because the service is overloaded
+        """
+        ...
+
+
+class FixedLimit:
+    """A limit that never changes."""
+
+    def __init__(self, limit: int):
+        self.limit = float(limit)
+
+    def on_sample(self, rtt: float, inflight: int, dropped: bool) -> None:
+        pass
+
+
+class AIMDLimit:
+    """Additive increase, multiplicative decrease."""
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.9,
+        latency_threshold: float = 10.0,
+    ):
+        """
+        Args:
+            initial: Starting limit
+            min_limit: Lowest limit
+            max_limit: Highest limit
+            backoff_ratio: Factor applied to the limit on a drop
+            latency_threshold: Calls slower than this count as drops
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_threshold = latency_threshold
+
+    def on_sample(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if dropped or rtt > self.latency_threshold:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        elif inflight * 2 >= self.limit:
+            # Only grow while the current limit is actually being used
+            self.limit = min(self.max_limit, self.limit + 1)
+
+
+class GradientLimit:
+    """Latency-gradient limit: shrinks as calls get slower than their long-term average."""
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 1.5,
+        smoothing: float = 0.2,
+        long_window: int = 600,
+        backoff_ratio: float = 0.9,
+    ):
+        """
+        Args:
+            initial: Starting limit
+            min_limit: Lowest limit
+            max_limit: Highest limit
+            tolerance: How much slower than the long-term average a call may be
+                before the limit shrinks (1.5 = 50% slower)
+            smoothing: Weight of each new limit estimate
+            long_window: Samples in the long-term latency average
+            backoff_ratio: Factor applied to the limit on a drop
+        """
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff_ratio = backoff_ratio
+        self._long_factor = 2.0 / (long_window + 1)
+        self._long_rtt = 0.0
+
+    def on_sample(self, rtt: float, inflight: int, dropped: bool) -> None:
+        if dropped:
+            self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+            return
+        if self._long_rtt == 0.0:
+            self._long_rtt = rtt
+        else:
+            self._long_rtt += (rtt - self._long_rtt) * self._long_factor
+        if self._long_rtt / max(rtt, 1e-9) > 2:
+            # Latency dropped a lot (e.g. after a cold start): let the average catch up
+            self._long_rtt *= 0.95
+        if inflight * 2 < self.limit:
+            # Not using the limit: latency says nothing about it
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_rtt / max(rtt, 1e-9)))
+        estimate = self.limit * gradient + math.sqrt(self.limit)
+        estimate = self.limit * (1 - self.smoothing) + estimate * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, estimate))
+
+
+def build_limit_algorithm(
+    name: str, initial: int, min_limit: int, max_limit: int, latency_threshold: float
+) -> LimitAlgorithm:
+    """Build the limit algorithm selected in the configuration ("gradient", "aimd" or "fixed")."""
+    if name == "gradient":
+        return GradientLimit(initial, min_limit, max_limit)
+    if name == "aimd":
+        return AIMDLimit(initial, min_limit, max_limit, latency_threshold=latency_threshold)
+    if name == "fixed":
+        return FixedLimit(initial)
+    raise ValueError(f"Unknown concurrency limit algorithm: {name}")
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """
+    Whether a failed call says the service is overloaded (rather than e.g. a bad request).
+
+    A call cancelled because the message deadline ran out counts as a
+    timeout, and errors raised from an overload error count as one.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    if isinstance(error, asyncio.CancelledError):
+        left = remaining()
+        return left is not None and left <= 0
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError)):
+        return True
+    return error.__cause__ is not None and is_overload_error(error.__cause__)
+
+
+class LimiterSlot:
+    """A slot held for one call; ``drop`` reports an overload that did not raise."""
+
+    __slots__ = ("dropped",)
+
+    def __init__(self):
+        self.dropped = False
+
+    def drop(self) -> None:
+        """Count the call as dropped (e.g. a 429 or 5xx response returned, not raised)."""
+        self.dropped = True
+
+
+class AdaptiveConcurrencyLimiter:
+    """Runs at most ``algorithm.limit`` calls at once, feeding every call back into the algorithm."""
+
+    def __init__(self, algorithm: LimitAlgorithm, name: str = "agent"):
+        """
+        Args:
+            algorithm: Limit algorithm updated after each call
+            name: Label used in metrics
+        """
+        self.algorithm = algorithm
+        self.name = name
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def limit(self) -> int:
+        """Current concurrency limit."""
+        return max(1, int(self.algorithm.limit))
+
+    @property
+    def waiting(self) -> int:
+        """Calls waiting for a slot."""
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "inflight": self.inflight, "waiting": self.waiting}
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1
+                waiter.set_result(None)
+
+    async def _acquire(self) -> None:
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            return
+        started = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # The slot was handed over just before we were cancelled
+                self.inflight -= 1
+                self._wake()
+            raise
+        metrics.observe("concurrency_limit_wait_seconds", time.monotonic() - started, limiter=self.name)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[LimiterSlot]:
+        """
+        Hold a slot for one call; its duration and outcome update the limit.
+
+        Errors other than overload (see ``is_overload_error``) release the
+        slot without producing a sample.
+
+        Yields:
+            The slot, to report an overload response with ``drop``
+        """
+        await self._acquire()
+        inflight = self.inflight
+        started = time.monotonic()
+        slot = LimiterSlot()
+        dropped = False
+        sample = True
+        try:
+            yield slot
+        except BaseException as e:
+            dropped = is_overload_error(e)
+            sample = dropped
+            raise
+        finally:
+            self.inflight -= 1
+            dropped = dropped or slot.dropped
+            if sample or dropped:
+                self.algorithm.on_sample(time.monotonic() - started, inflight, dropped)
+            self._wake()
+
+
+# Singleton instance to be used across the application
+agent_limiter = AdaptiveConcurrencyLimiter(
+    build_limit_algorithm(
+        config.agent_limit_algorithm,
+        initial=config.agent_limit_initial,
+        min_limit=config.agent_limit_min,
+        max_limit=config.agent_limit_max,
+        latency_threshold=config.agent_limit_latency_threshold,
+    ),
+    name="agent",
+)
+
+metrics.register_gauge("agent_concurrency", agent_limiter.stats)
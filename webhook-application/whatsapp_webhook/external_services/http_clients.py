@@ -0,0 +1,158 @@
+"""
+Shared, pooled HTTP clients for outbound calls.
+
+Clients are opened in the FastAPI lifespan and reused for every request, so
+TCP/TLS handshakes are paid once per pooled connection instead of once per
+call. Code running outside the application (scripts, notebooks) gets a client
+created lazily on first use.
+"""
+from typing import Any, Callable, Dict, Set
+
+import httpx
+
+from ..utils.app_config import config
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+logger = get_logger("http_clients")
+
+AGENT = "agent"
+GRAPH = "graph"
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_limits: Dict[str, httpx.Limits] = {}
+_unreadable_pools: Set[str] = set()
+
+
+def _build_client(name: str, http2: bool, timeout: httpx.Timeout, limits: httpx.Limits) -> httpx.AsyncClient:
+    _limits[name] = limits
+    transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+def create_agent_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled client used for the agent service.
+
+    Returns:
+        An ``httpx.AsyncClient`` with HTTP/2 and keep-alive pooling as configured
+    """
+    return _build_client(
+        AGENT,
+        http2=config.agent_http2,
+        timeout=httpx.Timeout(config.agent_timeout),
+        limits=httpx.Limits(
+            max_connections=config.agent_max_connections,
+            max_keepalive_connections=config.agent_max_keepalive_connections,
+            keepalive_expiry=config.agent_keepalive_expiry,
+        ),
+    )
+
+
+def create_graph_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled client used for the WhatsApp Graph API.
+
+    Connect and read timeouts are separate so a slow handshake fails fast
+    while a slow media download still has time to finish.
+
+    Returns:
+        An ``httpx.AsyncClient`` with HTTP/2 and keep-alive pooling as configured
+    """
+    return _build_client(
+        GRAPH,
+        http2=config.graph_http2,
+        timeout=httpx.Timeout(
+            connect=config.graph_connect_timeout,
+            read=config.graph_read_timeout,
+            write=config.graph_read_timeout,
+            pool=config.graph_pool_timeout,
+        ),
+        limits=httpx.Limits(
+            max_connections=config.graph_max_connections,
+            max_keepalive_connections=config.graph_max_keepalive_connections,
+            keepalive_expiry=config.graph_keepalive_expiry,
+        ),
+    )
+
+
+_FACTORIES: Dict[str, Callable[[], httpx.AsyncClient]] = {
+    AGENT: create_agent_http_client,
+    GRAPH: create_graph_http_client,
+}
+
+
+def _get_client(name: str) -> httpx.AsyncClient:
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _FACTORIES[name]()
+    return client
+
+
+def get_agent_http_client() -> httpx.AsyncClient:
+    """Return the shared agent client, creating it if the lifespan has not."""
+    return _get_client(AGENT)
+
+
+def get_graph_http_client() -> httpx.AsyncClient:
+    """Return the shared Graph API client, creating it if the lifespan has not."""
+    return _get_client(GRAPH)
+
+
+def pool_stats() -> Dict[str, Any]:
+    """
+    Connection-pool usage of every open shared client.
+
+    Returns:
+        Per client: open, active and idle connections, the configured maximum,
+        and saturation (active / max). The counts are None for a client whose
+        pool cannot be read (e.g. a custom transport, or an httpx release that
+        renamed its internals); a warning is logged once for that client.
+    """
+    stats = {}
+    for name, client in list(_clients.items()):
+        max_connections = _limits[name].max_connections or 0
+        try:
+            # httpx does not expose its pool; read httpcore's through the transport
+            connections = list(client._transport._pool.connections)
+            idle = sum(1 for connection in connections if connection.is_idle())
+        except AttributeError:
+            if name not in _unreadable_pools:
+                _unreadable_pools.add(name)
+                logger.warning(f"Cannot read the connection pool of the {name} client, pool stats disabled")
+            stats[name] = {
+                "connections": None,
+                "active": None,
+                "idle": None,
+                "max_connections": max_connections,
+                "saturation": None,
+            }
+            continue
+        active = len(connections) - idle
+        stats[name] = {
+            "connections": len(connections),
+            "active": active,
+            "idle": idle,
+            "max_connections": max_connections,
+            "saturation": round(active / max_connections, 3) if max_connections else None,
+        }
+    return stats
+
+
+metrics.register_gauge("http_pools", pool_stats)
+
+
+async def open_http_clients() -> None:
+    """Create the shared clients (called on application startup)."""
+    for name in _FACTORIES:
+        _get_client(name)
+    logger.info(
+        "Shared HTTP clients opened",
+        extra={"agent_http2": config.agent_http2, "graph_http2": config.graph_http2},
+    )
+
+
+async def close_http_clients() -> None:
+    """Close the shared clients and their pooled connections (called on shutdown)."""
+    for name in list(_clients):
+        await _clients.pop(name).aclose()
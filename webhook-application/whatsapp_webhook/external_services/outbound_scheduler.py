@@ -0,0 +1,291 @@
+"""
+Central scheduler for outbound WhatsApp messages.
+
+Every WhatsApp phone number (one per app, identified by its ``/messages``
+URL) gets its own lane with a token bucket, so AA and PP are throttled
+independently. Inside a lane, messages are picked by priority (replies before
+acknowledgements before bulk traffic) while each recipient still receives its
+messages in the order they were submitted. A 429 pauses the whole lane for the
+Retry-After period and the message is retried without losing its place.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from ..utils.app_config import config
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+from .whatsapp_client import send_whatsapp_message
+
+logger = get_logger("outbound_scheduler")
+
+
+class Priority(IntEnum):
+    """Outbound lanes, most urgent first."""
+    REPLY = 0
+    ACK = 1
+    BULK = 2
+
+
+@dataclass
+class OutboundJob:
+    """A message waiting to be sent."""
+    to: str
+    message: Dict[str, Any]
+    token: str
+    priority: Priority
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.monotonic)
+    attempts: int = 0
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, up to ``burst`` stored."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        """Wait until a token is available (and any 429 pause is over), then take it."""
+        while True:
+            now = time.monotonic()
+            if now < self.paused_until:
+                await asyncio.sleep(self.paused_until - now)
+                continue
+            self._refill(now)
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Stop handing out tokens for ``seconds`` and drop the stored burst."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class _PhoneLane:
+    """Queues, rate limit and dispatcher of one WhatsApp phone number."""
+
+    def __init__(self, url: str, rate: float, burst: float, max_inflight: int):
+        self.url = url
+        self.bucket = TokenBucket(rate, burst)
+        self.inflight = asyncio.Semaphore(max_inflight)
+        self.recipients: Dict[str, Deque[OutboundJob]] = {}
+        self.heap: List[Tuple[int, int, str]] = []
+        self.busy: Set[str] = set()
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.sending: Set[asyncio.Task] = set()
+
+    def push(self, job: OutboundJob, sequence: int, front: bool = False) -> None:
+        queue = self.recipients.setdefault(job.to, deque())
+        if front:
+            queue.appendleft(job)
+        else:
+            queue.append(job)
+        # One heap entry per job; popping an entry sends that recipient's oldest
+        # job, so an urgent message also pulls earlier ones for the same recipient
+        heapq.heappush(self.heap, (job.priority, sequence, job.to))
+        self.wakeup.set()
+
+    def pop_ready(self) -> Optional[OutboundJob]:
+        """Take the most urgent job whose recipient has nothing in flight."""
+        skipped = []
+        job = None
+        while self.heap:
+            entry = heapq.heappop(self.heap)
+            if entry[2] in self.busy:
+                skipped.append(entry)
+                continue
+            queue = self.recipients[entry[2]]
+            job = queue.popleft()
+            if not queue:
+                del self.recipients[entry[2]]
+            break
+        for entry in skipped:
+            heapq.heappush(self.heap, entry)
+        return job
+
+    def depth(self) -> Dict[str, int]:
+        counts = {priority.name.lower(): 0 for priority in Priority}
+        for queue in self.recipients.values():
+            for job in queue:
+                counts[job.priority.name.lower()] += 1
+        return counts
+
+
+class OutboundScheduler:
+    """Rate-limited, prioritized, per-recipient ordered sender for the Graph API."""
+
+    def __init__(
+        self,
+        rate_per_second: float = 20.0,
+        burst: float = 40.0,
+        max_inflight_per_number: int = 16,
+        max_attempts: int = 5,
+        default_retry_after: float = 5.0,
+    ):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_inflight_per_number = max_inflight_per_number
+        self.max_attempts = max_attempts
+        self.default_retry_after = default_retry_after
+        self._lanes: Dict[str, _PhoneLane] = {}
+        self._sequence = itertools.count()
+
+    def _lane(self, url: str) -> _PhoneLane:
+        lane = self._lanes.get(url)
+        if lane is None:
+            lane = self._lanes[url] = _PhoneLane(
+                url, self.rate_per_second, self.burst, self.max_inflight_per_number
+            )
+        if lane.task is None or lane.task.done():
+            lane.task = asyncio.create_task(self._dispatch(lane))
+        return lane
+
+    async def send(
+        self,
+        to: str,
+        message: Dict[str, Any],
+        whatsapp_api_url: str,
+        token: str,
+        priority: Priority = Priority.REPLY,
+    ) -> Dict[str, Any]:
+        """
+        Queue a message and wait until it has been sent.
+
+        Args:
+            to: Recipient phone number
+            message: Message body as built by ``create_text_message`` and friends
+            whatsapp_api_url: ``/messages`` endpoint of the sending phone number
+            token: WhatsApp API token
+            priority: Lane the message is scheduled in
+
+        Returns:
+            The Graph API response
+
+        Raises:
+            httpx.HTTPError: If the message could not be sent
+        """
+        job = OutboundJob(
+            to=to,
+            message=message,
+            token=token,
+            priority=priority,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._lane(whatsapp_api_url).push(job, next(self._sequence))
+        return await job.future
+
+    async def _dispatch(self, lane: _PhoneLane) -> None:
+        while True:
+            job = lane.pop_ready()
+            if job is None:
+                lane.wakeup.clear()
+                await lane.wakeup.wait()
+                continue
+            lane.busy.add(job.to)
+            acquired = False
+            try:
+                await lane.inflight.acquire()
+                acquired = True
+                await lane.bucket.acquire()
+            except asyncio.CancelledError:
+                # Put the job back so ``stop`` fails it with the rest of the queue
+                if acquired:
+                    lane.inflight.release()
+                lane.busy.discard(job.to)
+                lane.push(job, next(self._sequence), front=True)
+                raise
+            task = asyncio.create_task(self._send(lane, job))
+            lane.sending.add(task)
+            task.add_done_callback(lane.sending.discard)
+
+    async def _send(self, lane: _PhoneLane, job: OutboundJob) -> None:
+        priority = job.priority.name.lower()
+        try:
+            if job.future.done():
+                # The caller gave up while the message was queued
+                return
+            if job.attempts == 0:
+                metrics.observe(
+                    "outbound_queue_wait_seconds", time.monotonic() - job.enqueued_at, priority=priority
+                )
+            job.attempts += 1
+            result = await send_whatsapp_message(job.to, job.message, lane.url, job.token)
+            metrics.inc("outbound_sent", priority=priority)
+            if not job.future.done():
+                job.future.set_result(result)
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 429 and job.attempts < self.max_attempts:
+                retry_after = self._retry_after(e.response)
+                logger.warning(
+                    f"Graph API rate limit hit, pausing sends for {retry_after:.1f}s",
+                    extra={"attempt": job.attempts},
+                )
+                metrics.inc("outbound_rate_limited")
+                lane.bucket.pause(retry_after)
+                lane.push(job, next(self._sequence), front=True)
+            else:
+                self._fail(job, e)
+        except Exception as e:
+            self._fail(job, e)
+        finally:
+            lane.inflight.release()
+            lane.busy.discard(job.to)
+            lane.wakeup.set()
+
+    def _fail(self, job: OutboundJob, error: Exception) -> None:
+        metrics.inc("outbound_failed", priority=job.priority.name.lower())
+        if not job.future.done():
+            job.future.set_exception(error)
+
+    def _retry_after(self, response: httpx.Response) -> float:
+        try:
+            return max(0.0, float(response.headers["Retry-After"]))
+        except (KeyError, ValueError):
+            return self.default_retry_after
+
+    def depth(self) -> Dict[str, Dict[str, int]]:
+        """Queued messages per phone-number lane and priority."""
+        return {url.rsplit("/", 2)[-2]: lane.depth() for url, lane in self._lanes.items()}
+
+    async def stop(self) -> None:
+        """Cancel the dispatchers; queued messages are failed."""
+        tasks = [lane.task for lane in self._lanes.values() if lane.task]
+        tasks += [task for lane in self._lanes.values() for task in lane.sending]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for lane in self._lanes.values():
+            for queue in lane.recipients.values():
+                for job in queue:
+                    job.future.cancel()
+        self._lanes.clear()
+
+
+# Singleton instance to be used across the application
+outbound_scheduler = OutboundScheduler(
+    rate_per_second=config.outbound_rate_per_second,
+    burst=config.outbound_burst,
+    max_inflight_per_number=config.outbound_max_inflight_per_number,
+    max_attempts=config.outbound_max_attempts,
+)
+
+metrics.register_gauge("outbound_queue_depth", outbound_scheduler.depth)
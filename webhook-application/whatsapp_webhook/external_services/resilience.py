@@ -0,0 +1,232 @@
+"""
+Retries, hedged requests and circuit breaking for the agent and Graph API.
+
+Every remote call goes through the ``Dependency`` of its service:
+
+  - Failed attempts are retried with full-jitter exponential backoff, but
+    only when that is safe. Idempotent requests (GETs) are retried on any
+    transport error and on 429 / 5xx. Other requests (agent runs, sending a
+    message) are retried only when the request certainly was not processed:
+    the connection could not be made, or the service answered with a status
+    meaning it did not take the request.
+  - Idempotent lookups can be hedged: if the first attempt has not answered
+    after ``hedge_delay`` seconds a second one is started and the first
+    answer wins.
+  - A circuit breaker per dependency opens after consecutive failures and
+    fails calls fast with ``CircuitOpenError`` until a trial call, allowed
+    every ``reset_timeout`` seconds, succeeds again. Waiting too long for a
+    connection of our own pool (``httpx.PoolTimeout``) says nothing about
+    the service and is not counted.
+"""
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, FrozenSet, Optional
+
+import httpx
+
+from ..utils.app_config import config
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+logger = get_logger("resilience")
+
+Request = Callable[[], Awaitable[httpx.Response]]
+
+# Errors raised before the request reached the service
+NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+def is_breaker_failure(error: BaseException) -> bool:
+    """Whether a transport error counts against the dependency's circuit breaker."""
+    return isinstance(error, httpx.TransportError) and not isinstance(error, httpx.PoolTimeout)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+    def __init__(self, dependency: str):
+        super().__init__(f"Circuit breaker for {dependency} is open")
+        self.dependency = dependency
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker: closed -> open -> half_open -> closed."""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        """
+        Args:
+            name: Dependency name, used in metrics
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds between trial calls while open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning(f"Circuit breaker for {self.name}: {self.state} -> {state}")
+            metrics.inc("circuit_breaker_transitions", dependency=self.name, state=state)
+            self.state = state
+
+    def check(self) -> None:
+        """
+        Let a call through or fail it fast.
+
+        Raises:
+            CircuitOpenError: If the breaker is open and no trial call is due
+        """
+        if self.state == "closed":
+            return
+        now = time.monotonic()
+        if now - self._opened_at >= self.reset_timeout:
+            # This call is the trial; the next one waits another reset_timeout
+            self._set_state("half_open")
+            self._opened_at = now
+            return
+        metrics.inc("circuit_breaker_rejections", dependency=self.name)
+        raise CircuitOpenError(self.name)
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._set_state("closed")
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+            self._set_state("open")
+
+
+class Dependency:
+    """Retry, hedging and circuit-breaking policy of one remote service."""
+
+    def __init__(
+        self,
+        name: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        hedge_delay: float = 0.0,
+        retry_statuses: FrozenSet[int] = frozenset({429, 500, 502, 503, 504}),
+        not_processed_statuses: FrozenSet[int] = frozenset({503}),
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        """
+        Args:
+            name: Dependency name, used in metrics
+            max_attempts: Attempts per call, including the first
+            base_delay: Backoff before the first retry (doubled on each retry, up to ``max_delay``)
+            max_delay: Longest backoff
+            hedge_delay: Seconds before a hedged lookup is duplicated (0 disables hedging)
+            retry_statuses: Statuses retried for idempotent requests
+            not_processed_statuses: Statuses meaning the request was not processed,
+                retried for any request
+            breaker: Circuit breaker (one with default settings if omitted)
+        """
+        self.name = name
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_delay = hedge_delay
+        self.retry_statuses = retry_statuses
+        self.not_processed_statuses = not_processed_statuses
+        self.breaker = breaker or CircuitBreaker(name)
+
+    def backoff(self, retry: int) -> float:
+        """Full-jitter delay before retry number ``retry`` (1-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (retry - 1)))
+
+    async def _hedged(self, request: Request) -> httpx.Response:
+        pending = {asyncio.create_task(request())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay)
+            if done:
+                return done.pop().result()
+            metrics.inc("hedged_requests", dependency=self.name)
+            pending.add(asyncio.create_task(request()))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # Also reached when the caller is cancelled while an attempt is running
+            for task in pending:
+                task.cancel()
+
+    async def call(self, request: Request, idempotent: bool = False, hedge: bool = False) -> httpx.Response:
+        """
+        Run a request under the dependency's policy.
+
+        Args:
+            request: Zero-argument coroutine function sending the request
+            idempotent: Whether repeating the request is harmless
+            hedge: Hedge the request (only idempotent requests are hedged)
+
+        Returns:
+            The last response; error statuses are returned, not raised
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            httpx.TransportError: If the last attempt failed to get a response
+        """
+        retry_statuses = self.retry_statuses if idempotent else self.not_processed_statuses
+        hedged = hedge and idempotent and self.hedge_delay > 0
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.check()
+            try:
+                response = await (self._hedged(request) if hedged else request())
+            except httpx.TransportError as e:
+                if is_breaker_failure(e):
+                    self.breaker.record_failure()
+                if attempt == self.max_attempts or not (idempotent or isinstance(e, NOT_SENT_ERRORS)):
+                    raise
+                reason = type(e).__name__
+            else:
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if attempt == self.max_attempts or response.status_code not in retry_statuses:
+                    return response
+                reason = str(response.status_code)
+            metrics.inc("dependency_retries", dependency=self.name, reason=reason)
+            await asyncio.sleep(self.backoff(attempt))
+
+
+def _build_dependency(name: str, not_processed_statuses: FrozenSet[int]) -> Dependency:
+    return Dependency(
+        name,
+        max_attempts=config.retry_max_attempts,
+        base_delay=config.retry_base_delay,
+        max_delay=config.retry_max_delay,
+        hedge_delay=config.hedge_delay,
+        not_processed_statuses=not_processed_statuses,
+        breaker=CircuitBreaker(
+            name,
+            failure_threshold=config.breaker_failure_threshold,
+            reset_timeout=config.breaker_reset_timeout,
+        ),
+    )
+
+
+# Singleton instances to be used across the application. Cloud Run answers 429
+# and 503 without reaching the agent; Graph API 429s are left to the outbound
+# scheduler, which pauses the whole phone-number lane.
+agent_dependency = _build_dependency("agent", frozenset({429, 503}))
+graph_dependency = _build_dependency("graph", frozenset({503}))
+
+metrics.register_gauge(
+    "circuit_breakers",
+    lambda: {dependency.name: dependency.breaker.state for dependency in (agent_dependency, graph_dependency)},
+)
@@ -0,0 +1,121 @@
+"""
+Cache of agent sessions known to exist.
+
+``create_agent_session`` consults this cache before the GET-then-POST round
+trip, so most messages go straight to ``/run``. Entries are added when a
+session is found or created, dropped when ``/run`` reports the session as
+missing, and optionally written to disk on shutdown so warm restarts keep them.
+"""
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from ..utils.app_config import config
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+SessionKey = Tuple[str, str, str]
+
+
+class KnownSessionCache:
+    """Bounded LRU + TTL set of (app_name, user_id, session_id) keys."""
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 50000, persist_path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.logger = get_logger("session_cache")
+        self._sessions: "OrderedDict[SessionKey, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, key: SessionKey) -> bool:
+        expires_at = self._sessions.get(key)
+        if expires_at is None:
+            metrics.inc("session_cache", result="miss")
+            return False
+        if expires_at <= time.time():
+            del self._sessions[key]
+            metrics.inc("session_cache", result="expired")
+            return False
+        self._sessions.move_to_end(key)
+        metrics.inc("session_cache", result="hit")
+        return True
+
+    def add(self, key: SessionKey) -> None:
+        """Remember that a session exists."""
+        self._store(key, time.time() + self.ttl)
+
+    def _store(self, key: SessionKey, expires_at: float) -> None:
+        self._sessions[key] = expires_at
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_entries:
+            self._sessions.popitem(last=False)
+
+    def invalidate(self, key: SessionKey) -> None:
+        """Forget a session the agent no longer knows about."""
+        self._sessions.pop(key, None)
+
+    def load(self) -> None:
+        """
+        Load unexpired entries saved by a previous run, if persistence is enabled.
+
+        An unreadable file or malformed entries are skipped with a warning: the
+        cache is only an optimization and must never prevent startup.
+        """
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            if not isinstance(entries, list):
+                raise ValueError(f"expected a list of entries, got {type(entries).__name__}")
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load session cache: {e}")
+            return
+        now = time.time()
+        skipped = 0
+        for entry in entries:
+            try:
+                app_name, user_id, session_id, expires_at = entry
+                if not all(isinstance(part, str) for part in (app_name, user_id, session_id)):
+                    raise TypeError("session key parts must be strings")
+                expires_at = float(expires_at)
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            if expires_at > now:
+                self._store((app_name, user_id, session_id), expires_at)
+        if skipped:
+            self.logger.warning(f"Skipped {skipped} malformed entries in the session cache file")
+        self.logger.info(f"Loaded {len(self._sessions)} known agent sessions")
+
+    def save(self) -> None:
+        """Write unexpired entries to disk, if persistence is enabled."""
+        if not self.persist_path:
+            return
+        now = time.time()
+        entries = [[*key, expires_at] for key, expires_at in self._sessions.items() if expires_at > now]
+        try:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.persist_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            self.logger.warning(f"Could not save session cache: {e}")
+
+
+# Singleton instance to be used across the application
+known_sessions = KnownSessionCache(
+    ttl=config.session_cache_ttl,
+    max_entries=config.session_cache_max_entries,
+    persist_path=config.session_cache_path or None,
+)
+
+metrics.register_gauge("session_cache_entries", lambda: len(known_sessions))
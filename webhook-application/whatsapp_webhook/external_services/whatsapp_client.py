@@ -1,33 +1,68 @@
 """
 WhatsApp API client utilities for sending messages and downloading media.
 """
+import asyncio
 import httpx
 import logging
+import time
 from typing import Any, Dict, Optional
 
+from ..media import MediaHandle, MediaTooLargeError
+from ..utils.app_config import config
+from ..utils.deadline import deadline_stage
+from ..utils.metrics import metrics
+from .http_clients import get_graph_http_client
+from .resilience import graph_dependency
+
+# Buckets for downloaded media sizes, in bytes (64 KiB .. 16 MiB)
+_SIZE_BUCKETS = tuple(2 ** power for power in range(16, 25))
+
 async def send_whatsapp_message(
     to: str,
     message: Dict[str, Any],
     whatsapp_api_url: str,
-    token: str
+    token: str,
+    client: Optional[httpx.AsyncClient] = None,
 ) -> Dict[str, Any]:
-    """Sends a message via the WhatsApp API."""
+    """
+    Sends a message via the WhatsApp API using the shared pooled client by default.
+
+    Status updates (``create_read_receipt``) refer to a received message and
+    are sent without a recipient.
+    """
     if not to.startswith("+"):
         to = f"+{to}"
     
-    payload = {"messaging_product": "whatsapp", "to": to, **message}
+    payload = {"messaging_product": "whatsapp", **message}
+    if "status" not in message:
+        payload["to"] = to
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     
     logging.info(f"Sending WhatsApp message to {to}")
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        response = await client.post(whatsapp_api_url, json=payload, headers=headers)
-        response.raise_for_status()
-        result = response.json()
-        logging.info(f"WhatsApp message sent successfully: {result}")
-        return result
+    client = client or get_graph_http_client()
+    start = time.perf_counter()
+    try:
+        response = await graph_dependency.call(
+            lambda: client.post(whatsapp_api_url, json=payload, headers=headers)
+        )
+    except httpx.PoolTimeout:
+        metrics.inc("graph_pool_timeouts", operation="send")
+        raise
+    metrics.observe("graph_send_seconds", time.perf_counter() - start)
+    response.raise_for_status()
+    result = response.json()
+    logging.info(f"WhatsApp message sent successfully: {result}")
+    return result
 
 
 
+def create_read_receipt(message_id: str, typing_indicator: bool = False) -> Dict[str, Any]:
+    """Creates a mark-as-read status update, optionally showing the typing indicator."""
+    receipt = {"status": "read", "message_id": message_id}
+    if typing_indicator:
+        receipt["typing_indicator"] = {"type": "text"}
+    return receipt
+
 def create_text_message(body: str, preview_url: bool = False) -> Dict[str, Any]:
     """Creates a WhatsApp text message structure."""
     return {"type": "text", "text": {"body": body, "preview_url": preview_url}}
@@ -46,39 +81,98 @@ def create_document_message(media_id: str, filename: str, caption: Optional[str]
         message["document"]["caption"] = caption
     return message
 
-async def download_whatsapp_media(media_id: str, whatsapp_base_url: str, token: str) -> Optional[bytes]:
-    """Downloads media content from WhatsApp using the media ID."""
+async def download_whatsapp_media(
+    media_id: str,
+    whatsapp_base_url: str,
+    token: str,
+    client: Optional[httpx.AsyncClient] = None,
+    max_bytes: Optional[int] = None,
+) -> Optional[MediaHandle]:
+    """
+    Streams media content from WhatsApp into a size-capped spooled buffer.
+
+    The download is aborted as soon as the declared or received size exceeds
+    ``max_bytes``, without buffering the rest of the file, or when the
+    message deadline runs out.
+
+    Args:
+        media_id: WhatsApp media ID
+        whatsapp_base_url: Graph API base URL
+        token: WhatsApp API token
+        client: HTTP client (the shared Graph API client by default)
+        max_bytes: Size limit (``MEDIA_MAX_BYTES`` by default)
+
+    Returns:
+        A ``MediaHandle`` the caller must close, or None if the download failed
+
+    Raises:
+        DeadlineExceededError: If the message deadline runs out
+    """
     headers = {"Authorization": f"Bearer {token}"}
+    max_bytes = max_bytes or config.media_max_bytes
     
     # Usar la URL base para obtener información del media
     media_url_endpoint = f"{whatsapp_base_url}/{media_id}"
     
     logging.info(f"Getting media URL for ID: {media_id} from endpoint: {media_url_endpoint}")
     
-    async with httpx.AsyncClient(timeout=30.0) as client:
+    client = client or get_graph_http_client()
+    handle = None
+    async with deadline_stage("media_download"):
         try:
             # Primero obtener la información del media incluyendo la URL de descarga
-            media_response = await client.get(media_url_endpoint, headers=headers)
+            media_response = await graph_dependency.call(
+                lambda: client.get(media_url_endpoint, headers=headers), idempotent=True, hedge=True
+            )
             media_response.raise_for_status()
             media_info = media_response.json()
             
             if "url" not in media_info:
                 logging.error(f"No URL found in media response: {media_info}")
                 return None
+
+            if int(media_info.get("file_size") or 0) > max_bytes:
+                raise MediaTooLargeError(f"Declared size {media_info['file_size']} exceeds {max_bytes} bytes")
             
             # Descargar el contenido del media usando la URL proporcionada
             download_url = media_info["url"]
             logging.info(f"Downloading media content from: {download_url}")
             
-            media_content_response = await client.get(download_url, headers=headers)
-            media_content_response.raise_for_status()
+            handle = MediaHandle(
+                max_bytes=max_bytes,
+                spool_bytes=config.media_spool_bytes,
+                mime_type=media_info.get("mime_type"),
+                tmp_dir=config.media_tmp_dir,
+            )
+            async with client.stream("GET", download_url, headers=headers) as media_content_response:
+                media_content_response.raise_for_status()
+                content_length = int(media_content_response.headers.get("Content-Length") or 0)
+                if content_length > max_bytes:
+                    raise MediaTooLargeError(f"Content-Length {content_length} exceeds {max_bytes} bytes")
+                async for chunk in media_content_response.aiter_bytes():
+                    handle.write(chunk)
             
-            logging.info(f"Media downloaded successfully, size: {len(media_content_response.content)} bytes")
-            return media_content_response.content
+            metrics.observe("media_download_bytes", handle.size, buckets=_SIZE_BUCKETS)
+            logging.info(
+                f"Media downloaded successfully, size: {handle.size} bytes, "
+                f"{'in memory' if handle.in_memory else 'spilled to disk'}"
+            )
+            return handle
             
+        except MediaTooLargeError as e:
+            metrics.inc("media_rejected", reason="too_large")
+            logging.warning(f"Rejected media {media_id}: {e}")
         except httpx.HTTPStatusError as e:
-            logging.error(f"HTTP error downloading media {media_id}: {e.response.status_code} - {e.response.text}")
-            return None
+            logging.error(f"HTTP error downloading media {media_id}: {e.response.status_code}")
+        except httpx.PoolTimeout:
+            metrics.inc("graph_pool_timeouts", operation="download")
+            logging.error(f"Timed out waiting for a Graph API connection to download media {media_id}")
+        except asyncio.CancelledError:
+            if handle is not None:
+                handle.close()
+            raise
         except Exception as e:
             logging.error(f"Error downloading media {media_id}: {e}, endpoint: {media_url_endpoint}", exc_info=True)
-            return None
+        if handle is not None:
+            handle.close()
+        return None
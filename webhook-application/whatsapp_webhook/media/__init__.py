@@ -0,0 +1,24 @@
+"""
+Media handling utilities for the WhatsApp webhook application.
+"""
+from .cache import MediaCache, media_cache, normalize_sha256
+from .chunking import AudioChunk, split_opus
+from .handle import MediaHandle, MediaTooLargeError
+from .ogg import OggError, OpusHead, OpusInfo, OpusPacket, inspect_opus, read_opus, write_opus
+
+__all__ = [
+    "AudioChunk",
+    "split_opus",
+    "MediaCache",
+    "media_cache",
+    "normalize_sha256",
+    "MediaHandle",
+    "MediaTooLargeError",
+    "OggError",
+    "OpusHead",
+    "OpusInfo",
+    "OpusPacket",
+    "inspect_opus",
+    "read_opus",
+    "write_opus"
+]
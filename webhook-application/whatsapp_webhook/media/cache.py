@@ -0,0 +1,323 @@
+"""
+Content-addressed cache of downloaded media and transcripts.
+
+WhatsApp sends the SHA-256 of every media file in the webhook, so a voice
+note forwarded to many users can be recognised before it is downloaded.
+Each entry is stored under that hash as ``<hash>.json`` (transcript and how
+long it took to produce) plus, optionally, ``<hash>.bin`` (the media itself).
+Total size on disk is bounded; the least recently used entries are evicted.
+
+Lookups use the hash declared in the webhook, but entries are only written
+once the downloaded content was checked against it (``verify``) and are
+keyed by the digest of the content itself. File access runs in worker
+threads, serialized by a lock around the index.
+"""
+import asyncio
+import base64
+import binascii
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..utils.app_config import config
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+from .handle import MediaHandle, MediaTooLargeError
+
+_HEX_DIGEST = re.compile(r"^[0-9a-fA-F]{64}$")
+
+
+def normalize_sha256(value: Optional[str]) -> Optional[str]:
+    """
+    Turn a SHA-256 as sent by WhatsApp (hex or base64) into lowercase hex.
+
+    Returns:
+        The hex digest, or None if ``value`` is not a SHA-256
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if _HEX_DIGEST.match(value):
+        return value.lower()
+    try:
+        digest = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return digest.hex() if len(digest) == 32 else None
+
+
+class MediaCache:
+    """Disk-bounded LRU cache of media and transcripts keyed by SHA-256."""
+
+    def __init__(self, directory: Optional[str], max_bytes: int = 512 * 1024 * 1024, store_media: bool = False):
+        """
+        Args:
+            directory: Cache directory; None disables the cache
+            max_bytes: Total size of the cache on disk
+            store_media: Also keep the downloaded media, not only transcripts
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.store_media = store_media
+        self.logger = get_logger("media_cache")
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._hits = 0
+        self._lookups = 0
+        self._saved_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{key}{suffix}")
+
+    def _entry_size(self, key: str) -> int:
+        size = 0
+        for suffix in (".json", ".bin"):
+            try:
+                size += os.path.getsize(self._path(key, suffix))
+            except OSError:
+                pass
+        return size
+
+    def _track(self, key: str) -> None:
+        """Record the current size of ``key`` as most recently used and evict if over budget."""
+        size = self._entry_size(key)
+        self._total += size - self._sizes.pop(key, 0)
+        self._sizes[key] = size
+        while self._total > self.max_bytes and len(self._sizes) > 1:
+            old_key, old_size = self._sizes.popitem(last=False)
+            self._total -= old_size
+            for suffix in (".json", ".bin"):
+                try:
+                    os.remove(self._path(old_key, suffix))
+                except OSError:
+                    pass
+            metrics.inc("media_cache_evictions")
+
+    def _touch(self, key: str) -> None:
+        # mtime is the LRU order used when the index is rebuilt on startup
+        try:
+            os.utime(self._path(key, ".json"))
+        except OSError:
+            pass
+        if key in self._sizes:
+            self._sizes.move_to_end(key)
+        else:
+            self._track(key)
+
+    def _read_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key, ".json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key: str, entry: Dict[str, Any]) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self._path(key, ".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, self._path(key, ".json"))
+
+    def _record(self, kind: str, hit: bool, saved_seconds: float = 0.0) -> None:
+        self._lookups += 1
+        metrics.inc("media_cache", kind=kind, result="hit" if hit else "miss")
+        if hit:
+            self._hits += 1
+            self._saved_seconds += saved_seconds
+            metrics.inc("media_cache_saved_seconds", saved_seconds, kind=kind)
+
+    def verify(self, sha256: Optional[str], handle: MediaHandle) -> Optional[str]:
+        """
+        Check media content against the hash declared for it in the webhook.
+
+        Entries are only written for media that passed this check, so a wrong
+        or forged hash cannot attach content to another file's entry.
+
+        Args:
+            sha256: Hash sent by WhatsApp for the media
+            handle: The media content
+
+        Returns:
+            The content's hex digest, or None if it does not match the declared hash
+        """
+        declared = normalize_sha256(sha256)
+        if declared is None or handle.sha256 != declared:
+            if declared is not None:
+                metrics.inc("media_cache_hash_mismatches")
+                self.logger.warning(f"Media content does not match its declared sha256 {declared}, not caching it")
+            return None
+        return declared
+
+    def _get_transcript(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._read_entry(key)
+            transcript = entry.get("transcript") if entry else None
+            if transcript is None:
+                self._record("transcript", hit=False)
+                return None
+            self._touch(key)
+            self._record(
+                "transcript",
+                hit=True,
+                saved_seconds=entry.get("download_seconds", 0.0) + entry.get("transcribe_seconds", 0.0),
+            )
+            return transcript
+
+    async def get_transcript(self, sha256: Optional[str]) -> Optional[str]:
+        """
+        Look up the transcript of a media file.
+
+        Args:
+            sha256: Hash sent by WhatsApp for the media
+
+        Returns:
+            The cached transcript, or None on a miss
+        """
+        key = normalize_sha256(sha256)
+        if not self.enabled or key is None:
+            return None
+        return await asyncio.to_thread(self._get_transcript, key)
+
+    def _put_transcript(
+        self, key: str, transcript: str, download_seconds: float, transcribe_seconds: float
+    ) -> None:
+        with self._lock:
+            entry = self._read_entry(key) or {}
+            entry.update(
+                transcript=transcript,
+                download_seconds=download_seconds or entry.get("download_seconds", 0.0),
+                transcribe_seconds=transcribe_seconds,
+                stored_at=time.time(),
+            )
+            try:
+                self._write_entry(key, entry)
+                self._track(key)
+            except OSError as e:
+                self.logger.warning(f"Could not cache transcript: {e}")
+
+    async def put_transcript(
+        self,
+        digest: str,
+        transcript: str,
+        download_seconds: float = 0.0,
+        transcribe_seconds: float = 0.0,
+    ) -> None:
+        """
+        Store the transcript of a media file, with the time it took to produce it.
+
+        Args:
+            digest: Hash of the transcribed content, as returned by ``verify``
+            transcript: Transcription result
+            download_seconds: Time spent downloading the media
+            transcribe_seconds: Time spent transcribing it
+        """
+        if not self.enabled:
+            return
+        await asyncio.to_thread(
+            self._put_transcript, digest, transcript, download_seconds, transcribe_seconds
+        )
+
+    def _get_media(self, key: str, max_bytes: int, spool_bytes: int) -> Optional[MediaHandle]:
+        with self._lock:
+            entry = self._read_entry(key) or {}
+            handle = MediaHandle(max_bytes=max_bytes, spool_bytes=spool_bytes, mime_type=entry.get("mime_type"))
+            try:
+                with open(self._path(key, ".bin"), "rb") as f:
+                    while chunk := f.read(64 * 1024):
+                        handle.write(chunk)
+            except (OSError, MediaTooLargeError):
+                handle.close()
+                self._record("media", hit=False)
+                return None
+            self._touch(key)
+            self._record("media", hit=True, saved_seconds=entry.get("download_seconds", 0.0))
+            return handle
+
+    async def get_media(self, sha256: Optional[str], max_bytes: int, spool_bytes: int) -> Optional[MediaHandle]:
+        """
+        Load cached media into a new handle.
+
+        Args:
+            sha256: Hash sent by WhatsApp for the media
+            max_bytes: Size limit of the returned handle
+            spool_bytes: In-memory threshold of the returned handle
+
+        Returns:
+            A ``MediaHandle`` the caller must close, or None on a miss
+        """
+        key = normalize_sha256(sha256)
+        if not self.enabled or not self.store_media or key is None:
+            return None
+        return await asyncio.to_thread(self._get_media, key, max_bytes, spool_bytes)
+
+    def _put_media(self, handle: MediaHandle, download_seconds: float) -> None:
+        key = handle.sha256
+        with self._lock:
+            entry = self._read_entry(key) or {}
+            entry.update(mime_type=handle.mime_type, download_seconds=download_seconds, stored_at=time.time())
+            try:
+                self._write_entry(key, entry)
+                handle.write_to(self._path(key, ".bin"))
+                self._track(key)
+            except OSError as e:
+                self.logger.warning(f"Could not cache media: {e}")
+
+    async def put_media(self, handle: MediaHandle, download_seconds: float = 0.0) -> None:
+        """
+        Store downloaded media under the hash of its content, if media storage is enabled.
+
+        Call it only for media that passed ``verify``.
+
+        Args:
+            handle: Downloaded media (left open)
+            download_seconds: Time spent downloading it
+        """
+        if not self.enabled or not self.store_media or handle.size > self.max_bytes:
+            return
+        await asyncio.to_thread(self._put_media, handle, download_seconds)
+
+    def load(self) -> None:
+        """Index entries left on disk by a previous run, oldest first (blocking; run it in a thread)."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    entries.append((os.path.getmtime(os.path.join(self.directory, name)), name[:-5]))
+                except OSError:
+                    pass
+        with self._lock:
+            self._sizes.clear()
+            self._total = 0
+            for _, key in sorted(entries):
+                self._track(key)
+        self.logger.info(f"Indexed {len(self._sizes)} cached media entries ({self._total} bytes)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Entries, size on disk, hit rate and seconds saved since startup."""
+        return {
+            "entries": len(self._sizes),
+            "bytes": self._total,
+            "hit_rate": round(self._hits / self._lookups, 3) if self._lookups else None,
+            "saved_seconds": round(self._saved_seconds, 3),
+        }
+
+
+# Singleton instance to be used across the application
+media_cache = MediaCache(
+    directory=config.media_cache_dir or None,
+    max_bytes=config.media_cache_max_bytes,
+    store_media=config.media_cache_store_media,
+)
+
+metrics.register_gauge("media_cache", media_cache.stats)
@@ -0,0 +1,97 @@
+"""
+Split long Ogg Opus voice notes into overlapping chunks at quiet points.
+
+Speech's synchronous API only accepts about a minute of audio, so long notes
+are cut into standalone Ogg Opus files that can be recognised in parallel.
+Opus is variable bitrate: silent frames compress to a few bytes, so the
+quietest place to cut is where packets are smallest. No audio is decoded.
+"""
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from .ogg import OPUS_RATE, OpusHead, OpusPacket, write_opus
+
+# Packets per window when looking for a quiet stretch (about 100 ms of 20 ms frames)
+_QUIET_WINDOW = 5
+
+
+@dataclass
+class AudioChunk:
+    """A standalone piece of a longer recording."""
+    index: int
+    start: float
+    duration: float
+    data: bytes
+
+
+def _quietest_cut(packets: Sequence[OpusPacket], first: int, last: int) -> int:
+    """Index in ``[first, last]`` that ends the smallest run of ``_QUIET_WINDOW`` packets."""
+    best, best_size = last, None
+    window = sum(len(packet.data) for packet in packets[max(0, first - _QUIET_WINDOW):first])
+    for index in range(first, last + 1):
+        window += len(packets[index].data)
+        if index - _QUIET_WINDOW >= 0:
+            window -= len(packets[index - _QUIET_WINDOW].data)
+        if best_size is None or window < best_size:
+            best, best_size = index, window
+    return best
+
+
+def split_opus(
+    head: OpusHead,
+    tags: bytes,
+    packets: Sequence[OpusPacket],
+    target_seconds: float = 45.0,
+    max_seconds: float = 55.0,
+    overlap_seconds: float = 0.5,
+) -> List[AudioChunk]:
+    """
+    Cut audio packets into overlapping chunks, each a valid Ogg Opus file.
+
+    Each chunk ends at the quietest point between ``target_seconds`` and
+    ``max_seconds`` from its start; the next chunk starts ``overlap_seconds``
+    earlier so words on the boundary are heard by both.
+
+    Args:
+        head: Identification header of the source stream
+        tags: Comment header packet of the source stream
+        packets: Audio packets of the source stream
+        target_seconds: Shortest chunk, unless the audio ends sooner
+        max_seconds: Longest chunk
+        overlap_seconds: Audio repeated at the start of the next chunk
+
+    Returns:
+        Chunks in order
+    """
+    target = int(target_seconds * OPUS_RATE)
+    limit = int(max_seconds * OPUS_RATE)
+    overlap = int(overlap_seconds * OPUS_RATE)
+    offsets = [0]
+    for packet in packets:
+        offsets.append(offsets[-1] + packet.samples)
+
+    chunks: List[AudioChunk] = []
+    start = 0
+    while start < len(packets):
+        if offsets[-1] - offsets[start] <= limit:
+            end = len(packets) - 1
+        else:
+            first = last = start
+            while last + 1 < len(packets) and offsets[last + 2] - offsets[start] <= limit:
+                last += 1
+                if offsets[first + 1] - offsets[start] < target:
+                    first = last
+            end = _quietest_cut(packets, first, last)
+        chunks.append(AudioChunk(
+            index=len(chunks),
+            start=offsets[start] / OPUS_RATE,
+            duration=(offsets[end + 1] - offsets[start]) / OPUS_RATE,
+            data=write_opus(head, tags, packets[start:end + 1], serial=len(chunks) + 1),
+        ))
+        if end == len(packets) - 1:
+            break
+        next_start = end + 1
+        while next_start > start + 1 and offsets[end + 1] - offsets[next_start - 1] <= overlap:
+            next_start -= 1
+        start = next_start
+    return chunks
@@ -0,0 +1,123 @@
+"""
+Handle to downloaded media.
+
+Media is streamed into an in-memory buffer: small files (most voice notes)
+stay there, and a file growing past ``spool_bytes`` is moved to a temporary
+file on disk, so a burst of concurrent downloads never holds every file in
+RAM at once. The SHA-256 and size are computed while the bytes arrive.
+"""
+import hashlib
+import io
+import mmap
+import tempfile
+from typing import BinaryIO, Optional
+
+
+class MediaTooLargeError(Exception):
+    """Raised when media exceeds the configured size limit."""
+
+
+class MediaHandle:
+    """Readable, size-capped media buffer filled incrementally."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        spool_bytes: int = 1024 * 1024,
+        mime_type: Optional[str] = None,
+        tmp_dir: Optional[str] = None,
+    ):
+        """
+        Args:
+            max_bytes: Writing more than this raises ``MediaTooLargeError``
+            spool_bytes: Content above this size is moved from memory to a temporary file
+            mime_type: MIME type reported by the Graph API
+            tmp_dir: Directory for spilled files (system default if None)
+        """
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.mime_type = mime_type
+        self.tmp_dir = tmp_dir
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+        self._buffer: Optional[io.BytesIO] = io.BytesIO()
+        self._file: Optional[BinaryIO] = None
+        self._mmap: Optional[mmap.mmap] = None
+
+    def __enter__(self) -> "MediaHandle":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def sha256(self) -> str:
+        """Hex digest of the content written so far."""
+        return self._sha256.hexdigest()
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the content is still held in memory (not spilled to disk)."""
+        return self._file is None
+
+    def write(self, chunk: bytes) -> None:
+        """
+        Append a chunk of downloaded content.
+
+        Raises:
+            MediaTooLargeError: If the total size would exceed ``max_bytes``
+        """
+        if self.size + len(chunk) > self.max_bytes:
+            raise MediaTooLargeError(
+                f"Media exceeds the {self.max_bytes} byte limit"
+            )
+        if self._file is None and self.size + len(chunk) > self.spool_bytes:
+            self._spill()
+        (self._buffer if self._file is None else self._file).write(chunk)
+        self._sha256.update(chunk)
+        self.size += len(chunk)
+
+    def _spill(self) -> None:
+        """Move the content written so far from memory to a temporary file."""
+        self._file = tempfile.TemporaryFile(dir=self.tmp_dir)
+        self._file.write(self._buffer.getbuffer())
+        self._buffer.close()
+        self._buffer = None
+
+    def view(self) -> memoryview:
+        """
+        Zero-copy view of the content.
+
+        In-memory content is exposed directly; spilled content is memory-mapped.
+        Release the view before closing the handle.
+        """
+        if self.in_memory:
+            return self._buffer.getbuffer()
+        if self._mmap is None:
+            self._file.flush()
+            if not self.size:
+                return memoryview(b"")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)
+
+    def write_to(self, path: str) -> None:
+        """Write the content to ``path`` without an intermediate copy."""
+        with open(path, "wb") as f, self.view() as view:
+            f.write(view)
+
+    def read(self) -> bytes:
+        """Return the whole content as ``bytes`` (one copy, for APIs that require it)."""
+        if self.in_memory:
+            return self._buffer.getvalue()
+        self._file.seek(0)
+        return self._file.read()
+
+    def close(self) -> None:
+        """Release the buffer and delete any temporary file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._buffer is not None:
+            self._buffer.close()
+        if self._file is not None:
+            self._file.close()
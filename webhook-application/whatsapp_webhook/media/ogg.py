@@ -0,0 +1,339 @@
+"""
+Pure-Python Ogg Opus container reader and writer.
+
+WhatsApp voice notes are Opus packets in an Ogg container. This module works
+at the packet level, without decoding audio: it splits the container into
+packets, derives each packet's duration from its TOC byte (RFC 6716 §3.1),
+and writes a list of packets back as a standalone Ogg Opus stream, which is
+enough to cut a long note into pieces the Speech API accepts. ``inspect_opus``
+reads only the headers and a few pages to route a note before transcribing it.
+"""
+import struct
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+OPUS_RATE = 48000  # Opus granule positions are always in 48 kHz samples
+
+_PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+_CAPTURE = b"OggS"
+_FLAG_CONTINUED = 0x01
+_FLAG_BOS = 0x02
+_FLAG_EOS = 0x04
+
+# Frame size in 48 kHz samples for each of the 32 TOC configurations
+_FRAME_SAMPLES = (
+    [480, 960, 1920, 2880] * 3  # SILK: 10, 20, 40, 60 ms
+    + [480, 960] * 2  # Hybrid: 10, 20 ms
+    + [120, 240, 480, 960] * 4  # CELT: 2.5, 5, 10, 20 ms
+)
+
+
+class OggError(ValueError):
+    """Raised when data is not a well-formed Ogg Opus stream."""
+
+
+@dataclass
+class OpusHead:
+    """Fields of the OpusHead identification header."""
+    channels: int
+    pre_skip: int
+    input_sample_rate: int
+    raw: bytes
+
+
+@dataclass
+class OpusPacket:
+    """An audio packet and its duration in 48 kHz samples."""
+    data: bytes
+    samples: int
+
+
+def iter_pages(data: Buffer) -> Iterator[Tuple[int, int, int, List[int], memoryview]]:
+    """
+    Iterate over Ogg pages.
+
+    Yields:
+        (header_type, granule_position, serial, segment lengths, page body)
+    """
+    view = memoryview(data)
+    offset = 0
+    end = len(view)
+    while offset + _PAGE_HEADER.size <= end:
+        capture, version, header_type, granule, serial, _, _, count = _PAGE_HEADER.unpack_from(view, offset)
+        if capture != _CAPTURE or version != 0:
+            raise OggError(f"Invalid Ogg page at offset {offset}")
+        lacing_start = offset + _PAGE_HEADER.size
+        segments = list(view[lacing_start:lacing_start + count])
+        body_start = lacing_start + count
+        body_end = body_start + sum(segments)
+        if body_end > end:
+            raise OggError("Truncated Ogg page")
+        yield header_type, granule, serial, segments, view[body_start:body_end]
+        offset = body_end
+
+
+def iter_packets(data: Buffer) -> Iterator[bytes]:
+    """Reassemble the packets of the first logical stream, in order."""
+    stream = None
+    partial = bytearray()
+    for _, _, serial, segments, body in iter_pages(data):
+        if stream is None:
+            stream = serial
+        elif serial != stream:
+            continue
+        position = 0
+        for length in segments:
+            partial += body[position:position + length]
+            position += length
+            if length < 255:
+                yield bytes(partial)
+                partial.clear()
+
+
+def parse_opus_head(packet: bytes) -> OpusHead:
+    """Parse an OpusHead packet."""
+    if len(packet) < 19 or not packet.startswith(b"OpusHead"):
+        raise OggError("Missing OpusHead header")
+    channels, pre_skip, input_sample_rate = struct.unpack_from("<BHI", packet, 9)
+    return OpusHead(channels=channels, pre_skip=pre_skip, input_sample_rate=input_sample_rate, raw=packet)
+
+
+def packet_samples(packet: bytes) -> int:
+    """Duration of an Opus packet in 48 kHz samples, from its TOC byte."""
+    if not packet:
+        return 0
+    toc = packet[0]
+    frame = _FRAME_SAMPLES[toc >> 3]
+    code = toc & 0x03
+    if code == 0:
+        return frame
+    if code in (1, 2):
+        return 2 * frame
+    if len(packet) < 2:
+        return 0
+    return (packet[1] & 0x3F) * frame
+
+
+def read_opus(data: Buffer) -> Tuple[OpusHead, bytes, List[OpusPacket]]:
+    """
+    Split an Ogg Opus file into its headers and audio packets.
+
+    Returns:
+        (OpusHead, raw OpusTags packet, audio packets)
+
+    Raises:
+        OggError: If the data is not Ogg Opus
+    """
+    packets = iter_packets(data)
+    try:
+        head = parse_opus_head(next(packets))
+        tags = next(packets)
+    except StopIteration:
+        raise OggError("Missing Opus headers") from None
+    return head, tags, [OpusPacket(packet, packet_samples(packet)) for packet in packets]
+
+
+# Ogg uses the non-reflected CRC-32 (poly 0x04C11DB7, init 0, no final xor).
+# zlib only implements the reflected variant, so bit-reverse the input bytes
+# and the result, and cancel out zlib's init/final xor by the CRC of zeros.
+_REVERSE_BITS = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+
+def _ogg_crc(page: Buffer) -> int:
+    reflected = zlib.crc32(bytes(page).translate(_REVERSE_BITS)) ^ zlib.crc32(bytes(len(page)))
+    return int(f"{reflected:032b}"[::-1], 2)
+
+
+def _write_page(
+    out: bytearray, header_type: int, granule: int, serial: int, sequence: int, segments: Sequence[int], body: bytes
+) -> None:
+    start = len(out)
+    out += _PAGE_HEADER.pack(_CAPTURE, 0, header_type, granule, serial, sequence, 0, len(segments))
+    out += bytes(segments)
+    out += body
+    struct.pack_into("<I", out, start + 22, _ogg_crc(memoryview(out)[start:]))
+
+
+def write_opus(
+    head: OpusHead,
+    tags: bytes,
+    packets: Sequence[OpusPacket],
+    serial: int = 1,
+    page_duration: int = OPUS_RATE,
+) -> bytes:
+    """
+    Write packets as a standalone Ogg Opus stream.
+
+    Args:
+        head: Identification header to reuse
+        tags: Comment header packet to reuse
+        packets: Audio packets, in order
+        serial: Stream serial number
+        page_duration: Audio per page, in 48 kHz samples
+
+    Returns:
+        The Ogg Opus file
+    """
+    out = bytearray()
+    _write_page(out, _FLAG_BOS, 0, serial, 0, _lacing(len(head.raw)), head.raw)
+    _write_page(out, 0, 0, serial, 1, _lacing(len(tags)), tags)
+    sequence = 2
+    granule = head.pre_skip
+    segments: List[int] = []
+    body = bytearray()
+    page_samples = 0
+    for index, packet in enumerate(packets):
+        lacing = _lacing(len(packet.data))
+        if segments and len(segments) + len(lacing) > 255:
+            _write_page(out, 0, granule, serial, sequence, segments, bytes(body))
+            sequence += 1
+            segments, body, page_samples = [], bytearray(), 0
+        segments += lacing
+        body += packet.data
+        granule += packet.samples
+        page_samples += packet.samples
+        last = index == len(packets) - 1
+        if last or page_samples >= page_duration:
+            _write_page(out, _FLAG_EOS if last else 0, granule, serial, sequence, segments, bytes(body))
+            sequence += 1
+            segments, body, page_samples = [], bytearray(), 0
+    return bytes(out)
+
+
+def _lacing(length: int) -> List[int]:
+    return [255] * (length // 255) + [length % 255]
+
+
+# Sample rates Speech accepts for OGG_OPUS
+_SPEECH_OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+@dataclass
+class OpusInfo:
+    """
+    What can be learned about a voice note without decoding it.
+
+    ``duration`` is None when the final page cannot be trusted (a truncated
+    file, or no granule position), and ``voiced_ratio`` only describes the
+    whole note when ``fully_sampled`` is set.
+    """
+    channels: int
+    input_sample_rate: int
+    duration: Optional[float]
+    bitrate: float
+    voiced_ratio: float
+    fully_sampled: bool
+
+    @property
+    def speech_sample_rate(self) -> int:
+        """``sample_rate_hertz`` to send to Speech: the input rate, or the next rate it accepts."""
+        for rate in _SPEECH_OPUS_RATES:
+            if self.input_sample_rate <= rate:
+                return rate if self.input_sample_rate else OPUS_RATE
+        return OPUS_RATE
+
+
+def _last_granule(view: memoryview) -> Optional[int]:
+    """
+    Granule position of the final page, or None if it is unknown.
+
+    The final page must end exactly at the end of the data: a truncated file
+    ends in a partial page, and an earlier page would understate the length.
+    """
+    # A page is at most 65307 bytes, so the last one starts within that many bytes of the end
+    tail_start = max(0, len(view) - 65307)
+    tail = bytes(view[tail_start:])
+    position = len(tail)
+    while True:
+        # "OggS" may also occur inside a packet; only a page ending at the end counts
+        position = tail.rfind(_CAPTURE, 0, position)
+        if position < 0:
+            return None
+        if position + _PAGE_HEADER.size > len(tail):
+            continue
+        header = _PAGE_HEADER.unpack_from(tail, position)
+        granule, count = header[3], header[7]
+        lacing_start = position + _PAGE_HEADER.size
+        if lacing_start + count > len(tail):
+            continue
+        if lacing_start + count + sum(tail[lacing_start:lacing_start + count]) == len(tail):
+            return granule if granule > 0 else None
+
+
+def _iter_packet_sizes(pages: Iterator[Tuple[int, int, int, List[int], memoryview]]) -> Iterator[Tuple[int, bytes]]:
+    """Yield (length, first two bytes) of each packet, from the lacing values only."""
+    length = 0
+    start = b""
+    for _, _, _, segments, body in pages:
+        position = 0
+        for segment in segments:
+            if not length:
+                start = bytes(body[position:position + 2])
+            length += segment
+            position += segment
+            if segment < 255:
+                yield length, start
+                length = 0
+
+
+def inspect_opus(data: Buffer, sample_seconds: float = 3.0, quiet_bytes: int = 10) -> OpusInfo:
+    """
+    Read an Ogg Opus file's headers, length and a rough voice-activity estimate.
+
+    Only the identification header, the first ``sample_seconds`` of packets
+    (sizes and TOC bytes, nothing is copied or decoded) and the last page
+    header are read, so the cost does not grow with the length of the note.
+    Opus is variable bitrate and silence compresses to a few bytes per frame,
+    so the share of larger packets approximates how much of the sample is
+    voice; it says nothing about the rest of a longer note.
+
+    Args:
+        data: Ogg Opus file (bytes or a memoryview, e.g. ``MediaHandle.view()``)
+        sample_seconds: Audio examined for the voice-activity estimate
+        quiet_bytes: Packets at or below this size per 20 ms frame count as silence
+
+    Returns:
+        Stream information
+
+    Raises:
+        OggError: If the data is not Ogg Opus
+    """
+    view = memoryview(data)
+    pages = iter_pages(view)
+    try:
+        _, _, _, segments, body = next(pages)
+    except StopIteration:
+        raise OggError("Missing Opus headers") from None
+    head = parse_opus_head(bytes(body[:sum(segments)]))
+
+    budget = int(sample_seconds * OPUS_RATE)
+    sampled = voiced = 0
+    exhausted = True
+    packets = _iter_packet_sizes(pages)
+    next(packets, None)  # OpusTags
+    for length, start in packets:
+        samples = packet_samples(start)
+        if not samples:
+            continue
+        sampled += 1
+        # Normalise to a 20 ms frame so packets of any frame size compare
+        if length * 960 > quiet_bytes * samples:
+            voiced += 1
+        budget -= samples
+        if budget <= 0:
+            exhausted = next(packets, None) is None
+            break
+
+    granule = _last_granule(view)
+    duration = max(0, granule - head.pre_skip) / OPUS_RATE if granule is not None else None
+    return OpusInfo(
+        channels=head.channels,
+        input_sample_rate=head.input_sample_rate,
+        duration=duration,
+        bitrate=len(view) * 8 / duration if duration else 0.0,
+        voiced_ratio=voiced / sampled if sampled else 0.0,
+        fully_sampled=exhausted and duration is not None,
+    )
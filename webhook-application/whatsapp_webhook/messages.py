@@ -1,22 +1,139 @@
 import asyncio
+import json
 import logging
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+import sqlite3
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
-from .external_services.agent_client import create_agent_session, send_to_agent
+from .external_services.agent_client import (
+    AgentStreamRejectedError,
+    create_agent_session,
+    send_to_agent,
+    stream_agent_text,
+)
+from .external_services.http_clients import close_http_clients, open_http_clients
+from .external_services.outbound_scheduler import Priority, outbound_scheduler
+from .external_services.session_cache import known_sessions
 from .external_services.whatsapp_client import (
+    create_read_receipt,
     create_text_message,
     download_whatsapp_media,
-    send_whatsapp_message,
 )
+from .media import media_cache
 from .models.messages import WhatsAppWebhookPayload
-from .transcription import transcribe_audio_file
+from .processing.admission import AdmissionController, AdmissionRejectedError
+from .processing.burst_coalescer import Burst, BurstCoalescer
+from .processing.dedup import MessageDeduplicator, build_dedup_backend
+from .processing.ingress_queue import IngressQueue, IngressQueueFullError
+from .processing.pipeline import Pipeline, Stage
+from .processing.reply_chunker import ReplyChunker
+from .processing.resends import ResendTracker
+from .processing.sender_scheduler import SenderScheduler
+from .processing.statuses import StatusAggregator
+from .processing.task_registry import TaskRegistry
+from .transcription import close_speech_client, transcribe_audio_file
 from .utils.app_config import config
+from .utils.deadline import DeadlineExceededError, deadline_stage, message_deadline
 from .utils.logging import get_logger
-from .utils.model_utils import parse_webhook_payload
+from .utils.metrics import metrics
+from .utils.model_utils import decode_webhook_payload
 
 if TYPE_CHECKING:
     from .models.messages import WhatsAppMessage
 
+# Durable journal of accepted webhooks, drained by a fixed pool of workers
+ingress_queue = IngressQueue(
+    path=config.ingress_queue_path,
+    workers=config.ingress_workers,
+    visibility_timeout=config.ingress_visibility_timeout,
+    max_attempts=config.ingress_max_attempts,
+    max_pending=config.ingress_max_pending,
+)
+
+# Drops WhatsApp redeliveries before they are journaled or validated
+message_deduplicator = MessageDeduplicator(
+    ttl=config.dedup_ttl_seconds,
+    max_entries=config.dedup_max_entries,
+    backend=build_dedup_backend(
+        config.dedup_backend, config.dedup_sqlite_path, config.dedup_redis_url
+    ),
+)
+
+# Per-app cap on messages processed at once; the excess waits briefly or is shed
+admission_controllers = {
+    app_name: AdmissionController(
+        app_name,
+        max_inflight=max_inflight,
+        max_queue_wait=config.admission_max_queue_wait,
+        max_queued=config.admission_max_queued,
+    )
+    for app_name, max_inflight in (
+        (config.aa_app_name, config.aa_max_inflight),
+        (config.pp_app_name, config.pp_max_inflight),
+    )
+}
+
+# One ordered mailbox per conversation; different conversations run in parallel
+sender_scheduler = SenderScheduler(
+    max_concurrency=config.sender_max_concurrency,
+    reorder_window=config.sender_reorder_window,
+    admission=lambda key: admission_controllers.get(key[0]),
+)
+
+# Shed messages are journaled again and retried while their deadline allows
+SHED_REPLY = "Estamos con alta demanda, te respondemos en breve."
+SHED_RESEND_REPLY = "Estamos con alta demanda, por favor reenvía tu mensaje en unos minutos."
+
+# IDs of shed messages waiting for a retry whose sender was already told
+_deferred_message_ids: Set[str] = set()
+
+status_aggregator = StatusAggregator(
+    ttl=config.status_tracking_ttl,
+    max_entries=config.status_tracking_max_entries,
+)
+
+# Work that runs after its webhook was acknowledged, drained on shutdown
+background_tasks = TaskRegistry("background")
+
+# Optional debounce window merging a sender's quick consecutive messages into one turn
+burst_coalescer = BurstCoalescer(
+    window=config.burst_window,
+    max_messages=config.burst_max_messages,
+    flush=lambda key, burst: _submit_burst(key, burst),
+    registry=background_tasks,
+)
+
+# Same text sent again by a user shortly after, e.g. for lack of a sign we received it
+resend_tracker = ResendTracker(window=config.resend_window)
+
+# (ID, WhatsApp timestamp) of the user message being answered by the current task
+_inbound_message: ContextVar[Optional[Tuple[str, float]]] = ContextVar("inbound_message", default=None)
+
+metrics.register_gauge(
+    "ingress_queue",
+    lambda: {
+        "pending": ingress_queue.pending,
+        "inflight": ingress_queue.inflight,
+        "draining": ingress_queue.draining,
+    },
+)
+metrics.register_gauge("background_tasks", background_tasks.stats)
+metrics.register_gauge(
+    "admission", lambda: {name: controller.stats() for name, controller in admission_controllers.items()}
+)
+metrics.register_gauge("open_bursts", lambda: burst_coalescer.pending)
+metrics.register_gauge("dedup_cache_entries", lambda: len(message_deduplicator))
+metrics.register_gauge("whatsapp_statuses", status_aggregator.stats)
+metrics.register_gauge(
+    "sender_scheduler",
+    lambda: {
+        "active_senders": sender_scheduler.active_senders,
+        "queued": sender_scheduler.queued,
+        "running": sender_scheduler.running,
+    },
+)
+
 
 async def send_message_to_agent(user: str, app_name: str, session_id: str, message: str) -> str:
     """Sends a message to the internal agent service and parses the response."""
@@ -30,15 +147,17 @@ async def send_message_to_agent(user: str, app_name: str, session_id: str, messa
     except ValueError as e:
         logger.error(f"Configuration error: {e}", exc_info=True)
         return "Error: Servicio de agente no configurado."
+    except DeadlineExceededError:
+        return "Error: El servicio del agente no respondió a tiempo."
     except Exception as e:
         logger.error(f"Error communicating with agent: {e}", exc_info=True)
         return "Error: Fallo la comunicación con el servicio del agente."
 
 
 async def _send_whatsapp_acknowledgment(
-    user_wa_id: str, message_text: str, app_name: str
+    user_wa_id: str, message_text: str, app_name: str, priority: Priority = Priority.ACK
 ) -> bool:
-    """Send acknowledgment message to WhatsApp user."""
+    """Send a text message to the WhatsApp user through the outbound scheduler."""
     logger = get_logger("whatsapp_ack", {"app_name": app_name})
     
     # Get the appropriate configuration based on app name
@@ -56,53 +175,296 @@ async def _send_whatsapp_acknowledgment(
 
     try:
         message = create_text_message(message_text)
-        await send_whatsapp_message(
-            user_wa_id, message, f"{facebook_app_url}/messages", config.wsp_token
+        result = await outbound_scheduler.send(
+            user_wa_id, message, f"{facebook_app_url}/messages", config.wsp_token, priority
         )
+        inbound = _inbound_message.get()
+        if inbound is not None and isinstance(result, dict):
+            status_aggregator.record_outbound(app_name, result, *inbound)
         logger.info(f"Acknowledgment sent successfully to {user_wa_id}")
         return True
     except Exception as e:
         logger.error(f"Failed to send acknowledgment: {e}", exc_info=True)
         return False
 
-async def _process_webhook_in_background(body: dict, app_name: str) -> None:
-    """Process webhook in the background after sending an ACK."""
-    webhook_payload = parse_webhook_payload(body)
+def _read_receipt_mode(app_name: str) -> str:
+    """How an app acknowledges received messages: "off", "read" or "typing"."""
+    if app_name == config.aa_app_name:
+        return config.aa_read_receipts
+    if app_name == config.pp_app_name:
+        return config.pp_read_receipts
+    return "off"
+
+async def _send_read_receipt(user_wa_id: str, message_id: str, app_name: str) -> None:
+    """Mark a received message as read and, if configured, show the typing indicator."""
+    mode = _read_receipt_mode(app_name)
+    if mode == "off":
+        return
+    if app_name == config.aa_app_name:
+        facebook_app_url = config.aa_facebook_app_url
+    else:
+        facebook_app_url = config.pp_facebook_app_url
+    if not facebook_app_url or not config.wsp_token:
+        return
+    # Keyed by the user, so it goes out before any reply to the same message
+    await outbound_scheduler.send(
+        user_wa_id,
+        create_read_receipt(message_id, typing_indicator=mode == "typing"),
+        f"{facebook_app_url}/messages",
+        config.wsp_token,
+        Priority.ACK,
+    )
+
+def _message_timestamp(message: "WhatsAppMessage") -> float:
+    """WhatsApp sends epoch seconds as a string; fall back to arrival time."""
+    try:
+        return float(message.timestamp)
+    except (TypeError, ValueError):
+        return time.time()
+
+async def _process_message_safely(
+    sender_wa_id: str, message: "WhatsAppMessage", app_name: str
+) -> None:
+    """
+    Process one message, replying with an error text if it fails.
+
+    Replies sent while processing are linked to ``message`` for the
+    delivery-latency histograms, and every call made for it shares one
+    deadline of ``MESSAGE_DEADLINE`` seconds from the message timestamp.
+    """
+    timestamp = _message_timestamp(message)
+    token = _inbound_message.set((message.id, timestamp))
+    try:
+        with message_deadline(config.message_deadline, timestamp):
+            await process_message(sender_wa_id, message, app_name)
+    except DeadlineExceededError as e:
+        logging.warning(f"Gave up on message {message.id}: {e}")
+        await _send_whatsapp_acknowledgment(
+            sender_wa_id, "Error procesando mensaje.", app_name
+        )
+    except Exception as e:
+        logging.error(f"Error processing message {message.id}: {e}", exc_info=True)
+        await _send_whatsapp_acknowledgment(
+            sender_wa_id, "Error procesando mensaje.", app_name
+        )
+    finally:
+        _deferred_message_ids.discard(message.id)
+        _inbound_message.reset(token)
+
+def _message_data(message: "WhatsAppMessage") -> Dict[str, Any]:
+    """The message as it appears in a webhook payload."""
+    raw = getattr(message, "raw", None)
+    if isinstance(raw, dict):
+        return raw
+    return message.model_dump(mode="json", by_alias=True, exclude_none=True)
+
+async def _defer_shed_messages(
+    sender_wa_id: str, app_name: str, messages: List[Dict[str, Any]]
+) -> None:
+    """
+    Journal messages shed by admission control so they are retried later.
+
+    The messages are retried after ``ADMISSION_RETRY_DELAY`` seconds as long
+    as that leaves time before their deadline. The sender is told once that
+    the reply is coming; if the messages cannot be retried they are dropped
+    and the sender is asked to send them again.
+    """
+    if not messages:
+        return
+    message_ids = [message["id"] for message in messages]
+    oldest = min(float(message.get("timestamp") or time.time()) for message in messages)
+    deferred = False
+    if time.time() + config.admission_retry_delay < oldest + config.message_deadline:
+        try:
+            await _journal_messages(sender_wa_id, app_name, messages, delay=config.admission_retry_delay)
+            deferred = True
+        except (IngressQueueFullError, sqlite3.Error) as e:
+            logging.error(f"Could not journal shed messages from {sender_wa_id}: {e}")
+
+    if not deferred:
+        logging.warning(f"Dropped shed messages from {sender_wa_id} for {app_name}")
+        metrics.inc("shed_messages_dropped", len(messages), app_name=app_name)
+        _deferred_message_ids.difference_update(message_ids)
+        await _send_whatsapp_acknowledgment(sender_wa_id, SHED_RESEND_REPLY, app_name)
+        return
+    logging.warning(f"Deferred shed messages from {sender_wa_id} for {app_name} under load")
+    metrics.inc("shed_messages_deferred", len(messages), app_name=app_name)
+    if _deferred_message_ids.isdisjoint(message_ids):
+        await _send_whatsapp_acknowledgment(sender_wa_id, SHED_REPLY, app_name)
+    _deferred_message_ids.update(message_ids)
+
+async def _process_webhook_in_background(body: "bytes | dict", app_name: str) -> None:
+    """
+    Process a webhook payload after the ACK has been sent.
+
+    Each message is handed to the sender's mailbox, keyed by app and
+    ``sender_wa_id`` (the agent session ID), so one conversation is processed
+    in timestamp order while other conversations proceed concurrently.
+    Messages folded into a burst are only done once the burst's turn has
+    run, so this returns (and the journal job is acknowledged) after that.
+
+    Raises:
+        RuntimeError: If a burst holding one of the messages was dropped
+            before its turn finished, so the payload is replayed
+    """
+    webhook_payload = decode_webhook_payload(body)
     if not webhook_payload:
         logging.error("Failed to parse webhook payload.")
         return
 
-    for sender_wa_id, message in webhook_payload.get_all_messages():
-        try:
-            await process_message(sender_wa_id, message, app_name)
-        except Exception as e:
-            logging.error(f"Error processing message {message.id}: {e}", exc_info=True)
-            await _send_whatsapp_acknowledgment(
-                sender_wa_id, "Error procesando mensaje.", app_name
-            )
-
-async def process_incoming_webhook_payload(body: dict, app_name: str) -> bool:
-    """Core logic to process incoming webhook events from WhatsApp."""
-    logging.info(f"Received webhook for {app_name} - sending immediate ACK.")
-    asyncio.create_task(_process_webhook_in_background(body, app_name))
+    all_messages = webhook_payload.get_all_messages()
+    pending = [
+        sender_scheduler.submit(
+            (app_name, sender_wa_id),
+            _message_timestamp(message),
+            lambda sender_wa_id=sender_wa_id, message=message: _process_message_safely(
+                sender_wa_id, message, app_name
+            ),
+        )
+        for sender_wa_id, message in all_messages
+    ]
+    if not pending:
+        return
+    results = await asyncio.gather(*pending, return_exceptions=True)
+    shed: Dict[str, List[Dict[str, Any]]] = {}
+    for (sender_wa_id, message), result in zip(all_messages, results):
+        if isinstance(result, AdmissionRejectedError):
+            shed.setdefault(sender_wa_id, []).append(_message_data(message))
+    for sender_wa_id, messages in shed.items():
+        await _defer_shed_messages(sender_wa_id, app_name, messages)
+
+    turns = [burst_coalescer.turn_of(message.id) for _, message in all_messages]
+    turns = [turn for turn in turns if turn is not None]
+    if turns and not all(await asyncio.gather(*(asyncio.shield(turn) for turn in turns))):
+        raise RuntimeError("A burst was dropped before its turn finished")
+
+async def _handle_ingress_job(app_name: str, body: bytes) -> None:
+    """Process a webhook payload leased from the ingress queue."""
+    await _process_webhook_in_background(body, app_name)
+
+async def start_background_processing() -> None:
+    """Open shared clients and start the ingress workers, replaying journaled payloads."""
+    await open_http_clients()
+    known_sessions.load()
+    await asyncio.to_thread(media_cache.load)
+    await ingress_queue.start(_handle_ingress_job)
+
+async def stop_background_processing(grace: float = 0.0) -> None:
+    """
+    Drain in-flight work for up to ``grace`` seconds, then stop the workers and close clients.
+
+    Once draining, new webhooks are refused (WhatsApp redelivers them) and
+    open bursts are flushed at once. Payloads still being processed at the
+    deadline, including those waiting for a burst's turn, are released back
+    to the journal to be replayed on the next start.
+    """
+    deadline = asyncio.get_running_loop().time() + grace
+    burst_coalescer.close()
+    logging.info(
+        f"Draining background work for up to {grace:.0f}s",
+        extra={"ingress_jobs": ingress_queue.inflight, "background_tasks": len(background_tasks)},
+    )
+    await asyncio.gather(ingress_queue.drain(deadline), background_tasks.wait(deadline))
+    # Release unfinished payloads first: their messages are cancelled next and
+    # must not be acknowledged
+    await ingress_queue.stop()
+    await sender_scheduler.stop()
+    await burst_coalescer.stop()
+    await outbound_scheduler.stop()
+    await message_deduplicator.close()
+    await close_http_clients()
+    close_speech_client()
+    known_sessions.save()
+
+async def process_incoming_webhook_payload(body: bytes, app_name: str) -> bool:
+    """
+    Core logic to process incoming webhook events from WhatsApp.
+
+    The payload is journaled before returning so the caller can ACK it; the
+    actual processing happens in the ingress workers. The body is journaled
+    as received, so the worker decodes it once with the configured decoder;
+    it is only re-serialized when some of its messages were redeliveries.
+
+    Args:
+        body: Raw request body
+        app_name: Application the webhook was received for
+
+    Returns:
+        True if the payload was queued, False if it could not be persisted
+
+    Raises:
+        json.JSONDecodeError: If the body is not valid JSON
+    """
+    if ingress_queue.draining:
+        logging.warning(f"Shutting down, refusing webhook for {app_name}")
+        return False
+
+    payload = json.loads(body)
+    # Statuses in mixed payloads; status-only payloads normally take the fast lane
+    status_aggregator.record_payload(payload, app_name)
+    claimed_ids, duplicates = await message_deduplicator.filter_payload(payload)
+    if duplicates and not claimed_ids:
+        logging.info(f"Dropped redelivered webhook for {app_name} ({duplicates} duplicate messages)")
+        return True
+    if duplicates:
+        body = json.dumps(payload).encode("utf-8")
+
+    try:
+        await ingress_queue.enqueue(app_name, body)
+    except (IngressQueueFullError, sqlite3.Error) as e:
+        logging.error(f"Could not queue webhook for {app_name}: {e}")
+        await message_deduplicator.forget(claimed_ids)
+        return False
+    logging.info(f"Queued webhook for {app_name} - sending immediate ACK.")
     return True
 
-async def receive_message_aa(body: dict) -> bool:
+def receive_status_update(body: bytes, app_name: str) -> None:
+    """
+    Fast lane for status-only webhooks (see ``processing.statuses.is_status_only``).
+
+    The statuses are aggregated inline: nothing is queued, no task is created
+    and the payload models are not built.
+    """
+    statuses = status_aggregator.record_raw(body, app_name)
+    logging.debug(f"Recorded {statuses} statuses for {app_name}")
+
+async def receive_message_aa(body: bytes) -> bool:
     """Handles incoming messages for the AA application."""
     return await process_incoming_webhook_payload(body, config.aa_app_name)
 
-async def receive_message_pp(body: dict) -> bool:
+async def receive_message_pp(body: bytes) -> bool:
     """Handles incoming messages for the PP application."""
     return await process_incoming_webhook_payload(body, config.pp_app_name)
 
 async def process_message(
     sender_wa_id: str, message: "WhatsAppMessage", app_name: str
 ) -> None:
-    """Processes a single message from WhatsApp."""
+    """
+    Processes a single message from WhatsApp.
+
+    The message is marked as read (with a typing indicator, per app) while it
+    is being handled, so the user sees it arrived before the agent answers.
+    """
+    if message.type == "text":
+        resent = resend_tracker.is_resend((app_name, sender_wa_id), message.get_message_content() or "")
+        metrics.inc(
+            "inbound_texts", app=app_name, receipts=_read_receipt_mode(app_name), resent=resent
+        )
+    await Pipeline("message", [
+        Stage(
+            "receipt",
+            lambda results: _send_read_receipt(sender_wa_id, message.id, app_name),
+            optional=True,
+        ),
+        Stage("handle", lambda results: _handle_message(sender_wa_id, message, app_name)),
+    ]).run()
+
+async def _handle_message(sender_wa_id: str, message: "WhatsAppMessage", app_name: str) -> None:
+    """Dispatch a message by type."""
     if message.type == "text":
         await _process_single_text_message(sender_wa_id, message, app_name)
     elif message.type == "audio" and message.audio:
-        await handle_audio_message(sender_wa_id, message.audio.id, app_name)
+        await handle_audio_message(sender_wa_id, message.audio.id, app_name, message.audio.sha256)
     else:
         await _send_whatsapp_acknowledgment(
             sender_wa_id,
@@ -110,22 +472,222 @@ async def process_message(
             app_name,
         )
 
+async def _stream_agent_reply(sender_wa_id: str, app_name: str, message_text: str) -> bool:
+    """
+    Stream the agent answer to the user as several WhatsApp messages.
+
+    Parts are sent one after another as soon as the chunker releases them, so
+    they arrive in order while the agent is still generating the rest. Once
+    the agent accepted the run a failure is never retried over ``/run``,
+    which would run the turn a second time: the text received so far is
+    sent, or an error message if there is none.
+
+    Returns:
+        False if the agent did not accept the stream (the turn did not run), True otherwise
+    """
+    logger = get_logger("agent_communication", {"app_name": app_name})
+    chunker = ReplyChunker(config.stream_flush_min_chars, config.stream_flush_max_chars)
+    started = time.perf_counter()
+    sent_parts = 0
+
+    async def deliver(parts: List[str]) -> None:
+        nonlocal sent_parts
+        for part in parts:
+            if await _send_whatsapp_acknowledgment(sender_wa_id, part, app_name, Priority.REPLY):
+                if sent_parts == 0:
+                    metrics.observe(
+                        "time_to_first_reply_seconds",
+                        time.perf_counter() - started,
+                        app_name=app_name,
+                        mode="stream",
+                    )
+                sent_parts += 1
+
+    try:
+        async with deadline_stage("agent_stream"):
+            async for text in stream_agent_text(app_name, sender_wa_id, sender_wa_id, message_text):
+                await deliver(chunker.feed(text))
+            await deliver(chunker.flush())
+    except AgentStreamRejectedError as e:
+        logger.warning(f"Agent did not accept the stream, falling back to /run: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Error streaming from agent after {sent_parts} parts: {e}", exc_info=True)
+        await deliver(chunker.flush())
+
+    if sent_parts == 0:
+        await _send_whatsapp_acknowledgment(
+            sender_wa_id, "No pude procesar tu mensaje. Intenta de nuevo.", app_name
+        )
+    metrics.observe("reply_parts", sent_parts, buckets=(1, 2, 3, 5, 8, 13), app_name=app_name)
+    return True
+
+async def _reply_with_agent(sender_wa_id: str, app_name: str, message_text: str) -> None:
+    """Send ``message_text`` to the agent and deliver its answer to the user."""
+    if config.agent_streaming and await _stream_agent_reply(sender_wa_id, app_name, message_text):
+        return
+
+    started = time.perf_counter()
+    agent_response = await send_message_to_agent(
+        sender_wa_id, app_name, sender_wa_id, message_text
+    )
+    response_text = agent_response or "No pude procesar tu mensaje. Intenta de nuevo."
+    if await _send_whatsapp_acknowledgment(
+        sender_wa_id, response_text, app_name, Priority.REPLY
+    ):
+        metrics.observe(
+            "time_to_first_reply_seconds",
+            time.perf_counter() - started,
+            app_name=app_name,
+            mode="full",
+        )
+
+def _coalesce(sender_wa_id: str, app_name: str, message_text: str) -> bool:
+    """Add a text (typed or transcribed) to the sender's burst if coalescing is on."""
+    inbound = _inbound_message.get()
+    if not burst_coalescer.enabled or inbound is None:
+        return False
+    burst_coalescer.add((app_name, sender_wa_id), message_text, inbound)
+    return True
+
+def _session_stage(sender_wa_id: str, app_name: str) -> Stage:
+    return Stage("session", lambda results: create_agent_session(sender_wa_id, app_name, sender_wa_id))
+
+def _agent_turn(sender_wa_id: str, app_name: str, message_text: str) -> Pipeline:
+    """Create the session (if needed), then answer ``message_text`` with the agent."""
+    return Pipeline("text", [
+        _session_stage(sender_wa_id, app_name),
+        Stage(
+            "reply",
+            lambda results: _reply_with_agent(sender_wa_id, app_name, message_text),
+            after=("session",),
+        ),
+    ])
+
+async def _run_burst(sender_wa_id: str, app_name: str, burst: Burst) -> None:
+    """Answer a burst of messages with a single agent turn."""
+    message_text = burst.take()
+    metrics.observe("burst_messages", len(burst.texts), buckets=(1, 2, 3, 5, 8), app_name=app_name)
+    # The user has been waiting since the first message of the burst
+    token = _inbound_message.set(burst.refs[0])
+    try:
+        with message_deadline(config.message_deadline, burst.refs[0][1]):
+            await _agent_turn(sender_wa_id, app_name, message_text).run()
+    finally:
+        _deferred_message_ids.difference_update(message_id for message_id, _ in burst.refs)
+        _inbound_message.reset(token)
+
+async def _submit_burst(key: Any, burst: Burst) -> None:
+    """Queue a flushed burst in the sender's mailbox, after anything already queued there."""
+    app_name, sender_wa_id = key
+    try:
+        await sender_scheduler.submit(
+            key, burst.refs[-1][1], lambda: _run_burst(sender_wa_id, app_name, burst)
+        )
+    except AdmissionRejectedError:
+        await _defer_shed_messages(sender_wa_id, app_name, _burst_messages(sender_wa_id, burst))
+    except Exception as e:
+        logging.error(f"Error processing burst from {sender_wa_id}: {e}", exc_info=True)
+        await _send_whatsapp_acknowledgment(sender_wa_id, "Error procesando mensaje.", app_name)
+
+def _burst_messages(sender_wa_id: str, burst: Burst) -> List[Dict[str, Any]]:
+    """
+    The texts of a burst as webhook text messages with their original IDs and timestamps.
+
+    Voice notes become their transcript, so they are not transcribed again.
+    """
+    return [
+        {
+            "from": sender_wa_id,
+            "id": message_id,
+            "timestamp": str(int(timestamp)),
+            "type": "text",
+            "text": {"body": text},
+        }
+        for text, (message_id, timestamp) in zip(burst.texts, burst.refs)
+        if text
+    ]
+
+async def _journal_messages(
+    sender_wa_id: str, app_name: str, messages: List[Dict[str, Any]], delay: float = 0.0
+) -> None:
+    """
+    Journal messages of one sender as a webhook payload of their own.
+
+    Raises:
+        IngressQueueFullError: If the journal is full
+        sqlite3.Error: If the journal cannot be written
+    """
+    payload = {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": app_name,
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "contacts": [{"wa_id": sender_wa_id}],
+                    "messages": messages,
+                },
+            }],
+        }],
+    }
+    await ingress_queue.enqueue(app_name, json.dumps(payload).encode("utf-8"), delay=delay)
+
 async def _process_single_text_message(
     sender_wa_id: str, message: "WhatsAppMessage", app_name: str
 ) -> None:
     """Process a single text message from WhatsApp."""
-    await create_agent_session(sender_wa_id, app_name, sender_wa_id)
     message_text = message.get_message_content() or ""
-    agent_response = await send_message_to_agent(
-        sender_wa_id, app_name, sender_wa_id, message_text
-    )
-    response_text = agent_response or "No pude procesar tu mensaje. Intenta de nuevo."
-    await _send_whatsapp_acknowledgment(sender_wa_id, response_text, app_name)
+    if not _coalesce(sender_wa_id, app_name, message_text):
+        await _agent_turn(sender_wa_id, app_name, message_text).run()
+
+async def _download_and_transcribe(audio_id: str, sha256: Optional[str]) -> "str | bool | None":
+    """
+    Fetch an audio file (from the media cache or WhatsApp) and transcribe it.
+
+    Returns:
+        The transcript, None if it could not be transcribed, or False if the
+        download failed
+    """
+    start = time.perf_counter()
+    audio = await media_cache.get_media(sha256, config.media_max_bytes, config.media_spool_bytes)
+    downloaded = audio is None
+    if downloaded:
+        audio = await download_whatsapp_media(audio_id, config.whatsapp_base_url, config.wsp_token)
+        if audio is None:
+            return False
+    download_seconds = time.perf_counter() - start
+
+    with audio:
+        digest = media_cache.verify(sha256, audio)
+        if downloaded and digest:
+            await media_cache.put_media(audio, download_seconds)
+        start = time.perf_counter()
+        transcript = await transcribe_audio_file(audio)
+    if transcript and digest:
+        await media_cache.put_transcript(
+            digest, transcript, download_seconds if downloaded else 0.0, time.perf_counter() - start
+        )
+    return transcript
+
+async def _fetch_transcript(audio_id: str, sha256: Optional[str]) -> "str | bool | None":
+    """Transcript from the media cache, or downloaded and transcribed (see ``_download_and_transcribe``)."""
+    transcript = await media_cache.get_transcript(sha256)
+    if transcript is None:
+        transcript = await _download_and_transcribe(audio_id, sha256)
+    return transcript
 
 async def handle_audio_message(
-    phone: str, audio_id: str, app_name: str
+    phone: str, audio_id: str, app_name: str, sha256: Optional[str] = None
 ) -> None:
-    """Processes an audio message: downloads, transcribes, and responds."""
+    """
+    Processes an audio message: downloads, transcribes, and responds.
+
+    When WhatsApp provides the media ``sha256``, the media cache is checked
+    first so forwarded voice notes are transcribed only once. The agent
+    session is created while the audio is downloaded and transcribed.
+    """
     # Get the appropriate configuration based on app name
     if app_name == config.aa_app_name:
         facebook_app_url = config.aa_facebook_app_url
@@ -141,27 +703,23 @@ async def handle_audio_message(
         )
         return
 
+    async def reply(results: Dict[str, Any]) -> None:
+        transcript = results["transcript"]
+        if transcript is False:
+            await _send_whatsapp_acknowledgment(phone, "No pude descargar tu audio.", app_name)
+        elif not transcript:
+            await _send_whatsapp_acknowledgment(phone, "No pude entender tu audio.", app_name)
+        elif not _coalesce(phone, app_name, transcript):
+            await _reply_with_agent(phone, app_name, transcript)
+
+    stages = [Stage("transcript", lambda results: _fetch_transcript(audio_id, sha256))]
+    if not burst_coalescer.enabled:
+        # Independent of the audio, so it overlaps the download and transcription
+        stages.append(_session_stage(phone, app_name))
+    stages.append(Stage("reply", reply, after=tuple(stage.name for stage in stages)))
+
     try:
-        audio_content = await download_whatsapp_media(audio_id, config.whatsapp_base_url, config.wsp_token)
-        if not audio_content:
-            await send_whatsapp_message(
-                phone, create_text_message("No pude descargar tu audio."), f"{facebook_app_url}/messages", config.wsp_token
-            )
-            return
-
-        transcript = await transcribe_audio_file(audio_content)
-        if not transcript:
-            await send_whatsapp_message(
-                phone, create_text_message("No pude entender tu audio."), f"{facebook_app_url}/messages", config.wsp_token
-            )
-            return
-
-        response = await send_message_to_agent(phone, app_name, phone, transcript)
-        await send_whatsapp_message(
-            phone, create_text_message(response), f"{facebook_app_url}/messages", config.wsp_token
-        )
+        await Pipeline("audio", stages).run()
     except Exception as e:
         logging.error(f"Error processing audio: {e}", exc_info=True)
-        await send_whatsapp_message(
-            phone, create_text_message("Error procesando tu audio."), f"{api_url}/messages", token
-        )
+        await _send_whatsapp_acknowledgment(phone, "Error procesando tu audio.", app_name)
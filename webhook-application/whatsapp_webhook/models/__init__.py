@@ -3,6 +3,13 @@ Domain models for WhatsApp webhook processing using Pydantic v2.
 Now supports all WhatsApp message types.
 """
 
+from .compact import (
+    CompactContent,
+    CompactMessage,
+    CompactWebhookPayload,
+    decode_compact_payload
+)
+
 from .messages import (
     # Main message models
     WhatsAppMessage,
@@ -50,6 +57,12 @@ from .api_models import (
 )
 
 __all__ = [
+    # Compact decoding path
+    "CompactContent",
+    "CompactMessage",
+    "CompactWebhookPayload",
+    "decode_compact_payload",
+    
     # Main message models
     "WhatsAppMessage",
     "WhatsAppContact", 
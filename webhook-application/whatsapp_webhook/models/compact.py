@@ -0,0 +1,205 @@
+"""
+Compact, lazily decoded view of WhatsApp webhook payloads.
+
+The Pydantic models in ``messages.py`` validate and build the whole payload
+tree up front, including media, location and interactive sub-models that
+most handlers never touch. The types here use ``__slots__``, check only what
+routing needs (IDs, sender, type, timestamp) when decoded, and wrap content
+(media, location, interactive, ...) in a thin view over the raw dict only
+when it is accessed, exposing the same attributes as the Pydantic content
+models. The Pydantic tree remains the compatibility layer: ``to_model()``
+returns it.
+"""
+import json
+from typing import Any, Dict, List, Tuple, Union
+
+from .messages import (
+    PHONE_NUMBER_PATTERN,
+    WHITESPACE_PATTERN,
+    WhatsAppAudioContent,
+    WhatsAppDocumentContent,
+    WhatsAppImageContent,
+    WhatsAppInteractiveContent,
+    WhatsAppLocationContent,
+    WhatsAppMessage,
+    WhatsAppReactionContent,
+    WhatsAppStickerContent,
+    WhatsAppSystemContent,
+    WhatsAppTextContent,
+    WhatsAppVideoContent,
+    WhatsAppWebhookPayload,
+)
+
+# Content sub-objects, by attribute name, and the fields they cannot lack
+_CONTENT_MODELS = {
+    "text": WhatsAppTextContent,
+    "image": WhatsAppImageContent,
+    "audio": WhatsAppAudioContent,
+    "video": WhatsAppVideoContent,
+    "document": WhatsAppDocumentContent,
+    "sticker": WhatsAppStickerContent,
+    "location": WhatsAppLocationContent,
+    "interactive": WhatsAppInteractiveContent,
+    "reaction": WhatsAppReactionContent,
+    "system": WhatsAppSystemContent,
+}
+_REQUIRED_FIELDS = {
+    name: tuple(field for field, info in model.model_fields.items() if info.is_required())
+    for name, model in _CONTENT_MODELS.items()
+}
+
+
+def _required_str(data: Dict[str, Any], key: str) -> str:
+    value = data.get(key)
+    if not isinstance(value, str) or not value:
+        raise ValueError(f"Missing or invalid '{key}'")
+    return value
+
+
+def _phone_number(value: Any) -> str:
+    if not isinstance(value, str):
+        raise ValueError("Missing or invalid 'from'")
+    phone = WHITESPACE_PATTERN.sub("", value)
+    if not PHONE_NUMBER_PATTERN.match(phone):
+        raise ValueError("Invalid phone number format")
+    return phone
+
+
+class CompactContent:
+    """
+    Read-only view of a content object (``text``, ``audio``, ...) over its raw dict.
+
+    Exposes the fields of the matching Pydantic content model (None when
+    absent) plus any extra keys WhatsApp sent.
+    """
+
+    __slots__ = ("_raw", "_model")
+
+    def __init__(self, raw: Dict[str, Any], name: str):
+        if not isinstance(raw, dict):
+            raise ValueError(f"Invalid '{name}' content")
+        for field in _REQUIRED_FIELDS[name]:
+            if raw.get(field) is None:
+                raise ValueError(f"Missing '{name}.{field}'")
+        self._raw = raw
+        self._model = _CONTENT_MODELS[name]
+
+    def __getattr__(self, name: str) -> Any:
+        raw = self._raw
+        field = self._model.model_fields.get(name)
+        if field is None and name not in raw:
+            raise AttributeError(name)
+        value = raw.get(name)
+        if type(value) is int and field is not None and field.annotation is float:
+            # Match Pydantic's int -> float coercion (e.g. location coordinates)
+            value = float(value)
+        return value
+
+    def to_model(self):
+        """Fully validated Pydantic equivalent."""
+        return self._model.model_validate(self._raw)
+
+
+class CompactMessage:
+    """A WhatsApp message with the attributes of ``WhatsAppMessage``, decoded lazily."""
+
+    __slots__ = ("id", "type", "timestamp", "from_", "_raw")
+
+    def __init__(self, raw: Dict[str, Any]):
+        self.id = _required_str(raw, "id")
+        self.type = _required_str(raw, "type")
+        self.timestamp = _required_str(raw, "timestamp")
+        self.from_ = _phone_number(raw.get("from"))
+        self._raw = raw
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names that are not slots: content is wrapped on access
+        if name in _CONTENT_MODELS:
+            raw = self._raw.get(name)
+            return CompactContent(raw, name) if raw is not None else None
+        if name == "contacts":
+            return self._raw.get("contacts")
+        raise AttributeError(name)
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The message as received."""
+        return self._raw
+
+    def to_model(self) -> WhatsAppMessage:
+        """Fully validated Pydantic equivalent."""
+        return WhatsAppMessage.model_validate(self._raw)
+
+    # Same logic as the Pydantic model; it only reads attributes
+    get_message_content = WhatsAppMessage.get_message_content
+    is_text_message = WhatsAppMessage.is_text_message
+
+
+class CompactWebhookPayload:
+    """A webhook payload exposing ``get_all_messages`` without building the model tree."""
+
+    __slots__ = ("_raw", "_messages")
+
+    def __init__(self, raw: Dict[str, Any]):
+        if not isinstance(raw, dict):
+            raise ValueError("Payload is not an object")
+        self._raw = raw
+        self._messages = self._decode_messages(raw)
+
+    @staticmethod
+    def _decode_messages(raw: Dict[str, Any]) -> List[Tuple[str, CompactMessage]]:
+        messages = []
+        for entry in raw.get("entry") or ():
+            _required_str(entry, "id")
+            for change in entry.get("changes") or ():
+                field = _required_str(change, "field")
+                value = change.get("value")
+                if not isinstance(value, dict):
+                    raise ValueError("Missing change value")
+                contacts = value.get("contacts") or ()
+                for contact in contacts:
+                    _required_str(contact, "wa_id")
+                decoded = [CompactMessage(message) for message in value.get("messages") or ()]
+                if field == "messages" and contacts and decoded:
+                    sender_wa_id = contacts[0]["wa_id"]
+                    messages.extend((sender_wa_id, message) for message in decoded)
+        return messages
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """The payload as received."""
+        return self._raw
+
+    def get_all_messages(self) -> List[Tuple[str, CompactMessage]]:
+        """
+        Extract all messages with their sender WhatsApp IDs.
+
+        Returns:
+            List of tuples containing (sender_wa_id, message)
+        """
+        return list(self._messages)
+
+    def get_text_messages(self) -> List[Tuple[str, CompactMessage]]:
+        """
+        Extract all text messages with their sender WhatsApp IDs.
+
+        Returns:
+            List of tuples containing (sender_wa_id, message)
+        """
+        return [(sender, message) for sender, message in self._messages if message.is_text_message()]
+
+    def to_model(self) -> WhatsAppWebhookPayload:
+        """Fully validated Pydantic equivalent."""
+        return WhatsAppWebhookPayload.model_validate(self._raw)
+
+
+def decode_compact_payload(data: Union[bytes, str, Dict[str, Any]]) -> CompactWebhookPayload:
+    """
+    Decode a webhook body (raw bytes or an already decoded dict).
+
+    Raises:
+        ValueError: If the body is not JSON or lacks a field routing needs
+    """
+    if isinstance(data, (bytes, bytearray, str)):
+        data = json.loads(data)
+    return CompactWebhookPayload(data)
@@ -11,6 +11,11 @@ from pydantic import BaseModel, Field, ConfigDict, field_validator
 import re
 
 
+# Compiled once; shared with the compact decoder in ``compact.py``
+WHITESPACE_PATTERN = re.compile(r'\s+')
+PHONE_NUMBER_PATTERN = re.compile(r'^\+?[1-9]\d{1,14}$')
+
+
 # Base classes for different message content types
 
 class WhatsAppTextContent(BaseModel):
@@ -133,8 +138,8 @@ class WhatsAppMessage(BaseModel):
     def validate_phone_number(cls, v: str) -> str:
         """Validate phone number format."""
         # Remove any whitespace and ensure it's a valid format
-        phone = re.sub(r'\s+', '', v)
-        if not re.match(r'^\+?[1-9]\d{1,14}$', phone):
+        phone = WHITESPACE_PATTERN.sub('', v)
+        if not PHONE_NUMBER_PATTERN.match(phone):
             raise ValueError('Invalid phone number format')
         return phone
     
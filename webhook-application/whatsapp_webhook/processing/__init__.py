@@ -0,0 +1,52 @@
+"""
+Background processing infrastructure for the WhatsApp webhook application.
+"""
+from .admission import AdmissionController, AdmissionRejectedError
+from .burst_coalescer import Burst, BurstCoalescer
+from .dedup import (
+    MessageDeduplicator,
+    DedupBackend,
+    SQLiteDedupBackend,
+    RedisDedupBackend,
+    build_dedup_backend
+)
+from .ingress_queue import IngressQueue, IngressQueueFullError
+from .pipeline import Pipeline, Stage
+from .reply_chunker import ReplyChunker
+from .resends import ResendTracker
+from .sender_scheduler import SenderScheduler
+from .statuses import StatusAggregator, is_status_only
+from .task_registry import RegistryClosedError, TaskRegistry
+
+__all__ = [
+    # Admission control
+    "AdmissionController",
+    "AdmissionRejectedError",
+    # Burst coalescing
+    "Burst",
+    "BurstCoalescer",
+    # Deduplication
+    "MessageDeduplicator",
+    "DedupBackend",
+    "SQLiteDedupBackend",
+    "RedisDedupBackend",
+    "build_dedup_backend",
+    # Ingress queue
+    "IngressQueue",
+    "IngressQueueFullError",
+    # Per-message pipeline
+    "Pipeline",
+    "Stage",
+    # Reply streaming
+    "ReplyChunker",
+    # Resend detection
+    "ResendTracker",
+    # Per-sender scheduling
+    "SenderScheduler",
+    # Status callbacks
+    "StatusAggregator",
+    "is_status_only",
+    # Background tasks
+    "RegistryClosedError",
+    "TaskRegistry"
+]
@@ -0,0 +1,112 @@
+"""
+Admission control for background message processing.
+
+Each app gets an ``AdmissionController`` that caps how many messages are
+processed at once. Messages over the cap wait in FIFO order, but only up to
+``max_queue_wait`` seconds since they were queued and only while fewer than
+``max_queued`` are already waiting; otherwise they are shed with
+``AdmissionRejectedError`` so the caller can send a cheap "busy" reply instead
+of piling another doomed agent call onto an overloaded backend.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from ..utils.metrics import metrics
+
+
+class AdmissionRejectedError(Exception):
+    """Raised when a message is shed instead of admitted."""
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"{name}: shed ({reason})")
+        self.name = name
+        self.reason = reason
+
+
+class AdmissionController:
+    """FIFO concurrency limit with a bounded queue and a maximum queue wait."""
+
+    def __init__(self, name: str, max_inflight: int, max_queue_wait: float, max_queued: int = 1000):
+        """
+        Args:
+            name: Label used in metrics (the app name)
+            max_inflight: Messages processed at once
+            max_queue_wait: Seconds a message may wait for a slot, counted from when it was queued
+            max_queued: Messages allowed to wait; further ones are shed immediately
+        """
+        self.name = name
+        self.max_inflight = max_inflight
+        self.max_queue_wait = max_queue_wait
+        self.max_queued = max_queued
+        self.inflight = 0
+        self.shed = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Number of messages waiting for a slot."""
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"inflight": self.inflight, "queued": self.queued, "shed": self.shed}
+
+    def _reject(self, reason: str) -> AdmissionRejectedError:
+        self.shed += 1
+        metrics.inc("admission_shed", app=self.name, reason=reason)
+        return AdmissionRejectedError(self.name, reason)
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            self._waiters.remove(waiter)
+            waiter.set_exception(self._reject("queue_timeout"))
+
+    async def acquire(self, queued_at: Optional[float] = None) -> None:
+        """
+        Wait for a processing slot.
+
+        Args:
+            queued_at: ``time.monotonic()`` when the message was queued (defaults to now)
+
+        Raises:
+            AdmissionRejectedError: If the message is shed
+        """
+        now = time.monotonic()
+        queued_at = now if queued_at is None else queued_at
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+            metrics.observe("admission_wait_seconds", now - queued_at, app=self.name)
+            return
+        if len(self._waiters) >= self.max_queued:
+            raise self._reject("queue_full")
+        remaining = queued_at + self.max_queue_wait - now
+        if remaining <= 0:
+            raise self._reject("queue_timeout")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        timer = loop.call_later(remaining, self._expire, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # The slot was handed over just before we were cancelled
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+        metrics.observe("admission_wait_seconds", time.monotonic() - queued_at, app=self.name)
+
+    def release(self) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot changes hands, so ``inflight`` stays the same
+                waiter.set_result(None)
+                return
+        self.inflight -= 1
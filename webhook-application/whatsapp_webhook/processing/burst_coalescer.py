@@ -0,0 +1,170 @@
+"""
+Burst coalescing: merge rapid consecutive messages of one sender into one agent turn.
+
+Farmers often type a question over several quick messages ("hola", "tengo un
+problema", "las ciruelas se están partiendo"). ``BurstCoalescer`` collects
+the texts of a sender and hands them over as a single burst once no new
+text arrived for ``window`` seconds or ``max_messages`` texts were
+collected. A new text restarts the window; it is also folded into a burst
+that was handed over but whose agent turn has not started yet, so a turn is
+only ever committed with everything that arrived before it began.
+
+Each burst carries a ``done`` future, resolved when its flush ends, so the
+work that produced a message (its ingress journal job) can wait for the
+turn that answers it before it is acknowledged; ``turn_of`` finds it by
+message ID. Flushes run as tasks of a ``TaskRegistry``. On shutdown
+``close`` flushes every open window at once and stops coalescing.
+"""
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ..utils.logging import get_logger
+from .task_registry import TaskRegistry
+
+# (message ID, WhatsApp timestamp)
+MessageRef = Tuple[str, float]
+
+
+class Burst:
+    """Texts of one sender merged into a single agent turn."""
+
+    __slots__ = ("texts", "refs", "started", "done")
+
+    def __init__(self):
+        self.texts: List[str] = []
+        self.refs: List[MessageRef] = []
+        self.started = False
+        # True once the flush finished, False if it was cancelled or dropped
+        self.done: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    def finish(self, completed: bool) -> None:
+        if not self.done.done():
+            self.done.set_result(completed)
+
+    def take(self) -> str:
+        """Mark the burst as started and return the merged text."""
+        self.started = True
+        return "\n".join(self.texts)
+
+
+class BurstCoalescer:
+    """Per-key debounce window that flushes merged bursts to a callback."""
+
+    def __init__(
+        self,
+        window: float,
+        max_messages: int,
+        flush: Callable[[Hashable, Burst], Awaitable[None]],
+        registry: Optional[TaskRegistry] = None,
+    ):
+        """
+        Args:
+            window: Seconds without new input before a burst is flushed (0 disables coalescing)
+            max_messages: Texts after which a burst is flushed right away
+            flush: Called with the key and the burst; must call ``Burst.take`` when the turn starts
+            registry: Registry the flushes are spawned on (a private one if omitted)
+        """
+        self.window = window
+        self.max_messages = max_messages
+        self.logger = get_logger("burst_coalescer")
+        self._flush_callback = flush
+        self._open: Dict[Hashable, Tuple[Burst, asyncio.TimerHandle]] = {}
+        self._handed_over: Dict[Hashable, Burst] = {}
+        self._by_message: Dict[str, Burst] = {}
+        self._registry = registry if registry is not None else TaskRegistry("bursts")
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 and not self._closed
+
+    @property
+    def pending(self) -> int:
+        """Number of senders with an open window."""
+        return len(self._open)
+
+    def turn_of(self, message_id: str) -> Optional[asyncio.Future]:
+        """
+        The ``done`` future of the burst holding a message, if its turn has not finished.
+
+        Shield it before waiting on it: bursts hold messages of several webhooks.
+        """
+        burst = self._by_message.get(message_id)
+        return burst.done if burst is not None else None
+
+    def add(self, key: Hashable, text: str, ref: MessageRef) -> None:
+        """
+        Add a text to the sender's burst, (re)starting its window.
+
+        Args:
+            key: Sender key (app name, sender WhatsApp ID)
+            text: Message text or audio transcript
+            ref: ID and timestamp of the message the text came from
+        """
+        waiting = self._handed_over.get(key)
+        if waiting is not None and not waiting.started and len(waiting.texts) < self.max_messages:
+            waiting.texts.append(text)
+            waiting.refs.append(ref)
+            self._by_message[ref[0]] = waiting
+            return
+
+        burst, timer = self._open.get(key, (None, None))
+        if timer is not None:
+            timer.cancel()
+        if burst is None:
+            burst = Burst()
+        burst.texts.append(text)
+        burst.refs.append(ref)
+        self._by_message[ref[0]] = burst
+        if len(burst.texts) >= self.max_messages:
+            self._open.pop(key, None)
+            self._hand_over(key, burst)
+            return
+        timer = asyncio.get_running_loop().call_later(self.window, self._on_timeout, key)
+        self._open[key] = (burst, timer)
+
+    def _on_timeout(self, key: Hashable) -> None:
+        burst, _ = self._open.pop(key)
+        self._hand_over(key, burst)
+
+    def _hand_over(self, key: Hashable, burst: Burst) -> None:
+        self._handed_over[key] = burst
+        self._registry.spawn("burst", self._flush(key, burst))
+
+    async def _flush(self, key: Hashable, burst: Burst) -> None:
+        completed = False
+        try:
+            await self._flush_callback(key, burst)
+            completed = True
+        except Exception as e:
+            self.logger.error(f"Error flushing burst of {len(burst.texts)} messages: {e}", exc_info=True)
+            completed = True
+        finally:
+            if self._handed_over.get(key) is burst:
+                del self._handed_over[key]
+            self._forget(burst, completed)
+
+    def _forget(self, burst: Burst, completed: bool) -> None:
+        for message_id, _ in burst.refs:
+            if self._by_message.get(message_id) is burst:
+                del self._by_message[message_id]
+        burst.finish(completed)
+
+    def close(self) -> None:
+        """Stop coalescing and flush every open window now."""
+        self._closed = True
+        open_bursts, self._open = self._open, {}
+        for key, (burst, timer) in open_bursts.items():
+            timer.cancel()
+            self._hand_over(key, burst)
+
+    async def stop(self) -> None:
+        """Drop open windows and cancel flushes still in progress; their bursts finish as not completed."""
+        for burst, timer in self._open.values():
+            timer.cancel()
+            self._forget(burst, False)
+        if self._open:
+            self.logger.warning(f"Dropping {len(self._open)} open bursts on shutdown")
+        self._open.clear()
+        await self._registry.drain(asyncio.get_running_loop().time())
+        self._handed_over.clear()
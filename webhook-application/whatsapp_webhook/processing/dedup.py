@@ -0,0 +1,356 @@
+"""
+Deduplication of WhatsApp message redeliveries.
+
+WhatsApp redelivers a webhook whenever the ACK is slow, so the same
+``WhatsAppMessage.id`` can arrive several times. Message IDs are checked
+against a bounded in-process LRU with TTL eviction and, optionally, against a
+shared backend (SQLite file or a Redis-protocol server) so deduplication also
+holds across instances. Checks run on the raw payload, before any Pydantic
+validation or outbound I/O.
+"""
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+
+class DedupBackend(ABC):
+    """Shared store of seen message IDs."""
+
+    @abstractmethod
+    async def claim(self, message_id: str, ttl: float) -> bool:
+        """Record ``message_id``; return True if it had not been seen within ``ttl``."""
+
+    @abstractmethod
+    async def forget(self, message_id: str) -> None:
+        """Remove ``message_id`` so a later delivery is processed again."""
+
+    async def close(self) -> None:
+        pass
+
+
+class SQLiteDedupBackend(DedupBackend):
+    """
+    Seen-ID store in a SQLite file, shareable by processes on the same volume.
+
+    Queries run in a worker thread (one at a time, on one connection), so
+    waiting for another process's write lock never blocks the event loop.
+    """
+
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, busy_timeout: float = 1.0):
+        """
+        Args:
+            path: Database file
+            busy_timeout: Seconds to wait for another process's write lock
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA busy_timeout={int(busy_timeout * 1000)}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen_messages (id TEXT PRIMARY KEY, expires_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+        self._claims = 0
+
+    def _claim(self, message_id: str, ttl: float) -> bool:
+        now = time.time()
+        with self._lock:
+            self._claims += 1
+            if self._claims % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM seen_messages WHERE expires_at <= ?", (now,))
+            cursor = self._conn.execute(
+                """
+                INSERT INTO seen_messages (id, expires_at) VALUES (?, ?)
+                ON CONFLICT (id) DO UPDATE SET expires_at = excluded.expires_at
+                WHERE seen_messages.expires_at <= ?
+                """,
+                (message_id, now + ttl, now),
+            )
+            return cursor.rowcount == 1
+
+    def _forget(self, message_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_messages WHERE id = ?", (message_id,))
+
+    async def claim(self, message_id: str, ttl: float) -> bool:
+        return await asyncio.to_thread(self._claim, message_id, ttl)
+
+    async def forget(self, message_id: str) -> None:
+        await asyncio.to_thread(self._forget, message_id)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+
+
+class RedisDedupBackend(DedupBackend):
+    """
+    Seen-ID store on any server speaking the Redis protocol (RESP).
+
+    Only ``SET key value NX PX ttl`` and ``DEL key`` are used, so a local
+    stand-in implementing those two commands can replace Redis in tests.
+    Commands run on a small pool of connections, so concurrent webhooks do
+    not wait for each other's round trips.
+    """
+
+    def __init__(
+        self, url: str, key_prefix: str = "wa:dedup:", timeout: float = 1.0, pool_size: int = 8
+    ):
+        """
+        Args:
+            url: ``redis://[:password@]host[:port][/db]`` URL
+            key_prefix: Prefix of the keys holding seen message IDs
+            timeout: Seconds allowed for connecting and for each command
+            pool_size: Most connections open at once
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.key_prefix = key_prefix
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(pool_size)
+        self._idle: List[_Connection] = []
+
+    @staticmethod
+    def _encode(*args: Any) -> bytes:
+        out = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = arg if isinstance(arg, bytes) else str(arg).encode()
+            out.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(out)
+
+    async def _read_reply(self, reader: asyncio.StreamReader) -> Any:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by dedup server")
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b"+":
+            return payload.decode()
+        if prefix == b"-":
+            raise RuntimeError(payload.decode())
+        if prefix == b":":
+            return int(payload)
+        if prefix == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            data = await reader.readexactly(length + 2)
+            return data[:-2]
+        raise RuntimeError(f"Unsupported RESP reply: {line!r}")
+
+    async def _connect(self) -> "_Connection":
+        connection = await asyncio.open_connection(self.host, self.port)
+        try:
+            if self.password:
+                await self._roundtrip(connection, "AUTH", self.password)
+            if self.db:
+                await self._roundtrip(connection, "SELECT", self.db)
+        except BaseException:
+            connection[1].close()
+            raise
+        return connection
+
+    async def _roundtrip(self, connection: "_Connection", *args: Any) -> Any:
+        reader, writer = connection
+        writer.write(self._encode(*args))
+        await writer.drain()
+        return await self._read_reply(reader)
+
+    async def _command(self, *args: Any) -> Any:
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout)
+                reply = await asyncio.wait_for(self._roundtrip(connection, *args), self.timeout)
+            except BaseException:
+                # A connection interrupted mid-command may hold a stray reply
+                if connection is not None:
+                    connection[1].close()
+                raise
+            self._idle.append(connection)
+            return reply
+
+    async def claim(self, message_id: str, ttl: float) -> bool:
+        reply = await self._command(
+            "SET", self.key_prefix + message_id, 1, "NX", "PX", int(ttl * 1000)
+        )
+        return reply == "OK"
+
+    async def forget(self, message_id: str) -> None:
+        await self._command("DEL", self.key_prefix + message_id)
+
+    async def close(self) -> None:
+        idle, self._idle = self._idle, []
+        for _, writer in idle:
+            writer.close()
+
+
+def build_dedup_backend(
+    kind: str, sqlite_path: Optional[str] = None, redis_url: Optional[str] = None
+) -> Optional[DedupBackend]:
+    """
+    Create the shared dedup backend selected by configuration.
+
+    Args:
+        kind: "memory" (no shared backend), "sqlite" or "redis"
+        sqlite_path: Database file for the SQLite backend
+        redis_url: ``redis://`` URL for the Redis-protocol backend
+
+    Returns:
+        The backend, or None when only the in-process cache is used
+    """
+    kind = (kind or "memory").lower()
+    if kind == "memory":
+        return None
+    if kind == "sqlite":
+        if not sqlite_path:
+            raise ValueError("DEDUP_SQLITE_PATH is required for the sqlite dedup backend.")
+        return SQLiteDedupBackend(sqlite_path)
+    if kind == "redis":
+        if not redis_url:
+            raise ValueError("DEDUP_REDIS_URL is required for the redis dedup backend.")
+        return RedisDedupBackend(redis_url)
+    raise ValueError(f"Unknown dedup backend: {kind}")
+
+
+def _iter_raw_change_values(body: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Yield every ``entry[].changes[].value`` dict of a raw webhook payload."""
+    entries = body.get("entry") if isinstance(body, dict) else None
+    if not isinstance(entries, list):
+        return
+    for entry in entries:
+        changes = entry.get("changes") if isinstance(entry, dict) else None
+        if not isinstance(changes, list):
+            continue
+        for change in changes:
+            value = change.get("value") if isinstance(change, dict) else None
+            if isinstance(value, dict):
+                yield value
+
+
+class MessageDeduplicator:
+    """Bounded LRU + TTL cache of seen message IDs with an optional shared backend."""
+
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        max_entries: int = 50000,
+        backend: Optional[DedupBackend] = None,
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.backend = backend
+        self.logger = get_logger("dedup")
+        self._seen: "OrderedDict[str, float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _remember(self, message_id: str, now: float) -> None:
+        self._seen[message_id] = now + self.ttl
+        self._seen.move_to_end(message_id)
+        while len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+            metrics.inc("dedup_evictions", reason="capacity")
+
+    def _seen_locally(self, message_id: str, now: float) -> bool:
+        expires_at = self._seen.get(message_id)
+        if expires_at is None:
+            return False
+        if expires_at <= now:
+            del self._seen[message_id]
+            metrics.inc("dedup_evictions", reason="ttl")
+            return False
+        self._seen.move_to_end(message_id)
+        return True
+
+    async def claim(self, message_id: str) -> bool:
+        """
+        Mark a message ID as seen.
+
+        Returns:
+            True if this is the first delivery, False if it is a duplicate
+        """
+        now = time.time()
+        if self._seen_locally(message_id, now):
+            metrics.inc("dedup_hits", source="local")
+            return False
+
+        if self.backend is not None:
+            try:
+                first = await self.backend.claim(message_id, self.ttl)
+            except Exception as e:
+                # Fail open: a lost dedup check is cheaper than a lost message
+                self.logger.warning(f"Shared dedup backend unavailable: {e}")
+                metrics.inc("dedup_backend_errors")
+                first = True
+            if not first:
+                self._remember(message_id, now)
+                metrics.inc("dedup_hits", source="shared")
+                return False
+
+        self._remember(message_id, now)
+        metrics.inc("dedup_misses")
+        return True
+
+    async def forget(self, message_ids: List[str]) -> None:
+        """Un-claim message IDs whose payload could not be accepted."""
+        for message_id in message_ids:
+            self._seen.pop(message_id, None)
+            if self.backend is not None:
+                try:
+                    await self.backend.forget(message_id)
+                except Exception as e:
+                    self.logger.warning(f"Could not release {message_id} in dedup backend: {e}")
+
+    async def filter_payload(self, body: Dict[str, Any]) -> tuple[List[str], int]:
+        """
+        Drop already-seen messages from a raw webhook payload, in place.
+
+        Args:
+            body: Raw webhook payload as decoded JSON
+
+        Returns:
+            Tuple of (newly claimed message IDs, number of duplicates dropped)
+        """
+        claimed: List[str] = []
+        dropped = 0
+        for value in _iter_raw_change_values(body):
+            messages = value.get("messages")
+            if not isinstance(messages, list):
+                continue
+            kept = []
+            for message in messages:
+                message_id = message.get("id") if isinstance(message, dict) else None
+                if isinstance(message_id, str) and message_id:
+                    if not await self.claim(message_id):
+                        dropped += 1
+                        continue
+                    claimed.append(message_id)
+                kept.append(message)
+            value["messages"] = kept
+        return claimed, dropped
+
+    async def close(self) -> None:
+        if self.backend is not None:
+            await self.backend.close()
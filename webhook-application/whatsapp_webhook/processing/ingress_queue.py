@@ -0,0 +1,270 @@
+"""
+Durable ingress queue for incoming webhook payloads.
+
+Payloads are appended to a WAL-mode SQLite journal before the webhook is
+acknowledged, then drained by a fixed-size pool of async workers. A job leased
+by a worker stays invisible for ``visibility_timeout`` seconds; if the worker
+does not acknowledge it in time (or the process dies) the job becomes visible
+again and is replayed.
+
+Every journal statement runs on a dedicated single-thread executor, so a
+write waiting on the SQLite lock (up to ``busy_timeout``) or on an fsync
+never stalls the event loop that serves the webhook ACKs; the single thread
+also keeps the statements serialized on the one connection.
+
+On shutdown ``drain`` stops the workers from leasing new jobs and lets the
+jobs in flight finish until a deadline; ``stop`` then releases whatever is
+still running, so it is replayed on the next start.
+"""
+import asyncio
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+from ..utils.logging import get_logger
+
+JobHandler = Callable[[str, bytes], Awaitable[None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    body BLOB NOT NULL,
+    enqueued_at REAL NOT NULL,
+    visible_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_visible_at ON jobs (visible_at, id);
+CREATE TABLE IF NOT EXISTS dead_jobs (
+    id INTEGER PRIMARY KEY,
+    app_name TEXT NOT NULL,
+    body BLOB NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class IngressQueueFullError(Exception):
+    """Raised when the journal already holds ``max_pending`` jobs."""
+    pass
+
+
+class IngressQueue:
+    """SQLite-backed work queue drained by a fixed pool of async workers."""
+
+    def __init__(
+        self,
+        path: str,
+        workers: int = 8,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        max_pending: int = 10000,
+        poll_interval: float = 1.0,
+    ):
+        self.path = path
+        self.workers = workers
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.logger = get_logger("ingress_queue")
+
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingress-journal")
+        self._handler: Optional[JobHandler] = None
+        self._tasks: List[asyncio.Task] = []
+        self._inflight: Set[int] = set()
+        self._wakeup = asyncio.Event()
+        self._pending = 0
+        self._draining = False
+
+    def open(self) -> None:
+        """Open (or create) the journal and count jobs left by a previous run."""
+        if self._conn is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        self._pending = conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0]
+        if self._pending:
+            self.logger.info(f"Ingress journal has {self._pending} jobs to replay")
+
+    def close(self) -> None:
+        """Close the journal connection."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs stored in the journal (queued or in flight)."""
+        return self._pending
+
+    @property
+    def inflight(self) -> int:
+        """Number of jobs currently being processed by this process."""
+        return len(self._inflight)
+
+    @property
+    def draining(self) -> bool:
+        """Whether the workers have stopped taking new jobs."""
+        return self._draining
+
+    async def _run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a journal operation on the journal thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def enqueue(self, app_name: str, body: bytes, delay: float = 0.0) -> int:
+        """
+        Append a payload to the journal.
+
+        Args:
+            app_name: Application the payload was received for
+            body: Serialized webhook payload
+            delay: Seconds before the job becomes visible to the workers
+
+        Returns:
+            The job ID
+
+        Raises:
+            IngressQueueFullError: If the journal is at ``max_pending``
+            sqlite3.Error: If the journal cannot be written
+        """
+        job_id = await self._run(self._insert, app_name, body, delay)
+        self._wakeup.set()
+        return job_id
+
+    def _insert(self, app_name: str, body: bytes, delay: float) -> int:
+        self.open()
+        if self._pending >= self.max_pending:
+            raise IngressQueueFullError(f"Ingress queue is full ({self._pending} pending jobs)")
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO jobs (app_name, body, enqueued_at, visible_at) VALUES (?, ?, ?, ?)",
+            (app_name, body, now, now + delay),
+        )
+        self._pending += 1
+        return cursor.lastrowid
+
+    def _lease(self) -> Optional[tuple]:
+        """Atomically claim the oldest visible job, hiding it for the visibility timeout."""
+        now = time.time()
+        return self._conn.execute(
+            """
+            UPDATE jobs SET visible_at = ?, attempts = attempts + 1
+            WHERE id = (SELECT id FROM jobs WHERE visible_at <= ? ORDER BY id LIMIT 1)
+            RETURNING id, app_name, body, attempts, enqueued_at
+            """,
+            (now + self.visibility_timeout, now),
+        ).fetchone()
+
+    def _ack(self, job_id: int) -> None:
+        self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+        self._pending = max(0, self._pending - 1)
+
+    def _release(self, job_id: int, delay: float = 0.0) -> None:
+        self._conn.execute(
+            "UPDATE jobs SET visible_at = ? WHERE id = ?", (time.time() + delay, job_id)
+        )
+
+    def _bury(self, job_id: int) -> None:
+        self._conn.execute(
+            """
+            INSERT OR REPLACE INTO dead_jobs (id, app_name, body, enqueued_at, attempts, failed_at)
+            SELECT id, app_name, body, enqueued_at, attempts, ? FROM jobs WHERE id = ?
+            """,
+            (time.time(), job_id),
+        )
+        self._ack(job_id)
+
+    async def start(self, handler: JobHandler) -> None:
+        """Open the journal and start the worker pool."""
+        await self._run(self.open)
+        self._handler = handler
+        self._draining = False
+        self._wakeup.set()
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"ingress-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self.logger.info(
+            f"Ingress queue started with {self.workers} workers",
+            extra={"path": self.path, "pending": self._pending},
+        )
+
+    async def drain(self, deadline: float) -> None:
+        """
+        Stop leasing jobs and wait for the jobs in flight to finish.
+
+        Jobs are still accepted by ``enqueue`` and kept for the next start.
+
+        Args:
+            deadline: Event loop time after which the remaining jobs are left to ``stop``
+        """
+        self._draining = True
+        self._wakeup.set()
+        tasks = [task for task in self._tasks if not task.done()]
+        if tasks:
+            timeout = max(0.0, deadline - asyncio.get_running_loop().time())
+            await asyncio.wait(tasks, timeout=timeout)
+        if self._inflight:
+            self.logger.warning(f"{len(self._inflight)} ingress jobs still running at the shutdown deadline")
+
+    async def stop(self) -> None:
+        """Stop the workers and make their unfinished jobs immediately visible again."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self._run(self.close)
+
+    async def _next_job(self) -> Optional[tuple]:
+        while not self._draining:
+            job = await self._run(self._lease)
+            if job is not None:
+                return job
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+        return None
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            job = await self._next_job()
+            if job is None:
+                return
+            job_id, app_name, body, attempts, enqueued_at = job
+            self._inflight.add(job_id)
+            try:
+                await asyncio.wait_for(self._handler(app_name, body), timeout=self.visibility_timeout)
+                await self._run(self._ack, job_id)
+            except asyncio.CancelledError:
+                await self._run(self._release, job_id)
+                raise
+            except Exception as e:
+                if attempts >= self.max_attempts:
+                    self.logger.error(
+                        f"Ingress job {job_id} failed {attempts} times, moving to dead letters: {e}",
+                        exc_info=True,
+                    )
+                    await self._run(self._bury, job_id)
+                else:
+                    self.logger.warning(
+                        f"Ingress job {job_id} failed (attempt {attempts}), will retry: {e}"
+                    )
+                    await self._run(self._release, job_id, min(2 ** attempts, 60))
+                    self._wakeup.set()
+            finally:
+                self._inflight.discard(job_id)
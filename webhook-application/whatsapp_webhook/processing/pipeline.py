@@ -0,0 +1,98 @@
+"""
+Per-message pipeline of async stages.
+
+A message is handled as a small dependency graph: every stage starts as soon
+as the stages it depends on have finished, so independent steps (creating the
+agent session, downloading and transcribing a voice note) overlap instead of
+running one after another. Each stage's duration is recorded in the
+``pipeline_stage_seconds`` histogram.
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Sequence, Tuple
+
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+# A stage receives the results of the stages that already finished, by name
+StageFn = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of a pipeline."""
+    name: str
+    run: StageFn
+    after: Tuple[str, ...] = ()
+    # A failing optional stage is logged and yields None instead of failing the pipeline
+    optional: bool = False
+
+
+class Pipeline:
+    """Runs stages concurrently, each after its dependencies."""
+
+    def __init__(self, name: str, stages: Sequence[Stage]):
+        """
+        Args:
+            name: Label used in metrics and logs
+            stages: Stages in an order where every dependency comes first
+
+        Raises:
+            ValueError: If a stage depends on an unknown or later stage
+        """
+        seen = set()
+        for stage in stages:
+            missing = [dependency for dependency in stage.after if dependency not in seen]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {missing}")
+            seen.add(stage.name)
+        self.name = name
+        self.stages = tuple(stages)
+        self.logger = get_logger("pipeline", {"pipeline": name})
+
+    async def _run_stage(
+        self, stage: Stage, tasks: Dict[str, asyncio.Task], results: Dict[str, Any]
+    ) -> Any:
+        if stage.after:
+            await asyncio.gather(*(tasks[dependency] for dependency in stage.after))
+        started = time.perf_counter()
+        try:
+            result = await stage.run(results)
+        except Exception as e:
+            if not stage.optional:
+                raise
+            self.logger.warning(f"Optional stage {stage.name} failed: {e}")
+            result = None
+        finally:
+            metrics.observe(
+                "pipeline_stage_seconds",
+                time.perf_counter() - started,
+                pipeline=self.name,
+                stage=stage.name,
+            )
+        results[stage.name] = result
+        return result
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Run every stage; if a required stage fails, the rest are cancelled.
+
+        Returns:
+            Stage results by name
+
+        Raises:
+            Exception: The first error of a required stage
+        """
+        results: Dict[str, Any] = {}
+        tasks: Dict[str, asyncio.Task] = {}
+        for stage in self.stages:
+            tasks[stage.name] = asyncio.create_task(self._run_stage(stage, tasks, results))
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return results
@@ -0,0 +1,93 @@
+"""
+Split a streamed agent answer into WhatsApp-sized messages.
+
+Text arrives in small deltas; it is buffered and released at paragraph or
+sentence boundaries once enough has accumulated, so the user starts reading
+the first part of the answer while the rest is still being generated.
+"""
+import re
+from typing import List
+
+_PARAGRAPH_END = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"[.!?…:](?:[\"')\]]*)(?=\s)|\n")
+
+# WhatsApp rejects text bodies longer than this
+WHATSAPP_MAX_TEXT = 4096
+
+
+class ReplyChunker:
+    """Buffers streamed text and emits complete paragraphs or sentences."""
+
+    def __init__(self, min_chars: int = 200, max_chars: int = 1500):
+        """
+        Args:
+            min_chars: A part is only released once it has at least this many characters
+            max_chars: Buffered text beyond this is released at the best boundary found
+        """
+        self.min_chars = max(1, min_chars)
+        self.max_chars = min(max_chars, WHATSAPP_MAX_TEXT)
+        self._buffer = ""
+
+    def _last_boundary(self, pattern: re.Pattern, text: str) -> int:
+        """Index just past the last boundary of ``pattern`` in ``text`` (0 if none)."""
+        end = 0
+        for match in pattern.finditer(text):
+            end = match.end()
+        return end
+
+    def _cut(self, position: int) -> str:
+        part, self._buffer = self._buffer[:position], self._buffer[position:]
+        return part.strip()
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text.
+
+        Returns:
+            Parts ready to be sent, in order (possibly empty)
+        """
+        self._buffer += text
+        parts = []
+        while True:
+            part = self._next_part()
+            if part is None:
+                return parts
+            if part:
+                parts.append(part)
+
+    def _next_part(self) -> "str | None":
+        buffer = self._buffer
+        if len(buffer.strip()) < self.min_chars:
+            return None
+
+        window = buffer[: self.max_chars]
+        paragraph_end = self._last_boundary(_PARAGRAPH_END, window)
+        if paragraph_end >= self.min_chars:
+            return self._cut(paragraph_end)
+
+        if len(buffer) < self.max_chars:
+            return None
+
+        # Too long without a paragraph break: fall back to sentence, then word boundary
+        sentence_end = self._last_boundary(_SENTENCE_END, window)
+        if sentence_end >= self.min_chars:
+            return self._cut(sentence_end)
+        space = window.rfind(" ")
+        return self._cut(space if space >= self.min_chars else self.max_chars)
+
+    def flush(self) -> List[str]:
+        """
+        Release whatever is left once the stream has ended.
+
+        Returns:
+            Remaining parts, each within ``max_chars``
+        """
+        parts = []
+        while len(self._buffer) > self.max_chars:
+            parts.extend(self.feed(""))
+            if len(self._buffer) > self.max_chars:
+                parts.append(self._cut(self.max_chars))
+        rest = self._cut(len(self._buffer))
+        if rest:
+            parts.append(rest)
+        return parts
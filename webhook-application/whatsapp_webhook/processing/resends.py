@@ -0,0 +1,46 @@
+"""
+Detection of users resending the same text.
+
+When a farmer sees no sign that a message arrived, they often send it again
+(a new WhatsApp message ID, so deduplication does not catch it). Counting
+these resends per app shows whether read receipts and typing indicators
+make users wait instead.
+"""
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+
+class ResendTracker:
+    """Remembers each sender's last text for a short window."""
+
+    def __init__(self, window: float = 120.0, max_entries: int = 100000):
+        """
+        Args:
+            window: Seconds within which the same text counts as a resend
+            max_entries: Most senders remembered at once (oldest dropped first)
+        """
+        self.window = window
+        self.max_entries = max_entries
+        # Sender key -> (hash of the normalized text, time it was received)
+        self._last: "OrderedDict[Hashable, Tuple[int, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._last)
+
+    def is_resend(self, key: Hashable, text: str, now: Optional[float] = None) -> bool:
+        """
+        Record a text and tell whether the sender sent the same text within the window.
+
+        Args:
+            key: Sender key (app name, sender WhatsApp ID)
+            text: Message text; case and surrounding whitespace are ignored
+            now: Current time (defaults to ``time.monotonic()``)
+        """
+        now = time.monotonic() if now is None else now
+        digest = hash(" ".join(text.split()).casefold())
+        previous = self._last.pop(key, None)
+        self._last[key] = (digest, now)
+        while len(self._last) > self.max_entries:
+            self._last.popitem(last=False)
+        return previous is not None and previous[0] == digest and now - previous[1] <= self.window
@@ -0,0 +1,156 @@
+"""
+Per-sender actor scheduler.
+
+Every conversation gets a mailbox ordered by WhatsApp message timestamp and a
+single actor task that drains it, so messages from one sender are processed
+strictly one at a time and in order, while different senders run concurrently
+up to a global limit. An actor exits as soon as its mailbox is empty and the
+mailbox is dropped, so memory only grows with the number of senders that
+currently have work queued. An optional admission controller per key group
+(see ``processing.admission``) is acquired before the global limit, so one
+app's backlog cannot hold the slots another app needs. Its queue wait starts
+when an item reaches the front of its mailbox: waiting behind the same
+sender's earlier messages (a whole agent turn each) is not admission
+queueing and does not count against ``max_queue_wait``.
+"""
+import asyncio
+import heapq
+import itertools
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ..utils.logging import get_logger
+from .admission import AdmissionController, AdmissionRejectedError
+
+Work = Callable[[], Awaitable[Any]]
+
+
+class _Mailbox:
+    """Pending work of one sender and the actor draining it."""
+
+    __slots__ = ("heap", "task")
+
+    def __init__(self):
+        # (timestamp, sequence, work, future)
+        self.heap: List[Tuple[float, int, Work, asyncio.Future]] = []
+        self.task: Optional[asyncio.Task] = None
+
+
+class SenderScheduler:
+    """Serializes work per key and runs different keys in parallel."""
+
+    def __init__(
+        self,
+        max_concurrency: int = 16,
+        reorder_window: float = 0.0,
+        admission: Optional[Callable[[Hashable], Optional[AdmissionController]]] = None,
+    ):
+        """
+        Args:
+            max_concurrency: Maximum number of work items running at once across all keys
+            reorder_window: Seconds a new actor waits before its first item, so messages of
+                the same burst delivered in separate webhooks are sorted by timestamp
+            admission: Returns the admission controller for a key, if any; work it sheds
+                fails with ``AdmissionRejectedError``
+        """
+        self.max_concurrency = max_concurrency
+        self.reorder_window = reorder_window
+        self.admission = admission
+        self.logger = get_logger("sender_scheduler")
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._mailboxes: Dict[Hashable, _Mailbox] = {}
+        self._sequence = itertools.count()
+        self._running = 0
+
+    @property
+    def active_senders(self) -> int:
+        """Number of keys with queued or running work."""
+        return len(self._mailboxes)
+
+    @property
+    def queued(self) -> int:
+        """Number of work items waiting in mailboxes."""
+        return sum(len(mailbox.heap) for mailbox in self._mailboxes.values())
+
+    @property
+    def running(self) -> int:
+        """Number of work items currently executing."""
+        return self._running
+
+    def submit(self, key: Hashable, timestamp: float, work: Work) -> asyncio.Future:
+        """
+        Queue work for a key.
+
+        Args:
+            key: Conversation key; work with the same key never overlaps
+            timestamp: Ordering key inside the mailbox (message timestamp)
+            work: Zero-argument coroutine function to run
+
+        Returns:
+            Future resolved with the result (or exception) of ``work``
+        """
+        mailbox = self._mailboxes.get(key)
+        if mailbox is None:
+            mailbox = self._mailboxes[key] = _Mailbox()
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(mailbox.heap, (timestamp, next(self._sequence), work, future))
+
+        if mailbox.task is None:
+            mailbox.task = asyncio.create_task(self._run_actor(key, mailbox))
+        return future
+
+    async def _run_actor(self, key: Hashable, mailbox: _Mailbox) -> None:
+        try:
+            if self.reorder_window > 0:
+                await asyncio.sleep(self.reorder_window)
+
+            while mailbox.heap:
+                _, _, work, future = heapq.heappop(mailbox.heap)
+                if future.done():
+                    continue
+                controller = self.admission(key) if self.admission else None
+                if controller is not None:
+                    try:
+                        await controller.acquire()
+                    except AdmissionRejectedError as e:
+                        future.set_exception(e)
+                        continue
+                    except asyncio.CancelledError:
+                        future.cancel()
+                        raise
+                try:
+                    await self._run(work, future)
+                finally:
+                    if controller is not None:
+                        controller.release()
+        finally:
+            # Mailbox is empty (or we were cancelled): collect it
+            for _, _, _, future in mailbox.heap:
+                future.cancel()
+            mailbox.heap.clear()
+            if self._mailboxes.get(key) is mailbox:
+                del self._mailboxes[key]
+
+    async def _run(self, work: Work, future: asyncio.Future) -> None:
+        async with self._semaphore:
+            self._running += 1
+            try:
+                result = await work()
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._running -= 1
+
+    async def stop(self) -> None:
+        """Cancel all actors and their pending work."""
+        tasks = [mailbox.task for mailbox in self._mailboxes.values() if mailbox.task]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
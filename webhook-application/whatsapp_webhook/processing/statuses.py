@@ -0,0 +1,205 @@
+"""
+Fast lane for WhatsApp status callbacks (sent / delivered / read / failed).
+
+Most webhooks Meta sends are status updates for messages we sent, not user
+messages. ``is_status_only`` recognises them from the raw body, so they can
+be acknowledged without queueing them or building the payload models, and
+``StatusAggregator`` keeps the counts and per-message delivery latencies.
+
+Replies are linked to the user message they answer (``record_outbound``),
+so the latency histograms cover the whole path: the user message arriving
+(its WhatsApp timestamp) -> our reply sent -> delivered -> read. All
+timestamps come from WhatsApp, so the stages share one clock.
+"""
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+logger = get_logger("statuses")
+
+# A JSON key; inside string values quotes are escaped, so these cannot match text
+_MESSAGES_KEY = re.compile(rb'"messages"\s*:')
+_STATUSES_KEY = re.compile(rb'"statuses"\s*:')
+_STATUSES_ARRAY = re.compile(r'"statuses"\s*:\s*')
+_decoder = json.JSONDecoder()
+
+# Stages whose latency is measured, as (earlier, later) events of one outbound message
+_STAGES = (("ingress", "sent"), ("sent", "delivered"), ("delivered", "read"))
+_STAGES_BY_EVENT = {
+    event: tuple(stage for stage in _STAGES if event in stage) for pair in _STAGES for event in pair
+}
+
+# Read receipts can come hours later
+LATENCY_BUCKETS = (1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0, 14400.0, 86400.0)
+
+
+def is_status_only(body: bytes) -> bool:
+    """
+    Whether a raw webhook body carries statuses and no messages.
+
+    Only looks for the ``statuses`` / ``messages`` keys of ``changes[].value``,
+    without decoding the body.
+    """
+    return _MESSAGES_KEY.search(body) is None and _STATUSES_KEY.search(body) is not None
+
+
+def _status_timestamp(status: Dict[str, Any]) -> float:
+    try:
+        return float(status["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+class StatusAggregator:
+    """Counts status callbacks and measures ingress -> sent -> delivered -> read latency per message."""
+
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 100000):
+        """
+        Args:
+            ttl: How long a sent message is tracked, in seconds
+            max_entries: Most messages tracked at once (oldest dropped first)
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Outbound message ID -> {event: WhatsApp timestamp}, oldest first
+        self._messages: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # Kept here rather than in the metrics registry: this runs once per callback
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def stats(self) -> Dict[str, Any]:
+        """Statuses received per app and status, and messages currently tracked."""
+        counts: Dict[str, Dict[str, int]] = {}
+        for (app_name, state), count in list(self._counts.items()):
+            counts.setdefault(app_name, {})[state] = count
+        return {"tracked_messages": len(self._messages), "received": counts}
+
+    def _expire(self, now: float) -> None:
+        while self._messages:
+            first = next(iter(self._messages.values()))
+            if len(self._messages) <= self.max_entries and first["_tracked_at"] > now - self.ttl:
+                return
+            self._messages.popitem(last=False)
+
+    def record(self, app_name: str, status: Dict[str, Any]) -> None:
+        """
+        Record one status object from ``changes[].value.statuses``.
+
+        Args:
+            app_name: Application the callback was received for
+            status: Status object as sent by WhatsApp
+        """
+        message_id = status.get("id")
+        state = status.get("status")
+        if not isinstance(message_id, str) or not isinstance(state, str):
+            return
+        now = time.time()
+        entry = self._messages.get(message_id)
+        if entry is None:
+            entry = self._messages[message_id] = {"_tracked_at": now}
+        elif state in entry:
+            # Meta redelivers callbacks; count each transition once
+            return
+        entry[state] = _status_timestamp(status)
+        key = (app_name, state)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+        if state == "failed":
+            for error in status.get("errors") or ():
+                metrics.inc("whatsapp_status_errors", app=app_name, code=error.get("code"))
+            if "_inbound_id" in entry:
+                logger.warning(f"Reply to message {entry['_inbound_id']} failed for {app_name}")
+        self._observe(app_name, entry, state)
+        self._expire(now)
+
+    def record_outbound(
+        self, app_name: str, response: Dict[str, Any], inbound_id: str, inbound_timestamp: float
+    ) -> int:
+        """
+        Link the messages accepted by the Graph API to the user message they answer.
+
+        Args:
+            app_name: Application that sent the reply
+            response: ``send_whatsapp_message`` response (``{"messages": [{"id": ...}]}``)
+            inbound_id: ID of the user message being answered
+            inbound_timestamp: WhatsApp timestamp of that message
+
+        Returns:
+            Number of outbound messages linked
+        """
+        now = time.time()
+        count = 0
+        for sent in response.get("messages") or ():
+            message_id = sent.get("id") if isinstance(sent, dict) else None
+            if not isinstance(message_id, str):
+                continue
+            entry = self._messages.get(message_id)
+            if entry is None:
+                entry = self._messages[message_id] = {"_tracked_at": now}
+            elif "ingress" in entry:
+                continue
+            entry["ingress"] = inbound_timestamp
+            entry["_inbound_id"] = inbound_id
+            # A status callback may already have beaten the send response here
+            self._observe(app_name, entry, "ingress")
+            count += 1
+        self._expire(now)
+        return count
+
+    def _observe(self, app_name: str, entry: Dict[str, Any], event: str) -> None:
+        # Each stage is observed once, when the second of its two events is recorded
+        for earlier, later in _STAGES_BY_EVENT.get(event, ()):
+            if earlier in entry and later in entry:
+                metrics.observe(
+                    "delivery_latency_seconds",
+                    max(0.0, entry[later] - entry[earlier]),
+                    buckets=LATENCY_BUCKETS,
+                    app=app_name,
+                    stage=f"{earlier}_to_{later}",
+                )
+
+    def record_raw(self, body: bytes, app_name: str) -> int:
+        """
+        Record the statuses of a raw webhook body, decoding only the ``statuses`` arrays.
+
+        Returns:
+            Number of statuses found
+
+        Raises:
+            ValueError: If a ``statuses`` array is not valid JSON
+        """
+        text = body.decode("utf-8")
+        count = 0
+        for match in _STATUSES_ARRAY.finditer(text):
+            statuses, _ = _decoder.raw_decode(text, match.end())
+            for status in statuses if isinstance(statuses, list) else ():
+                if isinstance(status, dict):
+                    self.record(app_name, status)
+                    count += 1
+        return count
+
+    def record_payload(self, body: Dict[str, Any], app_name: str) -> int:
+        """
+        Record every status in a decoded webhook payload.
+
+        Returns:
+            Number of statuses found
+        """
+        count = 0
+        for entry in body.get("entry") or ():
+            for change in entry.get("changes") or ():
+                value = change.get("value") if isinstance(change, dict) else None
+                if not isinstance(value, dict):
+                    continue
+                for status in value.get("statuses") or ():
+                    if isinstance(status, dict):
+                        self.record(app_name, status)
+                        count += 1
+        return count
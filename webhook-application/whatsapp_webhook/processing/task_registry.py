@@ -0,0 +1,128 @@
+"""
+Registry of background tasks that outlive the webhook that started them.
+
+Work handed to a task after the webhook was acknowledged (a burst of
+messages waiting for its agent turn) is spawned through ``TaskRegistry`` so
+the number in flight is always known and shutdown can drain it: ``wait``
+refuses new tasks and waits for the running ones until a deadline, and
+``drain`` then cancels the rest. A task that ends cancelled once the registry
+is closed is abandoned: its ``on_abandon`` callback is called so its work can
+be persisted and replayed by the next instance.
+"""
+import asyncio
+from typing import Callable, Coroutine, Dict, Optional, Tuple
+
+from ..utils.logging import get_logger
+from ..utils.metrics import metrics
+
+AbandonCallback = Callable[[], None]
+
+
+class RegistryClosedError(Exception):
+    """Raised when spawning a task on a registry that is shutting down."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Task registry {name} is closed")
+        self.name = name
+
+
+class TaskRegistry:
+    """Tracks background tasks by kind and drains them on shutdown."""
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name: Registry name, used in task names and logs
+        """
+        self.name = name
+        self.logger = get_logger("task_registry", {"registry": name})
+        self._tasks: Dict[asyncio.Task, Tuple[str, Optional[AbandonCallback]]] = {}
+        self._closed = False
+        self._abandoned = 0
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, int]:
+        """Number of tasks in flight per kind."""
+        counts: Dict[str, int] = {}
+        for kind, _ in self._tasks.values():
+            counts[kind] = counts.get(kind, 0) + 1
+        return counts
+
+    def spawn(
+        self, kind: str, coro: Coroutine, on_abandon: Optional[AbandonCallback] = None
+    ) -> asyncio.Task:
+        """
+        Run a coroutine as a tracked task.
+
+        Args:
+            kind: Label the task is counted under
+            coro: Coroutine to run
+            on_abandon: Called if the task ends cancelled after the registry was closed
+
+        Raises:
+            RegistryClosedError: If the registry is draining
+        """
+        if self._closed:
+            coro.close()
+            raise RegistryClosedError(self.name)
+        task = asyncio.create_task(coro, name=f"{self.name}-{kind}")
+        self._tasks[task] = (kind, on_abandon)
+        task.add_done_callback(self._discard)
+        return task
+
+    def _discard(self, task: asyncio.Task) -> None:
+        kind, on_abandon = self._tasks.pop(task, (None, None))
+        if kind is None or not self._closed or not task.cancelled():
+            return
+        self._abandoned += 1
+        metrics.inc("background_tasks_abandoned", registry=self.name, kind=kind)
+        if on_abandon is None:
+            return
+        try:
+            on_abandon()
+        except Exception as e:
+            self.logger.error(f"Could not persist abandoned {kind} task: {e}", exc_info=True)
+
+    def close(self) -> None:
+        """Refuse new tasks; running ones are unaffected."""
+        self._closed = True
+
+    async def wait(self, deadline: float) -> None:
+        """
+        Close the registry and wait for its tasks until the deadline.
+
+        Args:
+            deadline: Event loop time after which the remaining tasks are left running
+        """
+        self.close()
+        loop = asyncio.get_running_loop()
+        while self._tasks:
+            left = deadline - loop.time()
+            if left <= 0:
+                break
+            await asyncio.wait(list(self._tasks), timeout=left)
+
+    async def drain(self, deadline: float) -> int:
+        """
+        Close the registry and wait for its tasks, cancelling those still running at the deadline.
+
+        Args:
+            deadline: Event loop time by which the tasks must have finished
+
+        Returns:
+            Number of tasks abandoned since the registry was closed
+        """
+        await self.wait(deadline)
+        pending = list(self._tasks)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        if self._abandoned:
+            self.logger.warning(f"Abandoned {self._abandoned} background tasks at the shutdown deadline")
+        return self._abandoned
@@ -1,29 +1,228 @@
 """Transcripción de audio usando Google Cloud Speech."""
+import asyncio
+import functools
 import logging
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Protocol, Union
 from google.cloud import speech
 
+from .media import MediaHandle
+from .media.chunking import AudioChunk, split_opus
+from .media.ogg import OggError, OpusHead, OpusInfo, OpusPacket, inspect_opus, read_opus
+from .utils.app_config import config as app_config
+from .utils.deadline import deadline_stage, remaining
+from .utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
-async def transcribe_audio_file(audio_content: bytes) -> Optional[str]:
-    """Transcribe audio OGG_OPUS de WhatsApp."""
+# One gRPC channel for the whole process; recognize() blocks, so it runs on a
+# dedicated pool whose size caps the number of in-flight recognitions
+_speech_client: Optional[speech.SpeechClient] = None
+_speech_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_speech_client() -> speech.SpeechClient:
+    """Return the shared Speech client, creating it on first use."""
+    global _speech_client
+    if _speech_client is None:
+        _speech_client = speech.SpeechClient()
+    return _speech_client
+
+
+def _get_speech_executor() -> ThreadPoolExecutor:
+    global _speech_executor
+    if _speech_executor is None:
+        _speech_executor = ThreadPoolExecutor(
+            max_workers=app_config.speech_max_concurrency, thread_name_prefix="speech"
+        )
+    return _speech_executor
+
+
+def close_speech_client() -> None:
+    """Release the Speech client and its worker threads (called on shutdown)."""
+    global _speech_client, _speech_executor
+    if _speech_executor is not None:
+        _speech_executor.shutdown(wait=False, cancel_futures=True)
+        _speech_executor = None
+    if _speech_client is not None:
+        _speech_client.transport.close()
+        _speech_client = None
+
+
+async def _recognize(
+    recognition_config: speech.RecognitionConfig, audio: speech.RecognitionAudio
+) -> speech.RecognizeResponse:
+    """
+    Run a blocking ``recognize`` call on the Speech pool without blocking the event loop.
+
+    A call already running in the pool cannot be cancelled from here: if the
+    caller stops waiting (e.g. at the message deadline) the thread keeps its
+    slot until the call ends. The call's own gRPC timeout bounds that time;
+    it is ``SPEECH_TIMEOUT``, shortened to the budget left for the message.
+    """
+    client = get_speech_client()
+    timeout = app_config.speech_timeout
+    left = remaining()
+    if left is not None:
+        timeout = max(0.1, min(timeout, left))
+    call = functools.partial(client.recognize, config=recognition_config, audio=audio, timeout=timeout)
+    metrics.add_gauge("speech_inflight", 1)
     try:
-        client = speech.SpeechClient()
+        return await asyncio.get_running_loop().run_in_executor(_get_speech_executor(), call)
+    finally:
+        metrics.add_gauge("speech_inflight", -1)
+
+
+class TranscriptionBackend(Protocol):
+    """Anything that can turn one Ogg Opus file into text (Google Speech, or a local fake)."""
+
+    async def transcribe(self, audio: bytes, sample_rate_hertz: int) -> Optional[str]:
+        ...
+
+
+class GoogleSpeechBackend:
+    """Synchronous Speech ``recognize`` on the shared client and pool."""
+
+    def __init__(self, language_code: str = "es-CL"):
+        self.language_code = language_code
+
+    async def transcribe(self, audio: bytes, sample_rate_hertz: int) -> Optional[str]:
         config = speech.RecognitionConfig(
             encoding=speech.RecognitionConfig.AudioEncoding.OGG_OPUS,
-            sample_rate_hertz=16000,
-            language_code="es-CL"
+            sample_rate_hertz=sample_rate_hertz,
+            language_code=self.language_code
         )
-        audio = speech.RecognitionAudio(content=audio_content)
-        response = client.recognize(config=config, audio=audio)
-        
-        if response.results:
-            transcript = response.results[0].alternatives[0].transcript
-            logger.info(f"Successfully transcribed audio: {transcript[:50]}...")
-            return transcript.strip()
-        
-        logger.warning("Audio transcription returned no results.")
-        return None
-    except Exception as e:
-        logger.error(f"Error during audio transcription: {e}", exc_info=True)
+        response = await _recognize(config, speech.RecognitionAudio(content=audio))
+        # Speech splits its result at pauses; keep every segment, not just the first
+        transcript = " ".join(
+            result.alternatives[0].transcript.strip() for result in response.results if result.alternatives
+        )
+        return transcript or None
+
+
+# Default backend; tests and benchmarks can pass their own
+transcription_backend: TranscriptionBackend = GoogleSpeechBackend()
+
+
+def _normalize_word(word: str) -> str:
+    return word.strip(".,;:!?¡¿\"'()").lower()
+
+
+def _drop_overlap(previous: List[str], words: List[str], max_words: int = 8) -> List[str]:
+    """Drop the words at the start of ``words`` that repeat the end of ``previous``."""
+    previous_tail = [_normalize_word(word) for word in previous[-max_words:]]
+    head = [_normalize_word(word) for word in words[:max_words]]
+    for size in range(min(len(previous_tail), len(head)), 0, -1):
+        if previous_tail[-size:] == head[:size]:
+            return words[size:]
+    return words
+
+
+async def _transcribe_chunks(
+    head: OpusHead, tags: bytes, packets: List[OpusPacket], backend: TranscriptionBackend, sample_rate_hertz: int
+) -> str:
+    """
+    Transcribe a long recording in overlapping chunks, in parallel.
+
+    Chunks are recognised concurrently (up to ``SPEECH_CHUNK_PARALLELISM`` per
+    recording), so latency depends on the longest chunk rather than on the
+    length of the note. The texts are stitched in order, with the words
+    repeated by the overlap removed. Partial texts are not streamed to the
+    agent: a voice note is a single agent turn, which needs the whole
+    question. If a chunk fails, or the caller is cancelled (e.g. at the
+    message deadline), the other chunks are cancelled.
+
+    Raises:
+        ExceptionGroup: With the errors of the chunks that failed
+    """
+    chunks = split_opus(
+        head,
+        tags,
+        packets,
+        target_seconds=app_config.speech_chunk_seconds,
+        max_seconds=app_config.speech_sync_max_seconds,
+        overlap_seconds=app_config.speech_chunk_overlap_seconds,
+    )
+    logger.info(f"Transcribing long audio in {len(chunks)} chunks")
+    metrics.inc("speech_long_audio_chunks", len(chunks))
+    semaphore = asyncio.Semaphore(app_config.speech_chunk_parallelism)
+
+    async def transcribe_chunk(chunk: AudioChunk) -> Optional[str]:
+        async with semaphore:
+            return await backend.transcribe(chunk.data, sample_rate_hertz)
+
+    async with asyncio.TaskGroup() as group:
+        tasks = [group.create_task(transcribe_chunk(chunk)) for chunk in chunks]
+    texts = [task.result() for task in tasks]
+    stitched: List[str] = []
+    for text in texts:
+        if text:
+            stitched.extend(_drop_overlap(stitched, text.split()))
+    return " ".join(stitched)
+
+
+def _inspect(audio_content: Union[bytes, MediaHandle]) -> Optional[OpusInfo]:
+    try:
+        if isinstance(audio_content, MediaHandle):
+            with audio_content.view() as view:
+                return inspect_opus(view)
+        return inspect_opus(audio_content)
+    except OggError as e:
+        logger.warning(f"Could not inspect audio container: {e}")
         return None
+
+
+async def transcribe_audio_file(
+    audio_content: Union[bytes, MediaHandle], backend: Optional[TranscriptionBackend] = None
+) -> Optional[str]:
+    """
+    Transcribe audio OGG_OPUS de WhatsApp (bytes o un MediaHandle descargado).
+
+    The container headers are inspected first: accidental taps and silent
+    notes are skipped without calling Speech, notes longer than the
+    synchronous limit take the chunked path, and ``sample_rate_hertz`` is
+    taken from the OpusHead header. A note is only skipped as silent when
+    all of it was sampled, and a note whose length cannot be read (e.g. a
+    truncated file) is never skipped and takes the single-request path. Waiting stops when the message deadline
+    runs out; see ``_recognize`` for the calls already running.
+
+    Raises:
+        DeadlineExceededError: If the message deadline runs out
+    """
+    backend = backend or transcription_backend
+    async with deadline_stage("transcription"):
+        try:
+            info = _inspect(audio_content)
+            duration = info.duration if info else None
+            if duration is not None:
+                metrics.observe("audio_duration_seconds", duration)
+                if duration < app_config.speech_min_seconds:
+                    metrics.inc("speech_skipped", reason="too_short")
+                    logger.info(f"Skipping audio of {duration:.2f}s")
+                    return None
+            if info and info.fully_sampled and info.voiced_ratio < app_config.speech_min_voiced_ratio:
+                metrics.inc("speech_skipped", reason="silent")
+                logger.info(f"Skipping silent audio (voiced ratio {info.voiced_ratio:.2f})")
+                return None
+            sample_rate = info.speech_sample_rate if info else 16000
+
+            if isinstance(audio_content, MediaHandle):
+                # The Speech API request needs bytes: this is the only copy made
+                audio_content = audio_content.read()
+
+            if duration is not None and duration > app_config.speech_sync_max_seconds:
+                # Too long for a single synchronous request: recognise it in chunks
+                head, tags, packets = read_opus(audio_content)
+                transcript = await _transcribe_chunks(head, tags, packets, backend, sample_rate)
+            else:
+                transcript = await backend.transcribe(audio_content, sample_rate)
+
+            if transcript:
+                logger.info(f"Successfully transcribed audio: {transcript[:50]}...")
+                return transcript.strip()
+
+            logger.warning("Audio transcription returned no results.")
+            return None
+        except Exception as e:
+            logger.error(f"Error during audio transcription: {e}", exc_info=True)
+            return None
@@ -18,6 +18,8 @@ from .logging import (
     StructuredLogger, 
     LogContext
 )
+from .metrics import metrics, MetricsRegistry
+from .deadline import DeadlineExceededError, deadline_stage, message_deadline, remaining
 
 __all__ = [
     # Helpers
@@ -34,5 +36,13 @@ __all__ = [
     "get_logger",
     "setup_logging",
     "StructuredLogger",
-    "LogContext"
+    "LogContext",
+    # Metrics
+    "metrics",
+    "MetricsRegistry",
+    # Deadlines
+    "DeadlineExceededError",
+    "deadline_stage",
+    "message_deadline",
+    "remaining"
 ]
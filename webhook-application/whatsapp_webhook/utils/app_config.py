@@ -3,10 +3,18 @@ Simplified and centralized configuration management for the WhatsApp webhook app
 """
 
 import os
-from pydantic import BaseModel
+from typing import Optional
+from pydantic import BaseModel, model_validator
+
+def _is_ephemeral(path: str) -> bool:
+    """Whether a path is under /tmp, which Cloud Run keeps in memory and drops with the instance."""
+    path = os.path.abspath(path)
+    return path == "/tmp" or path.startswith("/tmp/")
 
 class AppConfig(BaseModel):
     """Main application configuration, loaded directly from environment variables."""
+    # Deployment environment ("dev" or "prd")
+    environment: str
     agent_url: str
     log_level: str
     verify_token: str
@@ -22,9 +30,144 @@ class AppConfig(BaseModel):
     pp_facebook_app_url: str
     pp_app_name: str
 
+    # Ingress queue (durable journal drained by background workers)
+    ingress_queue_path: str
+    ingress_workers: int
+    ingress_visibility_timeout: float
+    ingress_max_attempts: int
+    ingress_max_pending: int
+
+    # Message-ID deduplication
+    dedup_ttl_seconds: float
+    dedup_max_entries: int
+    dedup_backend: str
+    dedup_sqlite_path: str
+    dedup_redis_url: Optional[str]
+
+    # Shared agent HTTP client
+    agent_http2: bool
+    agent_timeout: float
+    agent_max_connections: int
+    agent_max_keepalive_connections: int
+    agent_keepalive_expiry: float
+
+    # Adaptive concurrency limit for agent calls ("gradient", "aimd" or "fixed")
+    agent_limit_algorithm: str
+    agent_limit_initial: int
+    agent_limit_min: int
+    agent_limit_max: int
+    agent_limit_latency_threshold: float
+
+    # Retries, hedging and circuit breaking (agent and Graph API)
+    retry_max_attempts: int
+    retry_base_delay: float
+    retry_max_delay: float
+    hedge_delay: float
+    breaker_failure_threshold: int
+    breaker_reset_timeout: float
+
+    # Streaming agent replies
+    agent_streaming: bool
+    stream_flush_min_chars: int
+    stream_flush_max_chars: int
+
+    # Known agent sessions cache
+    session_cache_ttl: float
+    session_cache_max_entries: int
+    session_cache_path: Optional[str]
+
+    # Shared Graph API HTTP client
+    graph_http2: bool
+    graph_connect_timeout: float
+    graph_read_timeout: float
+    graph_pool_timeout: float
+    graph_max_connections: int
+    graph_max_keepalive_connections: int
+    graph_keepalive_expiry: float
+
+    # Outbound send scheduler (per phone number)
+    outbound_rate_per_second: float
+    outbound_burst: float
+    outbound_max_inflight_per_number: int
+    outbound_max_attempts: int
+
+    # Media downloads
+    media_max_bytes: int
+    media_spool_bytes: int
+    media_tmp_dir: Optional[str]
+
+    # Content-addressed media / transcript cache
+    media_cache_dir: Optional[str]
+    media_cache_max_bytes: int
+    media_cache_store_media: bool
+
+    # Speech-to-text
+    speech_max_concurrency: int
+    speech_timeout: float
+    speech_sync_max_seconds: float
+    speech_chunk_seconds: float
+    speech_chunk_overlap_seconds: float
+    speech_chunk_parallelism: int
+    speech_min_seconds: float
+    speech_min_voiced_ratio: float
+
+    # Webhook payload decoding ("compact" or "pydantic")
+    webhook_decoder: str
+
+    # Status callbacks fast lane
+    status_fast_lane: bool
+    status_tracking_ttl: float
+    status_tracking_max_entries: int
+
+    # Admission control (per-app limits on messages processed at once)
+    aa_max_inflight: int
+    pp_max_inflight: int
+    admission_max_queue_wait: float
+    admission_max_queued: int
+    admission_retry_delay: float
+
+    # Burst coalescing (0 window disables it)
+    burst_window: float
+    burst_max_messages: int
+
+    # End-to-end budget per message, in seconds from its WhatsApp timestamp
+    message_deadline: float
+
+    # Read receipts per app ("off", "read" or "typing" for read + typing indicator)
+    aa_read_receipts: str
+    pp_read_receipts: str
+    resend_window: float
+
+    # Seconds to drain in-flight work on shutdown (Cloud Run kills the instance 10s after SIGTERM)
+    shutdown_grace_period: float
+
+    # Per-sender ordered processing
+    sender_max_concurrency: int
+    sender_reorder_window: float
+
+    @model_validator(mode="after")
+    def check_state_paths(self) -> "AppConfig":
+        """In prd, refuse to keep state on /tmp, where it is lost with the instance."""
+        if self.environment != "prd":
+            return self
+        paths = {
+            "INGRESS_QUEUE_PATH": self.ingress_queue_path,
+            "SESSION_CACHE_PATH": self.session_cache_path,
+            "MEDIA_CACHE_DIR": self.media_cache_dir,
+        }
+        if self.dedup_backend == "sqlite":
+            paths["DEDUP_SQLITE_PATH"] = self.dedup_sqlite_path
+        ephemeral = [name for name, path in paths.items() if path and _is_ephemeral(path)]
+        if ephemeral:
+            raise ValueError(
+                f"{', '.join(ephemeral)} must point to a mounted volume in prd, not under /tmp"
+            )
+        return self
+
 def load_config_from_env() -> AppConfig:
     """Loads the application configuration from environment variables."""
     return AppConfig(
+        environment=os.getenv("ENVIRONMENT", "dev"),
         agent_url=os.getenv("APP_URL"),
         log_level=os.getenv("LOG_LEVEL", "INFO"),
         verify_token=os.getenv("VERIFY_TOKEN"),
@@ -34,6 +177,81 @@ def load_config_from_env() -> AppConfig:
         aa_app_name=os.getenv("ESTANDAR_AA_APP_NAME"),
         pp_facebook_app_url=os.getenv("ESTANDAR_PP_FACEBOOK_APP"),
         pp_app_name=os.getenv("ESTANDAR_PP_APP_NAME"),
+        ingress_queue_path=os.getenv("INGRESS_QUEUE_PATH", "/tmp/whatsapp_webhook/ingress.db"),
+        ingress_workers=os.getenv("INGRESS_WORKERS", "32"),
+        ingress_visibility_timeout=os.getenv("INGRESS_VISIBILITY_TIMEOUT", "300"),
+        ingress_max_attempts=os.getenv("INGRESS_MAX_ATTEMPTS", "3"),
+        ingress_max_pending=os.getenv("INGRESS_MAX_PENDING", "10000"),
+        dedup_ttl_seconds=os.getenv("DEDUP_TTL_SECONDS", "86400"),
+        dedup_max_entries=os.getenv("DEDUP_MAX_ENTRIES", "50000"),
+        dedup_backend=os.getenv("DEDUP_BACKEND", "memory"),
+        dedup_sqlite_path=os.getenv("DEDUP_SQLITE_PATH", "/tmp/whatsapp_webhook/dedup.db"),
+        dedup_redis_url=os.getenv("DEDUP_REDIS_URL"),
+        agent_http2=os.getenv("AGENT_HTTP2", "true"),
+        agent_timeout=os.getenv("AGENT_TIMEOUT", "30"),
+        agent_max_connections=os.getenv("AGENT_MAX_CONNECTIONS", "100"),
+        agent_max_keepalive_connections=os.getenv("AGENT_MAX_KEEPALIVE_CONNECTIONS", "20"),
+        agent_keepalive_expiry=os.getenv("AGENT_KEEPALIVE_EXPIRY", "30"),
+        agent_limit_algorithm=os.getenv("AGENT_LIMIT_ALGORITHM", "gradient"),
+        agent_limit_initial=os.getenv("AGENT_LIMIT_INITIAL", "8"),
+        agent_limit_min=os.getenv("AGENT_LIMIT_MIN", "2"),
+        agent_limit_max=os.getenv("AGENT_LIMIT_MAX", "64"),
+        agent_limit_latency_threshold=os.getenv("AGENT_LIMIT_LATENCY_THRESHOLD", "10"),
+        retry_max_attempts=os.getenv("RETRY_MAX_ATTEMPTS", "3"),
+        retry_base_delay=os.getenv("RETRY_BASE_DELAY", "0.2"),
+        retry_max_delay=os.getenv("RETRY_MAX_DELAY", "2.0"),
+        hedge_delay=os.getenv("HEDGE_DELAY", "0.5"),
+        breaker_failure_threshold=os.getenv("BREAKER_FAILURE_THRESHOLD", "5"),
+        breaker_reset_timeout=os.getenv("BREAKER_RESET_TIMEOUT", "30"),
+        agent_streaming=os.getenv("AGENT_STREAMING", "false"),
+        stream_flush_min_chars=os.getenv("STREAM_FLUSH_MIN_CHARS", "200"),
+        stream_flush_max_chars=os.getenv("STREAM_FLUSH_MAX_CHARS", "1500"),
+        session_cache_ttl=os.getenv("SESSION_CACHE_TTL", "3600"),
+        session_cache_max_entries=os.getenv("SESSION_CACHE_MAX_ENTRIES", "50000"),
+        session_cache_path=os.getenv("SESSION_CACHE_PATH", "/tmp/whatsapp_webhook/sessions.json"),
+        graph_http2=os.getenv("GRAPH_HTTP2", "true"),
+        graph_connect_timeout=os.getenv("GRAPH_CONNECT_TIMEOUT", "5"),
+        graph_read_timeout=os.getenv("GRAPH_READ_TIMEOUT", "30"),
+        graph_pool_timeout=os.getenv("GRAPH_POOL_TIMEOUT", "10"),
+        graph_max_connections=os.getenv("GRAPH_MAX_CONNECTIONS", "100"),
+        graph_max_keepalive_connections=os.getenv("GRAPH_MAX_KEEPALIVE_CONNECTIONS", "20"),
+        graph_keepalive_expiry=os.getenv("GRAPH_KEEPALIVE_EXPIRY", "60"),
+        outbound_rate_per_second=os.getenv("OUTBOUND_RATE_PER_SECOND", "20"),
+        outbound_burst=os.getenv("OUTBOUND_BURST", "40"),
+        outbound_max_inflight_per_number=os.getenv("OUTBOUND_MAX_INFLIGHT_PER_NUMBER", "16"),
+        outbound_max_attempts=os.getenv("OUTBOUND_MAX_ATTEMPTS", "5"),
+        media_max_bytes=os.getenv("MEDIA_MAX_BYTES", str(16 * 1024 * 1024)),
+        media_spool_bytes=os.getenv("MEDIA_SPOOL_BYTES", str(1024 * 1024)),
+        media_tmp_dir=os.getenv("MEDIA_TMP_DIR"),
+        media_cache_dir=os.getenv("MEDIA_CACHE_DIR", "/tmp/whatsapp_webhook/media_cache"),
+        media_cache_max_bytes=os.getenv("MEDIA_CACHE_MAX_BYTES", str(512 * 1024 * 1024)),
+        media_cache_store_media=os.getenv("MEDIA_CACHE_STORE_MEDIA", "false"),
+        speech_max_concurrency=os.getenv("SPEECH_MAX_CONCURRENCY", "8"),
+        speech_timeout=os.getenv("SPEECH_TIMEOUT", "60"),
+        speech_sync_max_seconds=os.getenv("SPEECH_SYNC_MAX_SECONDS", "55"),
+        speech_chunk_seconds=os.getenv("SPEECH_CHUNK_SECONDS", "45"),
+        speech_chunk_overlap_seconds=os.getenv("SPEECH_CHUNK_OVERLAP_SECONDS", "0.5"),
+        speech_chunk_parallelism=os.getenv("SPEECH_CHUNK_PARALLELISM", "4"),
+        speech_min_seconds=os.getenv("SPEECH_MIN_SECONDS", "1.0"),
+        speech_min_voiced_ratio=os.getenv("SPEECH_MIN_VOICED_RATIO", "0.05"),
+        webhook_decoder=os.getenv("WEBHOOK_DECODER", "compact"),
+        status_fast_lane=os.getenv("STATUS_FAST_LANE", "true"),
+        status_tracking_ttl=os.getenv("STATUS_TRACKING_TTL", "86400"),
+        status_tracking_max_entries=os.getenv("STATUS_TRACKING_MAX_ENTRIES", "100000"),
+        aa_max_inflight=os.getenv("AA_MAX_INFLIGHT", "12"),
+        pp_max_inflight=os.getenv("PP_MAX_INFLIGHT", "12"),
+        admission_max_queue_wait=os.getenv("ADMISSION_MAX_QUEUE_WAIT", "15"),
+        admission_max_queued=os.getenv("ADMISSION_MAX_QUEUED", "200"),
+        admission_retry_delay=os.getenv("ADMISSION_RETRY_DELAY", "10"),
+        burst_window=os.getenv("BURST_WINDOW", "0"),
+        burst_max_messages=os.getenv("BURST_MAX_MESSAGES", "5"),
+        message_deadline=os.getenv("MESSAGE_DEADLINE", "120"),
+        aa_read_receipts=os.getenv("AA_READ_RECEIPTS", "typing"),
+        pp_read_receipts=os.getenv("PP_READ_RECEIPTS", "typing"),
+        resend_window=os.getenv("RESEND_WINDOW", "120"),
+        shutdown_grace_period=os.getenv("SHUTDOWN_GRACE_PERIOD", "8"),
+        sender_max_concurrency=os.getenv("SENDER_MAX_CONCURRENCY", "16"),
+        sender_reorder_window=os.getenv("SENDER_REORDER_WINDOW", "0.2"),
     )
 
 # Singleton instance to be used across the application
@@ -0,0 +1,94 @@
+"""
+Per-message deadlines carried through the processing pipeline.
+
+``message_deadline`` sets the deadline of the message being processed by the
+current task (a context variable, so it follows the call chain without extra
+arguments). Every outbound call runs inside ``deadline_stage``, which bounds
+it by the budget that remains, cancels it when the budget runs out and
+reports which stage exhausted it, so a message fails once instead of each
+hop spending its own full timeout.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+
+from .logging import get_logger
+from .metrics import metrics
+
+logger = get_logger("deadline")
+
+# Deadline of the current message, in event loop time
+_deadline: ContextVar[Optional[float]] = ContextVar("message_deadline", default=None)
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a stage cannot finish within the message's deadline."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current message's deadline, or None if there is none."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - asyncio.get_running_loop().time()
+
+
+@contextmanager
+def message_deadline(budget: float, received_at: Optional[float] = None) -> Iterator[None]:
+    """
+    Set the deadline of the message processed in this context.
+
+    Args:
+        budget: Seconds the whole message may take
+        received_at: Epoch seconds when the message was sent (its WhatsApp
+            timestamp); time already spent since then counts against the
+            budget, up to half of it, so messages replayed after a restart
+            still get a chance
+    """
+    spent = 0.0
+    if received_at is not None:
+        spent = min(max(0.0, time.time() - received_at), budget / 2)
+    token = _deadline.set(asyncio.get_running_loop().time() + budget - spent)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _exhausted(stage: str) -> DeadlineExceededError:
+    metrics.inc("deadline_exceeded", stage=stage)
+    logger.warning(f"Message deadline exhausted during {stage}")
+    return DeadlineExceededError(stage)
+
+
+@asynccontextmanager
+async def deadline_stage(stage: str) -> AsyncIterator[None]:
+    """
+    Run a stage within the budget left; without a deadline it is unbounded.
+
+    Raises:
+        DeadlineExceededError: If no budget is left or it runs out inside the stage
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        yield
+        return
+    left = deadline - asyncio.get_running_loop().time()
+    if left <= 0:
+        raise _exhausted(stage)
+    metrics.observe("deadline_budget_seconds", left, stage=stage)
+    timeout = asyncio.timeout_at(deadline)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError:
+        if not timeout.expired():
+            # A timeout of the stage itself (e.g. an HTTP read timeout)
+            raise
+        raise _exhausted(stage) from None
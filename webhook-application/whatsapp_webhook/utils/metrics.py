@@ -0,0 +1,144 @@
+"""
+In-process metrics registry for the WhatsApp webhook application.
+
+Counters, gauges and histograms are kept in memory and exposed as JSON by the
+``/metrics`` endpoint. Gauges can also be backed by a callback so components
+report their current state (queue depth, in-flight work) only when scraped.
+"""
+import bisect
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _label_str(key: LabelKey) -> str:
+    return ",".join(f"{k}={v}" for k, v in key)
+
+
+class Histogram:
+    """Cumulative-bucket histogram with count and sum."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket containing it."""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative, total = {}, 0
+        for bound, bucket_count in zip(self.buckets, self.counts):
+            total += bucket_count
+            cumulative[str(bound)] = total
+        cumulative["+Inf"] = self.count
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": cumulative,
+        }
+
+
+class MetricsRegistry:
+    """Thread-safe registry of named, labelled metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauge_callbacks: Dict[str, Callable[[], Any]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def add_gauge(self, name: str, delta: float, **labels: Any) -> None:
+        """Move a gauge up or down by ``delta``."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._gauges.setdefault(name, {})
+            series[key] = series.get(key, 0) + delta
+
+    def register_gauge(self, name: str, callback: Callable[[], Any]) -> None:
+        """Register a gauge whose value is computed by ``callback`` at scrape time."""
+        with self._lock:
+            self._gauge_callbacks[name] = callback
+
+    def observe(
+        self, name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS, **labels: Any
+    ) -> None:
+        """Record a value in a histogram."""
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def get_counter(self, name: str, **labels: Any) -> float:
+        """Current value of a counter (0 if never incremented)."""
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as a JSON-serializable dictionary."""
+        with self._lock:
+            counters = {
+                name: {_label_str(k): v for k, v in series.items()}
+                for name, series in self._counters.items()
+            }
+            gauges = {
+                name: {_label_str(k): v for k, v in series.items()}
+                for name, series in self._gauges.items()
+            }
+            histograms = {
+                name: {_label_str(k): h.snapshot() for k, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+            callbacks = dict(self._gauge_callbacks)
+
+        for name, callback in callbacks.items():
+            try:
+                gauges[name] = callback()
+            except Exception as e:
+                gauges[name] = f"error: {e}"
+
+        return {"counters": counters, "gauges": gauges, "histograms": histograms}
+
+
+# Singleton instance to be used across the application
+metrics = MetricsRegistry()
@@ -3,9 +3,12 @@ Utilities for working with Pydantic message models.
 """
 
 from pydantic import ValidationError
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Union
+import json
 import logging
 
+from .app_config import config
+from ..models.compact import CompactWebhookPayload, decode_compact_payload
 from ..models.messages import (
     WhatsAppWebhookPayload,
     AgentResponse,
@@ -34,6 +37,30 @@ def parse_webhook_payload(data: Dict[str, Any]) -> Optional[WhatsAppWebhookPaylo
         return None
 
 
+def decode_webhook_payload(
+    data: Union[bytes, Dict[str, Any]]
+) -> Optional[Union[CompactWebhookPayload, WhatsAppWebhookPayload]]:
+    """
+    Decode a webhook payload with the decoder selected by ``WEBHOOK_DECODER``.
+
+    ``compact`` (default) validates only what routing needs and builds message
+    content lazily; ``pydantic`` validates the full model tree up front.
+
+    Args:
+        data: Raw body bytes or already decoded payload data
+
+    Returns:
+        The decoded payload or None if decoding fails
+    """
+    if config.webhook_decoder == "pydantic":
+        return parse_webhook_payload(json.loads(data) if isinstance(data, bytes) else data)
+    try:
+        return decode_compact_payload(data)
+    except (ValueError, TypeError, AttributeError) as e:
+        logging.error(f"Failed to decode webhook payload: {e}")
+        return None
+
+
 def parse_agent_response(response_data: list) -> Optional[str]:
     """
     Parse agent response and extract text content.